@@ -15,41 +15,103 @@ Usage:
     --usd-to-rwf 1300 \
     --rounding ceil \
     --out-dir /Users/macbookpro/projects/flutter/zoea2/backend/scripts/etike/out
+
+  # Quote several FX rates / steps / rounding modes in one run (every combination):
+  python3 backend/scripts/etike/export_etike_tours.py --input /Users/macbookpro/Desktop/etike.sql \
+    --usd-to-rwf 1300 1350 1400 --step 1000 5000 --rounding ceil nearest
+
+  # Parse INSERT statements on 8 cores (same output as a single process):
+  python3 backend/scripts/etike/export_etike_tours.py --input /Users/macbookpro/Desktop/etike.sql --workers 8
+
+  # Recurring sync: only write/import what changed since the last imported --delta run
+  # (the importer moves the baseline forward after --commit; --ack-delta does it by hand):
+  python3 backend/scripts/etike/export_etike_tours.py --input /Users/macbookpro/Desktop/etike.sql --delta
+  node -r ts-node/register backend/scripts/etike/import_etike_tours.ts \
+    --input backend/scripts/etike/out/etike_tours_delta.ndjson --commit
+
+  # Bulk-load into SQLite, or write COPY CSVs + load.sql for Postgres (tables go
+  # in their own etike_import schema):
+  python3 backend/scripts/etike/export_etike_tours.py --input /Users/macbookpro/Desktop/etike.sql \
+    --sqlite /tmp/etike.db --pg-copy-dir /tmp/etike_pg
+  psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f /tmp/etike_pg/load.sql
+
+  # Big multi-vendor catalog on a small worker: stream the dump and keep the join
+  # within ~256 MB by spilling hash partitions to disk (same outputs):
+  python3 backend/scripts/etike/export_etike_tours.py --input /Users/macbookpro/Desktop/etike.sql \
+    --memory-budget 256 --spill-dir /tmp/etike_spill
+
+  # Long export on a preemptible worker: save parsing progress every 5 minutes and,
+  # when re-run after an interruption, continue from the last save (same outputs):
+  python3 backend/scripts/etike/export_etike_tours.py --input /Users/macbookpro/Desktop/etike.sql \
+    --checkpoint-every 300 --resume
+
+  # Stream NDJSON rows straight into the importer while the export runs:
+  python3 backend/scripts/etike/export_etike_tours.py --input /Users/macbookpro/Desktop/etike.sql --ndjson - \
+    | node -r ts-node/register backend/scripts/etike/import_etike_tours.ts --input -
+
+  # Where does the time go? (per-stage JSON report; cProfile of one stage)
+  python3 backend/scripts/etike/export_etike_tours.py --input /Users/macbookpro/Desktop/etike.sql --profile-stage html_cleanup
+
+  # Check VALUES scanner throughput on a (large) dump:
+  python3 backend/scripts/etike/export_etike_tours.py --input /path/to/big.sql --bench-scanner
 """
 
 from __future__ import annotations
 
 import argparse
-import csv
+import hashlib
+import heapq
 import html
-import json
-import math
+import itertools
 import os
 import re
+import sys
+from collections import OrderedDict
 from dataclasses import dataclass
-from decimal import Decimal, InvalidOperation
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-
-INSERT_RE = re.compile(r"^INSERT INTO `(?P<table>[^`]+)`\s+\([^)]+\)\s+VALUES\s*$")
-
-
-def _unescape_mysql_string(s: str) -> str:
-    # phpMyAdmin dumps typically escape with backslashes.
-    # Keep this conservative; we only need good-enough for text fields.
-    return (
-        s.replace("\\\\", "\\")
-        .replace("\\'", "'")
-        .replace('\\"', '"')
-        .replace("\\r", "\r")
-        .replace("\\n", "\n")
-        .replace("\\t", "\t")
-    )
+from decimal import ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_EVEN, Decimal, InvalidOperation, localcontext
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Sequence, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqldump import (  # noqa: E402
+    CHECKPOINT_EVERY,
+    DEFAULT_PARTITIONS,
+    SCANNER_TARGET_MBPS,
+    SCANNER_TARGET_SPEEDUP,
+    Partitions,
+    Profiler,
+    Rows,
+    Scan,
+    benchmark_scanner,
+    cached_inserts,
+    compression,
+    default_cache_dir,
+    iter_rows,
+    load_index,
+    saved_index,
+)
+from sinks import (  # noqa: E402
+    CsvSink,
+    DeltaSink,
+    FanOut,
+    JsonArraySink,
+    NdjsonSink,
+    PgCopySink,
+    Sink,
+    SqliteSink,
+    next_manifest_path,
+    promote_manifest,
+)
+
+
+def _strip_html_keep_text_legacy(s: str) -> str:
+    # The reference _strip_html_keep_text_fast must match: the strip_html cases
+    # of `python3 -m sqldump bench` check every description against it.
+    # Convert entities (&amp;, etc.) first, then strip tags.
+    return _strip_tags_legacy(html.unescape(s))
 
 
-def _strip_html_keep_text(s: str) -> str:
-    # Convert entities (&amp;, etc.) first, then strip tags.
-    s = html.unescape(s)
+def _strip_tags_legacy(s: str) -> str:
     # Replace <br> and <p>/<li> with newlines to keep readability.
     s = re.sub(r"(?i)<\s*br\s*/?\s*>", "\n", s)
     s = re.sub(r"(?i)<\s*/?\s*(p|div|li|ul|ol|strong|em|span)\b[^>]*>", "", s)
@@ -61,6 +123,72 @@ def _strip_html_keep_text(s: str) -> str:
     return s.strip()
 
 
+# Precompiled equivalent of the legacy passes above, each pass skipped when a
+# plain substring check shows it has nothing to do. Every tag, whatever its
+# name, spans "<" to the next ">", so the <p>/<li>/... pass is covered by the
+# generic one. Collapsing "[ \t]+" is done as tabs -> spaces plus "  +" -> " ",
+# which only touches actual runs instead of rewriting every single space.
+# Text where a "<" appears before the previous "<" was closed can make the
+# legacy passes interact (one removal forming a new tag), so it goes through
+# them unchanged.
+_BR_RE = re.compile(r"<\s*br\s*/?\s*>", re.I)
+_TAG_RE = re.compile(r"<[^>]+>")
+_NESTED_LT_RE = re.compile(r"<[^>]*<")
+_SPACES_RE = re.compile("  +")
+_BLANK_LINES_RE = re.compile("\n\n\n+")
+
+
+def _strip_html_keep_text_fast(s: str) -> str:
+    if "&" in s:
+        s = html.unescape(s)
+    if "<" in s:
+        if _NESTED_LT_RE.search(s):
+            return _strip_tags_legacy(s)
+        s = _TAG_RE.sub("", _BR_RE.sub("\n", s))
+    if "\t" in s:
+        s = s.replace("\t", " ")
+    if "  " in s:
+        s = _SPACES_RE.sub(" ", s)
+    if "\n\n\n" in s:
+        s = _BLANK_LINES_RE.sub("\n\n", s)
+    return s.strip()
+
+
+class _HtmlTextCache:
+    """
+    Bounded LRU memo for _strip_html_keep_text_fast, keyed by a digest of the
+    description (operators paste the same boilerplate across packages), so the
+    cache holds short keys rather than the raw HTML.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.entries: "OrderedDict[bytes, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, s: str) -> str:
+        key = hashlib.blake2b(s.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+        text = self.entries.get(key)
+        if text is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return text
+        self.misses += 1
+        text = self.entries[key] = _strip_html_keep_text_fast(s)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return text
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+_strip_html_keep_text = _HtmlTextCache()
+
+
 def _parse_decimal(v: Any) -> Optional[Decimal]:
     if v is None:
         return None
@@ -79,151 +207,58 @@ def _parse_decimal(v: Any) -> Optional[Decimal]:
     return None
 
 
-def _round_to_step(value: Decimal, step: int, rounding: str) -> int:
-    """
-    Convert Decimal -> integer multiple of `step`.
-    rounding: "ceil" | "nearest" | "floor"
-    """
-    if value is None:
-        return 0
-    x = float(value)
-    if step <= 0:
-        return int(round(x))
-    q = x / step
-    if rounding == "floor":
-        return int(math.floor(q) * step)
-    if rounding == "nearest":
-        return int(round(q) * step)
-    # default: ceil
-    return int(math.ceil(q) * step)
-
-
-def _split_tuples(values_blob: str) -> List[str]:
-    """
-    Split "(...),(...),(...)" into ["(...)", "(...)"] without breaking on commas in strings.
-    """
-    tuples: List[str] = []
-    i = 0
-    n = len(values_blob)
-    in_str = False
-    esc = False
-    depth = 0
-    start = None
-    while i < n:
-        ch = values_blob[i]
-        if in_str:
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == "'":
-                in_str = False
-        else:
-            if ch == "'":
-                in_str = True
-            elif ch == "(":
-                if depth == 0:
-                    start = i
-                depth += 1
-            elif ch == ")":
-                depth -= 1
-                if depth == 0 and start is not None:
-                    tuples.append(values_blob[start : i + 1])
-                    start = None
-        i += 1
-    return tuples
-
-
-def _split_fields(tuple_blob: str) -> List[str]:
-    """
-    Split "(a,b,'c,d',NULL)" (including parentheses) into raw field strings.
-    """
-    assert tuple_blob[0] == "(" and tuple_blob[-1] == ")"
-    inner = tuple_blob[1:-1]
-    fields: List[str] = []
-    buf: List[str] = []
-    in_str = False
-    esc = False
-    for ch in inner:
-        if in_str:
-            buf.append(ch)
-            if esc:
-                esc = False
-            elif ch == "\\":
-                esc = True
-            elif ch == "'":
-                in_str = False
-        else:
-            if ch == "'":
-                in_str = True
-                buf.append(ch)
-            elif ch == ",":
-                fields.append("".join(buf).strip())
-                buf = []
-            else:
-                buf.append(ch)
-    if buf:
-        fields.append("".join(buf).strip())
-    return fields
-
-
-def _coerce_value(raw: str) -> Any:
-    if raw.upper() == "NULL":
-        return None
-    if raw.startswith("'") and raw.endswith("'"):
-        return _unescape_mysql_string(raw[1:-1])
-    # numeric?
-    try:
-        if "." in raw:
-            return Decimal(raw)
-        return int(raw)
-    except Exception:
-        return raw
-
-
-def iter_inserts(sql_path: str, target_tables: Iterable[str]) -> Dict[str, List[List[Any]]]:
-    """
-    Returns dict: table -> list of parsed rows (as arrays in column order as in dump).
-    """
-    target = set(target_tables)
-    out: Dict[str, List[List[Any]]] = {t: [] for t in target}
-    with open(sql_path, "r", encoding="utf-8", errors="replace") as f:
-        current_table: Optional[str] = None
-        collecting: List[str] = []
-
-        for line in f:
-            line = line.rstrip("\n")
-            m = INSERT_RE.match(line)
-            if m:
-                tbl = m.group("table")
-                if tbl in target:
-                    current_table = tbl
-                    collecting = []
-                else:
-                    current_table = None
-                continue
+ROUNDING_MODES = {"ceil": ROUND_CEILING, "nearest": ROUND_HALF_EVEN, "floor": ROUND_FLOOR}
 
-            if current_table is None:
-                continue
 
-            collecting.append(line)
-            if line.endswith(";"):
-                blob = "\n".join(collecting)
-                # Remove trailing semicolon.
-                if blob.endswith(";"):
-                    blob = blob[:-1]
-                tuples = _split_tuples(blob)
-                for t in tuples:
-                    fields_raw = _split_fields(t)
-                    out[current_table].append([_coerce_value(x) for x in fields_raw])
-                current_table = None
-                collecting = []
+@dataclass(frozen=True)
+class PriceScenario:
+    usd_to_rwf: float
+    step: int
+    rounding: str  # "ceil" | "nearest" | "floor"
+
+    @property
+    def label(self) -> str:
+        # repr() is the shortest text that reads back as the same float, so two
+        # rates never share a label (":g" kept 6 digits, making 1312.345 and
+        # 1312.349 both fx1312.35); 1300.0 is still fx1300.
+        fx = repr(self.usd_to_rwf)
+        return f"fx{fx[:-2] if fx.endswith('.0') else fx}_step{self.step}_{self.rounding}"
 
-    return out
+
+def _price_tables(usd_values: Iterable[Decimal], scenarios: List[PriceScenario]) -> List[Dict[Decimal, int]]:
+    """
+    Convert every distinct USD price under every scenario in one batch and
+    return one {usd: rwf} lookup per scenario. Math is exact Decimal (no float
+    round-trip), and each distinct (price, scenario) pair is computed once no
+    matter how many packages/options share the price.
+
+    rwf = (usd * fx / step) rounded per scenario to an integer, times step; a
+    step <= 0 rounds to the nearest integer RWF instead.
+
+    This intentionally differs from the float math of earlier versions (single
+    scenario included) when usd * fx lands within float precision of a step
+    boundary, which takes a rate with many digits: at 1351.3513513513515
+    (1 / 0.00074), $24.42 is 33000.0000000000036 RWF, and ceil to 1000 gives
+    34000 where float gave 33000.
+    """
+    distinct = sorted(set(usd_values))
+    tables: List[Dict[Decimal, int]] = []
+    with localcontext() as ctx:
+        ctx.prec = 50
+        for sc in scenarios:
+            fx = Decimal(str(sc.usd_to_rwf))
+            if sc.step <= 0:
+                tables.append({v: int((v * fx).to_integral_value(ROUND_HALF_EVEN)) for v in distinct})
+                continue
+            step = Decimal(sc.step)
+            mode = ROUNDING_MODES[sc.rounding]
+            tables.append({v: int((v * fx / step).to_integral_value(mode)) * sc.step for v in distinct})
+    return tables
 
 
-@dataclass
-class Operator:
+# Tuple-backed records (no per-instance __dict__): there is one per operator,
+# package and option, and nothing mutates them after the join.
+class Operator(NamedTuple):
     legacy_id: int
     name: str
     phone: Optional[str]
@@ -234,8 +269,7 @@ class Operator:
     code: Optional[str]
 
 
-@dataclass
-class Package:
+class Package(NamedTuple):
     legacy_id: int
     slug: str
     name: str
@@ -246,8 +280,7 @@ class Package:
     status: Optional[str]
 
 
-@dataclass
-class Option:
+class Option(NamedTuple):
     legacy_id: int
     package_legacy_id: int
     name: str
@@ -255,138 +288,571 @@ class Option:
     price_usd: Optional[Decimal]
 
 
-def main() -> int:
+# Columns read from each table, by name (matched against the INSERT column lists).
+COLUMNS: Dict[str, List[str]] = {
+    "users": ["user_id", "name", "phone", "email", "profile_pic", "bio", "status", "code"],
+    "tour_packages": ["id", "code", "name", "description", "base_price", "cover_image", "seller_id", "status"],
+    "tour_package_options": ["id", "package_id", "name", "description", "price"],
+    "tour_package_categories": ["id", "code", "name", "description", "cover_image", "status"],
+    "tour_package_category_relations": ["package_id", "category_id"],
+}
+
+# Only tour operators are read from `users`; the parser drops other rows undecoded.
+WHERE: Dict[str, Any] = {"users": ("role", "==", "tour_operator")}
+
+# How the parsed tables are held (see sqldump.compact): ids and prices in
+# arrays, statuses interned, everything else as read.
+LAYOUT: Dict[str, Dict[str, str]] = {
+    "users": {"user_id": "int", "status": "intern"},
+    "tour_packages": {"id": "int", "base_price": "decimal", "seller_id": "int", "status": "intern"},
+    "tour_package_options": {"id": "int", "package_id": "int", "price": "decimal"},
+    "tour_package_categories": {"id": "int", "status": "intern"},
+    "tour_package_category_relations": {"package_id": "int", "category_id": "int"},
+}
+
+
+CSV_FIELDS = [
+    "package_legacy_id",
+    "slug",
+    "name",
+    "status",
+    "seller_legacy_id",
+    "seller_name",
+    "seller_email",
+    "seller_phone",
+    "category_primary",
+    "min_price_rwf",
+    "max_price_rwf",
+    "price_points_rwf",
+    "cover_image",
+]
+
+
+def _csv_row(r: Dict[str, Any]) -> Dict[str, Any]:
+    cats = r.get("categories") or []
+    return {
+        "package_legacy_id": r["package_legacy_id"],
+        "slug": r["slug"],
+        "name": r["name"],
+        "status": r["status"],
+        "seller_legacy_id": r["seller_legacy_id"],
+        "seller_name": r["seller_name"],
+        "seller_email": r["seller_email"],
+        "seller_phone": r["seller_phone"],
+        "category_primary": cats[0]["name"] if cats else "",
+        "min_price_rwf": r["min_price_rwf"],
+        "max_price_rwf": r["max_price_rwf"],
+        "price_points_rwf": ";".join(str(x) for x in r["price_points_rwf"]),
+        "cover_image": r["cover_image"],
+    }
+
+
+PROFILE_STAGES = ["parse", "join", "pricing", "normalize", "html_cleanup", "write"]
+
+
+def _arg_parser() -> argparse.ArgumentParser:
     ap = argparse.ArgumentParser()
     ap.add_argument("--input", default="/Users/macbookpro/Desktop/etike.sql")
-    ap.add_argument("--usd-to-rwf", type=float, default=1300.0, help="FX rate used for normalization.")
-    ap.add_argument("--step", type=int, default=5000, help="RWF rounding step.")
-    ap.add_argument("--rounding", choices=["ceil", "nearest", "floor"], default="ceil")
+    # Each pricing option takes one or more values; every combination is a
+    # scenario. The first one fills the main price fields, and with more than
+    # one every scenario is also written to etike_tours_price_scenarios.csv.
+    ap.add_argument("--usd-to-rwf", type=float, nargs="+", default=[1300.0], help="FX rate(s) used for normalization.")
+    ap.add_argument("--step", type=int, nargs="+", default=[5000], help="RWF rounding step(s).")
+    ap.add_argument("--rounding", choices=list(ROUNDING_MODES), nargs="+", default=["ceil"])
     ap.add_argument("--out-dir", default=os.path.join(os.getcwd(), "backend/scripts/etike/out"))
+    ap.add_argument(
+        "--ndjson",
+        help="Where to write one JSON row per line (default: <out-dir>/etike_tours_normalized.ndjson; "
+        "'-' streams to stdout, e.g. into import_etike_tours.ts --input -).",
+    )
+    ap.add_argument(
+        "--no-json",
+        action="store_true",
+        help="Skip the pretty-printed etike_tours_normalized.json array.",
+    )
+    ap.add_argument(
+        "--delta",
+        action="store_true",
+        help=(
+            "Also write etike_tours_delta.ndjson: only packages added/changed/deleted since the last imported "
+            "--delta run, and the new hashes to <manifest>.next.json."
+        ),
+    )
+    ap.add_argument(
+        "--manifest",
+        help="Per-package content hashes compared by --delta (default: <out-dir>/etike_tours_manifest.json).",
+    )
+    ap.add_argument(
+        "--ack-delta",
+        action="store_true",
+        help=(
+            "Record that the last --delta output was imported (promote <manifest>.next.json to the manifest) "
+            "and exit. import_etike_tours.ts --commit does this itself."
+        ),
+    )
+    ap.add_argument(
+        "--sqlite",
+        help="Bulk-load operators/packages/options/categories into this (recreated) SQLite file.",
+    )
+    ap.add_argument(
+        "--pg-copy-dir",
+        help=(
+            "Write the same tables as COPY-ready CSVs plus load.sql (psql -f <dir>/load.sql), "
+            "which loads them into the etike_import schema."
+        ),
+    )
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parse INSERT statements in N processes (output is identical to N=1).",
+    )
+    ap.add_argument(
+        "--cache-dir",
+        default=default_cache_dir(),
+        help="Where parsed tables are cached between runs (keyed by dump size/mtime/hash).",
+    )
+    ap.add_argument("--no-cache", action="store_true", help="Always re-parse the dump.")
+    ap.add_argument(
+        "--index",
+        action="store_true",
+        help=(
+            "Seek to the tables via the dump's <input>.idx.json byte-offset index. Building it is a full extra "
+            "pass over a new dump, so it only pays off when the same dump is exported again and again."
+        ),
+    )
+    # The index used to be on by default; --no-index is still accepted.
+    ap.add_argument("--no-index", dest="index", action="store_false", help=argparse.SUPPRESS)
+    ap.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        help="Bound the join's memory: stream the dump (no cache) and spill join partitions to disk past MB.",
+    )
+    ap.add_argument("--spill-dir", help="Where --memory-budget spills partitions (default: the system temp dir).")
+    ap.add_argument(
+        "--spill-partitions",
+        type=int,
+        default=DEFAULT_PARTITIONS,
+        help="Hash partitions for --memory-budget; raise it when one partition alone does not fit.",
+    )
+    ap.add_argument(
+        "--checkpoint-every",
+        type=float,
+        metavar="SECONDS",
+        help=f"Save parsing progress to --checkpoint this often (default with --resume: {CHECKPOINT_EVERY:g}).",
+    )
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run from its --checkpoint (outputs are the same as an uninterrupted run).",
+    )
+    ap.add_argument(
+        "--checkpoint",
+        help="Checkpoint file for --checkpoint-every/--resume (default: <out-dir>/etike_export.checkpoint); "
+        "removed once the outputs are written.",
+    )
+    ap.add_argument(
+        "--profile",
+        action="store_true",
+        help="Write per-stage wall/CPU time, rows, bytes and peak RSS growth to <out-dir>/etike_export_profile.json.",
+    )
+    ap.add_argument(
+        "--profile-stage",
+        choices=PROFILE_STAGES,
+        help="Also run this stage under cProfile (implies --profile; stats go next to the report as .prof).",
+    )
+    ap.add_argument(
+        "--bench-scanner",
+        action="store_true",
+        help="Only benchmark the VALUES scanner on --input against SCANNER_TARGET_MBPS/SPEEDUP.",
+    )
+    return ap
+
+
+def main() -> int:
+    ap = _arg_parser()
     args = ap.parse_args()
+    # A repeated value would give two scenarios with the same label, one
+    # overwriting the other's columns.
+    for option, values in (("--usd-to-rwf", args.usd_to_rwf), ("--step", args.step), ("--rounding", args.rounding)):
+        repeated = sorted({v for v in values if values.count(v) > 1}, key=values.index)
+        if repeated:
+            ap.error(f"{option} lists {', '.join(map(str, repeated))} more than once")
+    checkpoint = None
+    if args.resume or args.checkpoint_every is not None:
+        if args.memory_budget is not None:
+            ap.error("--checkpoint-every/--resume cannot be combined with --memory-budget")
+        checkpoint = args.checkpoint or os.path.join(args.out_dir, "etike_export.checkpoint")
+
+    if args.ack_delta:
+        manifest = args.manifest or os.path.join(args.out_dir, "etike_tours_manifest.json")
+        if not promote_manifest(manifest):
+            print(f"No {next_manifest_path(manifest)} to acknowledge (run --delta first).", file=sys.stderr)
+            return 1
+        print(f"Delta acknowledged: {manifest} updated.")
+        return 0
 
-    tables = iter_inserts(
-        args.input,
-        target_tables=[
-            "users",
-            "tour_packages",
-            "tour_package_options",
-            "tour_package_categories",
-            "tour_package_category_relations",
-        ],
+    if args.bench_scanner:
+        r = benchmark_scanner(args.input)
+        ok = r["fused_mb_s"] >= SCANNER_TARGET_MBPS and r["speedup"] >= SCANNER_TARGET_SPEEDUP
+        print(f"VALUES scanned: {r['values_mb']:.1f} MB, {int(r['fields'])} fields")
+        print(f"- legacy _split_tuples + _split_fields: {r['legacy_mb_s']:.1f} MB/s")
+        print(f"- fused _scan_tuple                   : {r['fused_mb_s']:.1f} MB/s ({r['speedup']:.1f}x)")
+        print(
+            f"{'✅' if ok else '❌'} target: >= {SCANNER_TARGET_MBPS:.0f} MB/s "
+            f"and >= {SCANNER_TARGET_SPEEDUP:.0f}x legacy"
+        )
+        return 0 if ok else 1
+
+    prof = Profiler(enabled=args.profile or bool(args.profile_stage), hot_stage=args.profile_stage)
+    prof.meta["input"] = os.path.abspath(args.input)
+
+    # Only the columns used below are copied out of each row, and only the users
+    # rows we keep are decoded; the parser skips the rest without decoding it.
+    if args.memory_budget is not None:
+        index = load_index(args.input) if args.index and not compression(args.input) else None
+        rows = iter_rows(args.input, COLUMNS, workers=args.workers, index=index, columns=COLUMNS, where=WHERE)
+        return export_bounded(args, rows, prof, index)
+
+    with prof.stage("parse") as st:
+        tables = cached_inserts(
+            args.input,
+            cache_dir=None if args.no_cache else args.cache_dir,
+            workers=args.workers,
+            use_index=args.index,
+            target_tables=list(COLUMNS),
+            columns=COLUMNS,
+            where=WHERE,
+            layout=LAYOUT,
+            checkpoint=checkpoint,
+            checkpoint_every=args.checkpoint_every,
+            resume=args.resume,
+        )
+        st.rows = sum(len(rows) for rows in tables.values())
+        st.bytes = os.path.getsize(args.input)
+    if prof.enabled:
+        # A cache hit never needed the index; sizes are reported only if one is saved already.
+        _profile_tables(prof, {t: len(tables[t]) for t in COLUMNS}, saved_index(args.input))
+
+    code = export(args, tables, prof)
+    if checkpoint is not None and code == 0 and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return code
+
+
+def _profile_tables(prof: Profiler, counts: Mapping[str, int], index: Optional[Mapping[str, Any]]) -> None:
+    """Rows read per COLUMNS table, with its INSERT bytes when the dump's index is at hand."""
+    for t in COLUMNS:
+        entry = index.get(t) if index is not None else None
+        prof.table(t, counts.get(t, 0), entry.insert_bytes if entry is not None else None)
+
+
+def _operator(row: Sequence[Any]) -> Operator:
+    user_id, name, phone, email, profile_pic, bio, status, code = row
+    return Operator(
+        legacy_id=int(user_id),
+        name=str(name or "").strip(),
+        phone=(str(phone).strip() if phone is not None else None),
+        email=(str(email).strip() if email is not None else None),
+        bio=(str(bio).strip() if bio is not None else None),
+        profile_pic=(str(profile_pic).strip() if profile_pic is not None else None),
+        status=(str(status).strip() if status is not None else None),
+        code=(str(code).strip() if code is not None else None),
     )
 
-    # Parse operators from `users` rows:
-    # columns: user_id, name, phone, email, password, profile_pic, bio, token, role, status, registration_date, code
-    operators: Dict[int, Operator] = {}
-    for row in tables["users"]:
-        if len(row) < 12:
-            continue
-        role = row[8]
-        if role != "tour_operator":
-            continue
-        legacy_id = int(row[0])
-        operators[legacy_id] = Operator(
-            legacy_id=legacy_id,
-            name=str(row[1] or "").strip(),
-            phone=(str(row[2]).strip() if row[2] is not None else None),
-            email=(str(row[3]).strip() if row[3] is not None else None),
-            bio=(str(row[6]).strip() if row[6] is not None else None),
-            profile_pic=(str(row[5]).strip() if row[5] is not None else None),
-            status=(str(row[9]).strip() if row[9] is not None else None),
-            code=(str(row[11]).strip() if row[11] is not None else None),
-        )
 
-    # Parse packages:
-    # columns: id, code, name, description, base_price, cover_image, seller_id, status, created_by, updated_by, created_at, updated_at
-    packages: Dict[int, Package] = {}
-    for row in tables["tour_packages"]:
-        if len(row) < 12:
-            continue
-        legacy_id = int(row[0])
-        packages[legacy_id] = Package(
-            legacy_id=legacy_id,
-            slug=str(row[1] or "").strip(),
-            name=str(row[2] or "").strip(),
-            description_raw=(str(row[3]) if row[3] is not None else None),
-            base_price_usd=_parse_decimal(row[4]),
-            cover_image=(str(row[5]).strip() if row[5] is not None else None),
-            seller_legacy_id=int(row[6]),
-            status=(str(row[7]).strip() if row[7] is not None else None),
-        )
+def _package(row: Sequence[Any]) -> Package:
+    pid, code, name, description, base_price, cover_image, seller_id, status = row
+    return Package(
+        legacy_id=int(pid),
+        slug=str(code or "").strip(),
+        name=str(name or "").strip(),
+        description_raw=(str(description) if description is not None else None),
+        base_price_usd=_parse_decimal(base_price),
+        cover_image=(str(cover_image).strip() if cover_image is not None else None),
+        seller_legacy_id=int(seller_id),
+        status=(str(status).strip() if status is not None else None),
+    )
+
+
+def _option(row: Sequence[Any]) -> Option:
+    oid, package_id, name, description, price = row
+    return Option(
+        legacy_id=int(oid),
+        package_legacy_id=int(package_id),
+        name=str(name or "").strip(),
+        description=(str(description).strip() if description is not None else None),
+        price_usd=_parse_decimal(price),
+    )
+
+
+def _category(row: Sequence[Any]) -> Dict[str, Any]:
+    cid, code, name, description, cover_image, status = row
+    return {
+        "legacy_id": int(cid),
+        "slug": str(code or "").strip(),
+        "name": str(name or "").strip(),
+        "description": (str(description).strip() if description is not None else None),
+        "cover_image": (str(cover_image).strip() if cover_image is not None else None),
+        "status": (str(status).strip() if status is not None else None),
+    }
+
+
+def _usd_points(pkg: Package, opts: List[Option]) -> List[Decimal]:
+    # Price points: prefer options if present; else base_price.
+    usd_points = [o.price_usd for o in opts if o.price_usd is not None]
+    if not usd_points and pkg.base_price_usd is not None:
+        usd_points = [pkg.base_price_usd]
+    return usd_points
+
+
+class Joined(NamedTuple):
+    """One package with everything joined to it; options and categories in dump order."""
+
+    package: Package
+    seller: Optional[Operator]
+    options: List[Option]
+    categories: List[Dict[str, Any]]
+    usd_points: List[Decimal]
+
+
+class JoinResult(NamedTuple):
+    packages: Iterable[Joined]  # by package legacy_id
+    operators: int
+    package_count: int
+    with_options: int
+    usd_values: Set[Decimal]
+
+
+def _join(tables: Dict[str, Rows]) -> JoinResult:
+    """Join the parsed COLUMNS tables in memory."""
+    # Only tour operators are read from `users`, see WHERE.
+    operators = {op.legacy_id: op for op in map(_operator, tables["users"])}
+    packages = {pkg.legacy_id: pkg for pkg in map(_package, tables["tour_packages"])}
 
-    # Parse options:
-    # columns: id, package_id, name, description, price, created_at, updated_at
     options_by_package: Dict[int, List[Option]] = {}
-    for row in tables["tour_package_options"]:
-        if len(row) < 7:
-            continue
-        opt = Option(
-            legacy_id=int(row[0]),
-            package_legacy_id=int(row[1]),
-            name=str(row[2] or "").strip(),
-            description=(str(row[3]).strip() if row[3] is not None else None),
-            price_usd=_parse_decimal(row[4]),
-        )
+    for opt in map(_option, tables["tour_package_options"]):
         options_by_package.setdefault(opt.package_legacy_id, []).append(opt)
 
-    # Categories + relations
-    # categories columns: id, code, name, description, cover_image, status, created_by, updated_by, created_at, updated_at
-    categories: Dict[int, Dict[str, Any]] = {}
-    for row in tables["tour_package_categories"]:
-        if len(row) < 10:
-            continue
-        cid = int(row[0])
-        categories[cid] = {
-            "legacy_id": cid,
-            "slug": str(row[1] or "").strip(),
-            "name": str(row[2] or "").strip(),
-            "description": (str(row[3]).strip() if row[3] is not None else None),
-            "cover_image": (str(row[4]).strip() if row[4] is not None else None),
-            "status": (str(row[5]).strip() if row[5] is not None else None),
-        }
-
-    # relations columns: id, package_id, category_id, created_at
+    categories = {c["legacy_id"]: c for c in map(_category, tables["tour_package_categories"])}
     package_categories: Dict[int, List[int]] = {}
-    for row in tables["tour_package_category_relations"]:
-        if len(row) < 4:
-            continue
-        pkg_id = int(row[1])
-        cat_id = int(row[2])
-        package_categories.setdefault(pkg_id, []).append(cat_id)
-
-    fx = Decimal(str(args.usd_to_rwf))
+    for package_id, category_id in tables["tour_package_category_relations"]:
+        package_categories.setdefault(int(package_id), []).append(int(category_id))
 
-    out_rows: List[Dict[str, Any]] = []
+    joined: List[Joined] = []
+    usd_values: Set[Decimal] = set()
     for pkg in sorted(packages.values(), key=lambda p: p.legacy_id):
-        seller = operators.get(pkg.seller_legacy_id)
         opts = options_by_package.get(pkg.legacy_id, [])
-        cat_ids = package_categories.get(pkg.legacy_id, [])
-        cats = [categories[c] for c in cat_ids if c in categories]
-
-        # Price points: prefer options if present; else base_price.
-        usd_points: List[Decimal] = []
-        for o in opts:
-            if o.price_usd is not None:
-                usd_points.append(o.price_usd)
-        if not usd_points and pkg.base_price_usd is not None:
-            usd_points = [pkg.base_price_usd]
-
-        rwf_points = sorted(
-            {
-                _round_to_step((p * fx), args.step, args.rounding)
-                for p in usd_points
-                if p is not None
-            }
+        cats = [categories[c] for c in package_categories.get(pkg.legacy_id, []) if c in categories]
+        usd_points = _usd_points(pkg, opts)
+        usd_values.update(usd_points)
+        joined.append(Joined(pkg, operators.get(pkg.seller_legacy_id), opts, cats, usd_points))
+    with_options = sum(1 for p in packages if options_by_package.get(p))
+    return JoinResult(joined, len(operators), len(packages), with_options, usd_values)
+
+
+class SpillingJoin:
+    """
+    The same join as _join() for dumps that do not fit in memory: rows are
+    streamed in (any table order) with add(); packages, options and relations
+    are hash-partitioned by package id and spill to disk past their share of
+    `memory_budget` bytes (see sqldump.spill). run() then joins one partition at
+    a time into runs sorted by package id, and merges the runs. Operators (tour operators
+    only) and categories are small and stay in memory. The result is identical
+    to _join() on the same rows.
+    """
+
+    def __init__(self, memory_budget: int, partitions: int = DEFAULT_PARTITIONS, tmp_dir: Optional[str] = None):
+        # run() fills the runs while partitions not joined yet are still
+        # buffered, so each gets half the budget.
+        share = memory_budget // 2
+        self.parts = Partitions(partitions, share, tmp_dir)
+        self.runs = Partitions(partitions, share, tmp_dir)
+        self.operators: Dict[int, Operator] = {}
+        self.categories: Dict[int, Dict[str, Any]] = {}
+
+    def add(self, table: str, row: Sequence[Any]) -> None:
+        if table == "tour_packages":
+            self.parts.add(int(row[0]), ("p", row))
+        elif table == "tour_package_options":
+            self.parts.add(int(row[1]), ("o", row))
+        elif table == "tour_package_category_relations":
+            self.parts.add(int(row[0]), ("c", int(row[1])))
+        elif table == "users":
+            op = _operator(row)
+            self.operators[op.legacy_id] = op
+        elif table == "tour_package_categories":
+            cat = _category(row)
+            self.categories[cat["legacy_id"]] = cat
+
+    def run(self) -> JoinResult:
+        package_count = with_options = 0
+        usd_values: Set[Decimal] = set()
+        for i in range(self.parts.n):
+            # package id -> [last package row, option rows, category ids]
+            groups: Dict[int, List[Any]] = {}
+            for key, (kind, value) in self.parts.partition(i):
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = [None, [], []]
+                if kind == "p":
+                    group[0] = value
+                elif kind == "o":
+                    group[1].append(value)
+                else:
+                    group[2].append(value)
+            self.parts.drop(i)
+
+            for key in sorted(k for k, g in groups.items() if g[0] is not None):
+                row, option_rows, cat_ids = groups.pop(key)
+                pkg = _package(row)
+                opts = [_option(r) for r in option_rows]
+                cats = [self.categories[c] for c in cat_ids if c in self.categories]
+                usd_points = _usd_points(pkg, opts)
+                usd_values.update(usd_points)
+                package_count += 1
+                with_options += bool(opts)
+                self.runs.add_to(i, Joined(pkg, self.operators.get(pkg.seller_legacy_id), opts, cats, usd_points))
+
+        merged = heapq.merge(
+            *(self.runs.partition(i) for i in range(self.runs.n)), key=lambda j: j.package.legacy_id
+        )
+        return JoinResult(merged, len(self.operators), package_count, with_options, usd_values)
+
+    def close(self) -> None:
+        self.parts.close()
+        self.runs.close()
+
+    def __enter__(self) -> "SpillingJoin":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def export(args: argparse.Namespace, tables: Dict[str, Rows], prof: Profiler) -> int:
+    """Normalize the parsed COLUMNS tables and write every output; returns the exit code."""
+    with prof.stage("join") as st:
+        joined = _join(tables)
+        st.rows = joined.package_count
+    return _write_outputs(args, joined, prof)
+
+
+def export_bounded(
+    args: argparse.Namespace,
+    rows: Iterable[Tuple[str, Sequence[Any]]],
+    prof: Profiler,
+    index: Optional[Mapping[str, Any]] = None,
+) -> int:
+    """
+    export() for --memory-budget: `rows` (table, row) are streamed into a
+    SpillingJoin instead of being held as tables. Same outputs. `index` is the
+    dump index the rows were read with, if any (for table sizes in the profile).
+    """
+    budget = int(args.memory_budget * (1 << 20))
+    counts = dict.fromkeys(COLUMNS, 0)
+    with SpillingJoin(budget, args.spill_partitions, args.spill_dir) as join:
+        # Partitioning happens as rows arrive, so it is timed as part of parsing.
+        with prof.stage("parse") as st:
+            for table, row in rows:
+                join.add(table, row)
+                counts[table] += 1
+            st.rows = sum(counts.values())
+            st.bytes = os.path.getsize(args.input)
+        if prof.enabled:
+            _profile_tables(prof, counts, index)
+        with prof.stage("join") as st:
+            joined = join.run()
+            st.rows = joined.package_count
+        records, spills, spilled = join.parts.stats()
+        _, run_spills, run_spilled = join.runs.stats()
+        prof.meta["spill"] = {
+            "memory_budget_bytes": budget,
+            "partitions": args.spill_partitions,
+            "records": records,
+            "spills": spills + run_spills,
+            "spilled_bytes": spilled + run_spilled,
+        }
+        spill = (
+            f"{records} rows in {args.spill_partitions} partitions, "
+            f"{spills + run_spills} spills, {(spilled + run_spilled) / (1 << 20):.1f} MB to disk "
+            f"(budget {args.memory_budget:g} MB)"
         )
+        return _write_outputs(args, joined, prof, spill)
 
-        min_rwf = rwf_points[0] if rwf_points else 0
-        max_rwf = rwf_points[-1] if rwf_points else 0
 
-        desc_raw = pkg.description_raw or ""
-        desc_clean = _strip_html_keep_text(desc_raw) if desc_raw else ""
+def _write_outputs(args: argparse.Namespace, joined: JoinResult, prof: Profiler, spill: Optional[str] = None) -> int:
+    scenarios = [
+        PriceScenario(fx, step, rounding)
+        for fx, step, rounding in itertools.product(args.usd_to_rwf, args.step, args.rounding)
+    ]
+    primary = scenarios[0]
 
-        out_rows.append(
-            {
+    with prof.stage("pricing") as st:
+        price_tables = _price_tables(joined.usd_values, scenarios)
+        st.rows = len(price_tables[0]) * len(scenarios)
+    to_rwf = price_tables[0]
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    json_path = None if args.no_json else os.path.join(args.out_dir, "etike_tours_normalized.json")
+    ndjson_path = args.ndjson or os.path.join(args.out_dir, "etike_tours_normalized.ndjson")
+    csv_path = os.path.join(args.out_dir, "etike_tours_normalized.csv")
+    scenarios_path = (
+        os.path.join(args.out_dir, "etike_tours_price_scenarios.csv") if len(scenarios) > 1 else None
+    )
+
+    # Every row goes to all sinks as soon as it is built and is then dropped, so
+    # the output stage never holds more than one package.
+    sinks: List[Sink] = [NdjsonSink(ndjson_path), CsvSink(csv_path, CSV_FIELDS, _csv_row)]
+    if json_path:
+        sinks.append(JsonArraySink(json_path))
+    if args.sqlite:
+        sinks.append(SqliteSink(args.sqlite))
+    if args.pg_copy_dir:
+        sinks.append(PgCopySink(args.pg_copy_dir))
+    delta: Optional[DeltaSink] = None
+    if args.delta:
+        delta = DeltaSink(
+            os.path.join(args.out_dir, "etike_tours_delta.ndjson"),
+            args.manifest or os.path.join(args.out_dir, "etike_tours_manifest.json"),
+        )
+        sinks.append(delta)
+    scenario_sinks: List[Sink] = []
+    if scenarios_path:
+        scenario_fields = ["package_legacy_id", "slug"]
+        for sc in scenarios:
+            scenario_fields += [
+                f"min_price_rwf@{sc.label}",
+                f"max_price_rwf@{sc.label}",
+                f"price_points_rwf@{sc.label}",
+            ]
+        scenario_sinks.append(CsvSink(scenarios_path, scenario_fields))
+
+    with prof.stage("normalize") as norm, FanOut(sinks) as out, FanOut(scenario_sinks) as scenario_out:
+        for pkg, seller, opts, cats, usd_points in joined.packages:
+            rwf_points = sorted({to_rwf[p] for p in usd_points})
+
+            min_rwf = rwf_points[0] if rwf_points else 0
+            max_rwf = rwf_points[-1] if rwf_points else 0
+
+            if len(scenarios) > 1:
+                scenario_row: Dict[str, Any] = {"package_legacy_id": pkg.legacy_id, "slug": pkg.slug}
+                for sc, table in zip(scenarios, price_tables):
+                    points = sorted({table[p] for p in usd_points})
+                    scenario_row[f"min_price_rwf@{sc.label}"] = points[0] if points else 0
+                    scenario_row[f"max_price_rwf@{sc.label}"] = points[-1] if points else 0
+                    scenario_row[f"price_points_rwf@{sc.label}"] = ";".join(str(x) for x in points)
+                with prof.stage("write"):
+                    scenario_out.write(scenario_row)
+
+            desc_raw = pkg.description_raw or ""
+            with prof.stage("html_cleanup") as st:
+                desc_clean = _strip_html_keep_text(desc_raw) if desc_raw else ""
+                st.rows += 1
+                st.bytes += len(desc_raw)
+
+            row = {
                 "package_legacy_id": pkg.legacy_id,
                 "slug": pkg.slug,
                 "name": pkg.name,
@@ -401,9 +867,9 @@ def main() -> int:
                 "cover_image": pkg.cover_image,
                 "base_price_usd": (str(pkg.base_price_usd) if pkg.base_price_usd is not None else None),
                 "currency": "RWF",
-                "fx_rate_usd_to_rwf": float(args.usd_to_rwf),
-                "rounding_step_rwf": args.step,
-                "rounding_mode": args.rounding,
+                "fx_rate_usd_to_rwf": float(primary.usd_to_rwf),
+                "rounding_step_rwf": primary.step,
+                "rounding_mode": primary.rounding,
                 "price_points_rwf": rwf_points,
                 "min_price_rwf": min_rwf,
                 "max_price_rwf": max_rwf,
@@ -414,75 +880,71 @@ def main() -> int:
                         "name": o.name,
                         "description": o.description,
                         "price_usd": (str(o.price_usd) if o.price_usd is not None else None),
-                        "price_rwf": (
-                            _round_to_step((o.price_usd * fx), args.step, args.rounding)
-                            if o.price_usd is not None
-                            else None
-                        ),
+                        "price_rwf": (to_rwf[o.price_usd] if o.price_usd is not None else None),
                     }
                     for o in sorted(opts, key=lambda x: x.legacy_id)
                 ],
             }
+            with prof.stage("write") as st:
+                out.write(row)
+                st.rows += 1
+            norm.rows += 1
+
+        # Flushing the buffers (and building SQLite indexes) is part of writing.
+        with prof.stage("write"):
+            out.close()
+            scenario_out.close()
+
+    # With --ndjson - the rows own stdout; the summary goes to stderr.
+    log = sys.stderr if ndjson_path == "-" else sys.stdout
+    print("✅ Export complete", file=log)
+    print(f"- Operators (tour_operator role): {joined.operators}", file=log)
+    print(f"- Packages: {joined.package_count}", file=log)
+    print(f"- Packages with options: {joined.with_options}", file=log)
+    print(
+        f"- Description cleanup cache: {_strip_html_keep_text.hits}/"
+        f"{_strip_html_keep_text.hits + _strip_html_keep_text.misses} hits "
+        f"({_strip_html_keep_text.hit_rate:.0%})",
+        file=log,
+    )
+    print(f"- Output NDJSON: {'<stdout>' if ndjson_path == '-' else ndjson_path}", file=log)
+    if json_path:
+        print(f"- Output JSON  : {json_path}", file=log)
+    print(f"- Output CSV   : {csv_path}", file=log)
+    if args.sqlite:
+        print(f"- SQLite       : {args.sqlite}", file=log)
+    if args.pg_copy_dir:
+        print(f"- Postgres COPY: {os.path.join(args.pg_copy_dir, 'load.sql')}", file=log)
+    if delta:
+        c = delta.counts
+        print(
+            f"- Delta        : {delta.path} (+{c['added']} ~{c['changed']} -{c['deleted']}, "
+            f"{c['unchanged']} unchanged)",
+            file=log,
         )
+        print(f"  new hashes   : {next_manifest_path(delta.manifest_path)} (the baseline once imported)", file=log)
+    if spill:
+        print(f"- Join spill   : {spill}", file=log)
+    if scenarios_path:
+        print(f"- Price scenarios ({len(scenarios)}): {scenarios_path}", file=log)
+    if prof.enabled:
+        profile_path = os.path.join(args.out_dir, "etike_export_profile.json")
+        prof.write(profile_path)
+        print(f"- Profile      : {profile_path}", file=log)
+        for line in prof.summary():
+            print(f"  {line}", file=log)
+    return 0
 
-    os.makedirs(args.out_dir, exist_ok=True)
-
-    json_path = os.path.join(args.out_dir, "etike_tours_normalized.json")
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(out_rows, f, ensure_ascii=False, indent=2)
 
-    csv_path = os.path.join(args.out_dir, "etike_tours_normalized.csv")
-    with open(csv_path, "w", encoding="utf-8", newline="") as f:
-        w = csv.DictWriter(
-            f,
-            fieldnames=[
-                "package_legacy_id",
-                "slug",
-                "name",
-                "status",
-                "seller_legacy_id",
-                "seller_name",
-                "seller_email",
-                "seller_phone",
-                "category_primary",
-                "min_price_rwf",
-                "max_price_rwf",
-                "price_points_rwf",
-                "cover_image",
-            ],
-        )
-        w.writeheader()
-        for r in out_rows:
-            cats = r.get("categories") or []
-            primary = cats[0]["name"] if cats else ""
-            w.writerow(
-                {
-                    "package_legacy_id": r["package_legacy_id"],
-                    "slug": r["slug"],
-                    "name": r["name"],
-                    "status": r["status"],
-                    "seller_legacy_id": r["seller_legacy_id"],
-                    "seller_name": r["seller_name"],
-                    "seller_email": r["seller_email"],
-                    "seller_phone": r["seller_phone"],
-                    "category_primary": primary,
-                    "min_price_rwf": r["min_price_rwf"],
-                    "max_price_rwf": r["max_price_rwf"],
-                    "price_points_rwf": ";".join(str(x) for x in r["price_points_rwf"]),
-                    "cover_image": r["cover_image"],
-                }
-            )
-
-    print("✅ Export complete")
-    print(f"- Operators (tour_operator role): {len(operators)}")
-    print(f"- Packages: {len(packages)}")
-    print(f"- Packages with options: {sum(1 for p in packages if options_by_package.get(p))}")
-    print(f"- Output JSON: {json_path}")
-    print(f"- Output CSV : {csv_path}")
-    return 0
+def register(scan: Scan, out_dir: str) -> Callable[[], int]:
+    """
+    Pipeline hook for `python3 -m sqldump scan`: subscribe to the export's
+    tables on a shared scan, then export with default options into `out_dir`.
+    """
+    args = _arg_parser().parse_args(["--input", scan.sql_path, "--out-dir", out_dir])
+    subs = {t: scan.subscribe(t, cols, WHERE.get(t), layout=LAYOUT.get(t)) for t, cols in COLUMNS.items()}
+    return lambda: export(args, {t: sub.rows for t, sub in subs.items()}, Profiler(enabled=False))
 
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
-
@@ -15,11 +15,25 @@
  *     --input ./scripts/etike/out/etike_tours_normalized.json \
  *     --countryCode2 RW \
  *     --commit
+ *
+ *   # Import while the export is still running (NDJSON rows on stdin):
+ *   python3 scripts/etike/export_etike_tours.py --input ~/Desktop/etike.sql --ndjson - \
+ *     | DATABASE_URL="..." node -r ts-node/register scripts/etike/import_etike_tours.ts --input -
+ *
+ * For recurring syncs, import the --delta output (etike_tours_delta.ndjson) instead: only
+ * added/changed packages are upserted, and tours of packages gone from Etike are soft-deleted.
+ * After a --commit import of a delta, the export's next manifest (etike_tours_manifest.next.json,
+ * next to the input; --manifest <path> if the export was given one) becomes the baseline of the
+ * next --delta run. A dry run or a failed import leaves the baseline alone, so the next delta
+ * still contains these changes.
+ *
+ * --input accepts the JSON array, an .ndjson/.jsonl file, or "-" for NDJSON on stdin.
  */
 
 import { PrismaClient, user_role, tour_status } from '@prisma/client';
 import * as fs from 'fs';
 import * as path from 'path';
+import * as readline from 'readline';
 import * as bcrypt from 'bcrypt';
 
 type EtikeCategory = { slug: string; name: string };
@@ -48,6 +62,8 @@ type EtikeTourRow = {
   description_clean?: string;
   description_raw?: string;
   options?: EtikeOption[];
+  // Set on rows of etike_tours_delta.ndjson (export --delta). Deleted rows only carry package_legacy_id.
+  change?: 'added' | 'changed' | 'deleted';
 };
 
 function getArg(name: string): string | undefined {
@@ -60,6 +76,12 @@ function hasFlag(name: string): boolean {
   return process.argv.includes(name);
 }
 
+// Same naming as next_manifest_path() in sinks.py: x.json -> x.next.json.
+function nextManifestPath(manifestPath: string): string {
+  const ext = path.extname(manifestPath);
+  return manifestPath.slice(0, manifestPath.length - ext.length) + '.next' + ext;
+}
+
 function clampSlug(slug: string): string {
   const s = (slug || '').trim();
   return s.length > 240 ? s.slice(0, 240) : s;
@@ -99,20 +121,40 @@ function makeTempPassword(): string {
   return `Zoea${part}24`;
 }
 
+function isNdjson(input: string): boolean {
+  return input === '-' || /\.(ndjson|jsonl)$/i.test(input);
+}
+
+// Yields rows one at a time; NDJSON input is consumed line by line as it arrives.
+async function* readRows(input: string): AsyncGenerator<EtikeTourRow> {
+  if (!isNdjson(input)) {
+    const rows: EtikeTourRow[] = JSON.parse(fs.readFileSync(input, 'utf-8'));
+    yield* rows;
+    return;
+  }
+  const stream = input === '-' ? process.stdin : fs.createReadStream(input, { encoding: 'utf-8' });
+  const lines = readline.createInterface({ input: stream, crlfDelay: Infinity });
+  for await (const line of lines) {
+    if (line.trim()) yield JSON.parse(line) as EtikeTourRow;
+  }
+}
+
 async function main() {
   const input = getArg('--input') || path.join(process.cwd(), 'scripts/etike/out/etike_tours_normalized.json');
   const commit = hasFlag('--commit');
   const outDir = getArg('--outDir') || path.join(process.cwd(), 'scripts/etike/out');
   const countryCode2 = (getArg('--countryCode2') || 'RW').toUpperCase();
   const dryRun = !commit;
+  const manifestArg = getArg('--manifest');
+  const manifestPath =
+    manifestArg || (input !== '-' ? path.join(path.dirname(input), 'etike_tours_manifest.json') : undefined);
+  // An empty delta has no rows to recognise it by.
+  let isDelta = input !== '-' && path.basename(input) === 'etike_tours_delta.ndjson';
 
-  if (!fs.existsSync(input)) {
+  if (input !== '-' && !fs.existsSync(input)) {
     throw new Error(`Input not found: ${input}`);
   }
 
-  const raw = fs.readFileSync(input, 'utf-8');
-  const rows: EtikeTourRow[] = JSON.parse(raw);
-
   const prisma = new PrismaClient();
 
   const rwanda = await prisma.country.findFirst({
@@ -127,7 +169,7 @@ async function main() {
   const credsOut: Array<{ seller_legacy_id: number; seller_name: string; email: string; phone: string; temp_password: string }> = [];
 
   const stats = {
-    inputRows: rows.length,
+    inputRows: 0,
     skippedDeleted: 0,
     uniqueSellers: 0,
     usersWouldCreate: 0,
@@ -138,6 +180,7 @@ async function main() {
     categoriesWouldCreate: 0,
     mediaWouldCreate: 0,
     tourImagesWouldCreate: 0,
+    toursWouldDelete: 0,
   };
 
   // Cache categories by slug
@@ -317,7 +360,29 @@ async function main() {
     return cached;
   }
 
-  for (const row of rows) {
+  for await (const row of readRows(input)) {
+    stats.inputRows += 1;
+    if (row.change) isDelta = true;
+    if (row.change === 'deleted') {
+      const gone: Array<{ id: string }> = await prisma.$queryRaw`
+        SELECT id
+        FROM tours
+        WHERE itinerary->>'source' = 'etike'
+          AND (itinerary->'legacy'->>'packageId')::int = ${row.package_legacy_id}
+          AND deleted_at IS NULL
+      `;
+      stats.toursWouldDelete += gone.length;
+      if (!dryRun) {
+        for (const d of gone) {
+          await prisma.tour.update({
+            where: { id: d.id },
+            data: { deletedAt: new Date(), status: 'inactive' },
+          });
+        }
+      }
+      continue;
+    }
+
     if ((row.status || '').toLowerCase() === 'deleted') {
       stats.skippedDeleted += 1;
       continue;
@@ -482,6 +547,21 @@ async function main() {
 
   await prisma.$disconnect();
 
+  if (!dryRun && isDelta) {
+    // Only now that every row is in: the next --delta run compares against this export.
+    const nextPath = manifestPath ? nextManifestPath(manifestPath) : undefined;
+    if (manifestPath && nextPath && fs.existsSync(nextPath)) {
+      fs.renameSync(nextPath, manifestPath);
+      // eslint-disable-next-line no-console
+      console.log(`📌 Delta baseline updated: ${manifestPath}`);
+    } else {
+      // eslint-disable-next-line no-console
+      console.warn(
+        `⚠️ No ${nextPath || '<manifest>.next.json'} to promote; pass --manifest, or run export_etike_tours.py --ack-delta.`,
+      );
+    }
+  }
+
   // eslint-disable-next-line no-console
   console.log(`Country used: ${country.name} (${country.code2}/${country.code})`);
   // eslint-disable-next-line no-console
@@ -0,0 +1,501 @@
+"""
+Streaming output sinks for export_etike_tours.py.
+
+Each normalized package is handed to every sink as soon as it is built, so the
+output stage holds one row at a time no matter how large the catalog is. Files
+are written through large buffers (one bulk write per BUFFER_SIZE bytes rather
+than one per row), to `<path>.tmp`, and only renamed over `<path>` when the
+export completes: a failed export removes its temporary files and leaves the
+previous outputs as they were.
+
+- JsonArraySink: the pretty-printed JSON array (byte-identical to
+  json.dump(rows, f, ensure_ascii=False, indent=2)).
+- NdjsonSink: one compact JSON object per line; "-" writes to stdout, so a
+  consumer can read rows while the export is still running.
+- CsvSink: a flat CSV, one row per package via a caller-supplied converter.
+- DeltaSink: only the packages added, changed or deleted since the previous
+  run, judged by per-package content hashes kept in a manifest file.
+- SqliteSink / PgCopySink: the same rows split into keyed relational tables
+  (operators, packages, options, categories), bulk-loaded into SQLite with
+  batched executemany, or written as COPY-ready CSVs plus a load.sql for
+  Postgres that loads them into their own schema (etike_import). Keys and
+  indexes are built after the load.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+from abc import ABC, abstractmethod
+from typing import IO, Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+BUFFER_SIZE = 1 << 20
+BATCH_SIZE = 5000
+
+Row = Dict[str, Any]
+
+
+def _tmp(path: str) -> str:
+    return path + ".tmp"
+
+
+def _open(path: str, newline: Optional[str] = None) -> IO[str]:
+    """Open `path`'s temporary file for writing; _finish() or _discard() it."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return open(_tmp(path), "w", encoding="utf-8", newline=newline, buffering=BUFFER_SIZE)
+
+
+def _finish(f: IO[str], path: str) -> None:
+    f.close()
+    os.replace(_tmp(path), path)
+
+
+def _discard(f: IO[str], path: str) -> None:
+    f.close()
+    try:
+        os.remove(_tmp(path))
+    except FileNotFoundError:
+        pass
+
+
+class Sink(ABC):
+    """Instantiating a sink that lacks any of these raises TypeError, before the export starts."""
+
+    path: str
+
+    @abstractmethod
+    def write(self, row: Row) -> None:
+        ...
+
+    @abstractmethod
+    def close(self) -> None:
+        """The export completed: finish the output and put it in place."""
+
+    @abstractmethod
+    def abort(self) -> None:
+        """Called instead of close() when the export failed part-way."""
+
+
+class JsonArraySink(Sink):
+    def __init__(self, path: str):
+        self.path = path
+        self.f = _open(path)
+        self.count = 0
+
+    def write(self, row: Row) -> None:
+        # json.dump(..., indent=2) of the whole list nests each element one level
+        # deeper; JSON strings never contain a raw newline, so re-indenting every
+        # line of the element by two spaces gives the same bytes.
+        body = json.dumps(row, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+        self.f.write(("[\n  " if self.count == 0 else ",\n  ") + body)
+        self.count += 1
+
+    def close(self) -> None:
+        self.f.write("\n]" if self.count else "[]")
+        _finish(self.f, self.path)
+
+    def abort(self) -> None:
+        # Never write the closing "]": a truncated array must not look complete.
+        _discard(self.f, self.path)
+
+
+class NdjsonSink(Sink):
+    def __init__(self, path: str):
+        self.path = path
+        self.to_stdout = path == "-"
+        self.f = sys.stdout if self.to_stdout else _open(path)
+
+    def write(self, row: Row) -> None:
+        self.f.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        if self.to_stdout:
+            self.f.flush()
+        else:
+            _finish(self.f, self.path)
+
+    def abort(self) -> None:
+        if self.to_stdout:
+            self.f.flush()
+        else:
+            _discard(self.f, self.path)
+
+
+class CsvSink(Sink):
+    def __init__(self, path: str, fieldnames: Sequence[str], convert: Optional[Callable[[Row], Row]] = None):
+        self.path = path
+        self.f = _open(path, newline="")
+        self.convert = convert
+        self.w = csv.DictWriter(self.f, fieldnames=list(fieldnames))
+        self.w.writeheader()
+
+    def write(self, row: Row) -> None:
+        self.w.writerow(self.convert(row) if self.convert is not None else row)
+
+    def close(self) -> None:
+        _finish(self.f, self.path)
+
+    def abort(self) -> None:
+        _discard(self.f, self.path)
+
+
+def content_hash(row: Row) -> str:
+    """Stable hash of a row: key order and whitespace do not matter."""
+    canon = json.dumps(row, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canon.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def load_manifest(path: str) -> Dict[int, str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    return {int(k): v for k, v in data["packages"].items()}
+
+
+def next_manifest_path(manifest_path: str) -> str:
+    """Where a --delta run leaves its manifest until the delta is imported: x.json -> x.next.json."""
+    root, ext = os.path.splitext(manifest_path)
+    return f"{root}.next{ext}"
+
+
+def promote_manifest(manifest_path: str) -> bool:
+    """
+    Make the manifest of the last --delta run the baseline of the next one;
+    call once its delta has been imported. False if there is none to promote.
+    """
+    try:
+        os.replace(next_manifest_path(manifest_path), manifest_path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+class DeltaSink(Sink):
+    """
+    NDJSON of added/changed rows (the full row plus "change") and, on close,
+    {"package_legacy_id": ..., "change": "deleted"} for every package in the
+    previous manifest that was not seen.
+
+    The hashes of this run go to next_manifest_path(manifest_path), not over the
+    manifest: the baseline only moves once the delta has been imported
+    (import_etike_tours.ts --commit, or export_etike_tours.py --ack-delta, calls
+    promote_manifest). Until then every --delta run is compared with the last
+    imported state, so a delta that was never imported, or only dry-run, is
+    included again in the next one instead of being lost.
+    """
+
+    def __init__(self, path: str, manifest_path: str, key: str = "package_legacy_id"):
+        self.path = path
+        self.manifest_path = manifest_path
+        self.key = key
+        self.previous = load_manifest(manifest_path)
+        self.current: Dict[int, str] = {}
+        self.counts = {"added": 0, "changed": 0, "unchanged": 0, "deleted": 0}
+        self.f = _open(path)
+
+    def _emit(self, row: Row, change: str) -> None:
+        self.counts[change] += 1
+        self.f.write(json.dumps({**row, "change": change}, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+    def write(self, row: Row) -> None:
+        key = int(row[self.key])
+        digest = content_hash(row)
+        self.current[key] = digest
+        old = self.previous.get(key)
+        if old is None:
+            self._emit(row, "added")
+        elif old != digest:
+            self._emit(row, "changed")
+        else:
+            self.counts["unchanged"] += 1
+
+    def close(self) -> None:
+        for key in sorted(self.previous.keys() - self.current.keys()):
+            self._emit({self.key: key}, "deleted")
+        _finish(self.f, self.path)
+
+        next_path = next_manifest_path(self.manifest_path)
+        f = _open(next_path)
+        json.dump({"version": 1, "packages": {str(k): v for k, v in sorted(self.current.items())}}, f)
+        _finish(f, next_path)
+
+    def abort(self) -> None:
+        _discard(self.f, self.path)
+
+
+# (column, SQL type) per table; types are valid in both SQLite and Postgres.
+# Prices are exact decimal strings: NUMERIC in Postgres, TEXT in SQLite (see
+# SQLITE_TYPES).
+TABLES: Dict[str, List[Tuple[str, str]]] = {
+    "operators": [
+        ("legacy_id", "BIGINT"),
+        ("name", "TEXT"),
+        ("email", "TEXT"),
+        ("phone", "TEXT"),
+        ("profile_pic", "TEXT"),
+        ("bio", "TEXT"),
+    ],
+    "packages": [
+        ("legacy_id", "BIGINT"),
+        ("slug", "TEXT"),
+        ("name", "TEXT"),
+        ("status", "TEXT"),
+        ("seller_legacy_id", "BIGINT"),
+        ("cover_image", "TEXT"),
+        ("base_price_usd", "NUMERIC"),
+        ("currency", "TEXT"),
+        ("min_price_rwf", "BIGINT"),
+        ("max_price_rwf", "BIGINT"),
+        ("price_points_rwf", "TEXT"),
+        ("description_clean", "TEXT"),
+        ("description_raw", "TEXT"),
+    ],
+    "package_options": [
+        ("package_legacy_id", "BIGINT"),
+        ("position", "INTEGER"),
+        ("name", "TEXT"),
+        ("description", "TEXT"),
+        ("price_usd", "NUMERIC"),
+        ("price_rwf", "BIGINT"),
+    ],
+    "categories": [
+        ("slug", "TEXT"),
+        ("name", "TEXT"),
+    ],
+    "package_categories": [
+        ("package_legacy_id", "BIGINT"),
+        ("category_slug", "TEXT"),
+        ("position", "INTEGER"),
+    ],
+}
+
+# Built after the load: (table, columns, unique). For Postgres the first unique
+# index of each table is added as its primary key instead.
+INDEXES: List[Tuple[str, Tuple[str, ...], bool]] = [
+    ("operators", ("legacy_id",), True),
+    ("packages", ("legacy_id",), True),
+    ("packages", ("seller_legacy_id",), False),
+    ("package_options", ("package_legacy_id", "position"), True),
+    ("categories", ("slug",), True),
+    ("package_categories", ("package_legacy_id", "category_slug"), True),
+    ("package_categories", ("category_slug",), False),
+]
+
+
+# SQLite gives NUMERIC columns numeric affinity and would store "12.50" as the
+# REAL 12.5; as TEXT the price keeps the exact digits the export computed.
+SQLITE_TYPES: Dict[str, str] = {"NUMERIC": "TEXT"}
+
+# Postgres schema load.sql creates and loads the tables in. It is never the
+# Zoea application's schema (that has its own `categories`), and load.sql drops
+# nothing outside it.
+PG_SCHEMA = "etike_import"
+
+
+def _qualified(table: str, schema: Optional[str]) -> str:
+    return f"{schema}.{table}" if schema else table
+
+
+def _create_table_sql(table: str, schema: Optional[str] = None, types: Optional[Mapping[str, str]] = None) -> str:
+    types = types or {}
+    cols = ", ".join(f"{name} {types.get(typ, typ)}" for name, typ in TABLES[table])
+    return f"CREATE TABLE {_qualified(table, schema)} ({cols})"
+
+
+def _index_sql(table: str, cols: Tuple[str, ...], unique: bool, schema: Optional[str] = None) -> str:
+    # The index is created in its table's schema, so its name stays unqualified.
+    name = f"{table}_{'_'.join(cols)}_{'key' if unique else 'idx'}"
+    return f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {_qualified(table, schema)} ({', '.join(cols)})"
+
+
+class _RowSplitter:
+    """Turn one normalized package row into (table, values) tuples for TABLES."""
+
+    def __init__(self) -> None:
+        self.seen_operators: Set[int] = set()
+        self.seen_categories: Set[str] = set()
+
+    def __call__(self, row: Row) -> Iterator[Tuple[str, Tuple[Any, ...]]]:
+        pid = row["package_legacy_id"]
+        seller = row["seller_legacy_id"]
+        if seller not in self.seen_operators and row.get("seller_name") is not None:
+            self.seen_operators.add(seller)
+            yield "operators", (
+                seller,
+                row["seller_name"],
+                row.get("seller_email"),
+                row.get("seller_phone"),
+                row.get("seller_profile_pic"),
+                row.get("seller_bio"),
+            )
+        yield "packages", (
+            pid,
+            row["slug"],
+            row["name"],
+            row["status"],
+            seller,
+            row["cover_image"],
+            row["base_price_usd"],
+            row["currency"],
+            row["min_price_rwf"],
+            row["max_price_rwf"],
+            ";".join(str(x) for x in row["price_points_rwf"]),
+            row["description_clean"],
+            row["description_raw"],
+        )
+        for i, o in enumerate(row.get("options") or []):
+            yield "package_options", (pid, i, o["name"], o["description"], o["price_usd"], o["price_rwf"])
+        linked: Set[str] = set()
+        for i, c in enumerate(row.get("categories") or []):
+            slug = c["slug"]
+            if slug not in self.seen_categories:
+                self.seen_categories.add(slug)
+                yield "categories", (slug, c["name"])
+            if slug not in linked:
+                linked.add(slug)
+                yield "package_categories", (pid, slug, i)
+
+
+class SqliteSink(Sink):
+    """
+    Bulk-load into a fresh SQLite file: one transaction, executemany per
+    BATCH_SIZE rows of a table, indexes created once the data is in.
+    """
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Built in <path>.tmp (left over only by a killed run) and renamed on close.
+        if os.path.exists(_tmp(path)):
+            os.remove(_tmp(path))
+        self.conn = sqlite3.connect(_tmp(path), isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.execute("BEGIN")
+        for table in TABLES:
+            self.conn.execute(_create_table_sql(table, types=SQLITE_TYPES))
+        self.insert_sql = {
+            t: f"INSERT INTO {t} VALUES ({', '.join('?' * len(cols))})" for t, cols in TABLES.items()
+        }
+        self.pending: Dict[str, List[Tuple[Any, ...]]] = {t: [] for t in TABLES}
+        self.counts: Dict[str, int] = {t: 0 for t in TABLES}
+        self.split = _RowSplitter()
+
+    def _flush(self, table: str) -> None:
+        batch = self.pending[table]
+        if batch:
+            self.conn.executemany(self.insert_sql[table], batch)
+            self.counts[table] += len(batch)
+            batch.clear()
+
+    def write(self, row: Row) -> None:
+        for table, values in self.split(row):
+            batch = self.pending[table]
+            batch.append(values)
+            if len(batch) >= self.batch_size:
+                self._flush(table)
+
+    def close(self) -> None:
+        for table in TABLES:
+            self._flush(table)
+        for table, cols, unique in INDEXES:
+            self.conn.execute(_index_sql(table, cols, unique))
+        self.conn.execute("COMMIT")
+        self.conn.execute("ANALYZE")
+        self.conn.close()
+        os.replace(_tmp(self.path), self.path)
+
+    def abort(self) -> None:
+        self.conn.close()
+        os.remove(_tmp(self.path))
+
+
+class PgCopySink(Sink):
+    """
+    One CSV per table in `path` (a directory) plus load.sql, which creates the
+    tables in their own schema (`schema`, PG_SCHEMA by default), \\copy-loads
+    the CSVs and only then adds keys and indexes. Re-running it replaces the
+    tables of that schema and nothing else:
+
+      psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f <path>/load.sql
+
+    The rows are then in etike_import.operators, etike_import.packages, ...
+    """
+
+    NULL = "\\N"
+
+    def __init__(self, path: str, schema: str = PG_SCHEMA):
+        self.path = path
+        self.schema = schema
+        os.makedirs(path, exist_ok=True)
+        self.files = {t: _open(os.path.join(path, f"{t}.csv"), newline="") for t in TABLES}
+        self.writers = {t: csv.writer(f) for t, f in self.files.items()}
+        self.split = _RowSplitter()
+
+    def write(self, row: Row) -> None:
+        null = self.NULL
+        for table, values in self.split(row):
+            self.writers[table].writerow([null if v is None else v for v in values])
+
+    def close(self) -> None:
+        for t, f in self.files.items():
+            _finish(f, os.path.join(self.path, f"{t}.csv"))
+        schema = self.schema
+        lines = ["BEGIN;", f"CREATE SCHEMA IF NOT EXISTS {schema};"]
+        lines += [f"DROP TABLE IF EXISTS {_qualified(t, schema)};" for t in TABLES]
+        lines += [_create_table_sql(t, schema) + ";" for t in TABLES]
+        for t in TABLES:
+            src = os.path.abspath(os.path.join(self.path, f"{t}.csv")).replace("'", "''")
+            lines.append(f"\\copy {_qualified(t, schema)} FROM '{src}' WITH (FORMAT csv, NULL '{self.NULL}')")
+        keyed: Set[str] = set()
+        for table, cols, unique in INDEXES:
+            if unique and table not in keyed:
+                keyed.add(table)
+                lines.append(f"ALTER TABLE {_qualified(table, schema)} ADD PRIMARY KEY ({', '.join(cols)});")
+            else:
+                lines.append(_index_sql(table, cols, unique, schema) + ";")
+        lines.append("COMMIT;")
+        lines += [f"ANALYZE {_qualified(t, schema)};" for t in TABLES]
+        load_sql = os.path.join(self.path, "load.sql")
+        f = _open(load_sql)
+        f.write("\n".join(lines) + "\n")
+        _finish(f, load_sql)
+
+    def abort(self) -> None:
+        for t, f in self.files.items():
+            _discard(f, os.path.join(self.path, f"{t}.csv"))
+
+
+class FanOut:
+    """Write each row to several sinks; closing it closes them all."""
+
+    def __init__(self, sinks: List[Sink]):
+        self.sinks = sinks
+
+    def write(self, row: Row) -> None:
+        for sink in self.sinks:
+            sink.write(row)
+
+    def close(self) -> None:
+        # Idempotent, so callers can close (and time the final flush) inside the `with`.
+        sinks, self.sinks = self.sinks, []
+        for sink in sinks:
+            sink.close()
+
+    def __enter__(self) -> "FanOut":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            sinks, self.sinks = self.sinks, []
+            for sink in sinks:
+                sink.abort()
@@ -0,0 +1,160 @@
+"""
+Pricing and whole runs of export_etike_tours.py. Run from backend/scripts/etike:
+python3 -m unittest test_export
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+from typing import Dict, List, Sequence
+
+from export_etike_tours import PriceScenario, _price_tables
+from sqldump.synth import generate
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "export_etike_tours.py")
+
+# Runs the export in a child that SIGKILLs itself once checkpoint save number
+# argv[1] is on disk; the export's own arguments follow.
+_KILLED_EXPORT = """
+import os, runpy, signal, sys
+etike = os.path.dirname(sys.argv[2])
+sys.path[:0] = [etike, os.path.dirname(etike)]
+from sqldump import checkpoint
+kill_after = int(sys.argv[1])
+save = checkpoint._Writer.save
+def save_then_die(self, position, batch):
+    save(self, position, batch)
+    if self.saves == kill_after:
+        os.kill(os.getpid(), signal.SIGKILL)
+checkpoint._Writer.save = save_then_die
+sys.argv = sys.argv[2:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def _prices(usd: List[str], fx: float, step: int, rounding: str) -> List[int]:
+    [table] = _price_tables([Decimal(u) for u in usd], [PriceScenario(fx, step, rounding)])
+    return [table[Decimal(u)] for u in usd]
+
+
+class RoundingTest(unittest.TestCase):
+    def test_ceil(self) -> None:
+        self.assertEqual(_prices(["24.42", "0", "3.85"], 1300.0, 5000, "ceil"), [35000, 0, 10000])
+        # 0.07 * 100 is 7.000000000000001 in floats, which rounded up to 8.
+        self.assertEqual(_prices(["0.07"], 100.0, 1, "ceil"), [7])
+        # Exact Decimal math: 33000.0000000000036 RWF is over the 33000 step.
+        self.assertEqual(_prices(["24.42"], 1351.3513513513515, 1000, "ceil"), [34000])
+
+    def test_nearest(self) -> None:
+        self.assertEqual(_prices(["24.42", "3.85"], 1300.0, 5000, "nearest"), [30000, 5000])
+        # Halves go to the even step: 0.5 of a step down to 0, 1.5 up to 2.
+        self.assertEqual(_prices(["2.50", "7.50"], 1000.0, 5000, "nearest"), [0, 10000])
+        # 1.015 * 100 is 101.49999999999999 in floats, which rounded to 101.
+        self.assertEqual(_prices(["1.015"], 100.0, 1, "nearest"), [102])
+
+    def test_floor(self) -> None:
+        self.assertEqual(_prices(["24.42", "3.85"], 1300.0, 5000, "floor"), [30000, 5000])
+        # 0.29 * 100 is 28.999999999999996 in floats, which rounded down to 28.
+        self.assertEqual(_prices(["0.29"], 100.0, 1, "floor"), [29])
+        self.assertEqual(_prices(["24.42"], 1351.3513513513515, 1000, "floor"), [33000])
+
+    def test_no_step_rounds_to_the_nearest_franc(self) -> None:
+        for rounding in ("ceil", "nearest", "floor"):
+            self.assertEqual(_prices(["1.015", "0.0025"], 100.0, 0, rounding), [102, 0])
+
+    def test_one_table_per_scenario(self) -> None:
+        scenarios = [PriceScenario(1300.0, 5000, "ceil"), PriceScenario(1400.0, 1000, "floor")]
+        tables = _price_tables([Decimal("10.00"), Decimal("10.00"), Decimal("99.99")], scenarios)
+        self.assertEqual(
+            tables,
+            [{Decimal("10.00"): 15000, Decimal("99.99"): 130000}, {Decimal("10.00"): 14000, Decimal("99.99"): 139000}],
+        )
+
+
+class ExportModesTest(unittest.TestCase):
+    """Every way of running the export writes the same bytes."""
+
+    OUTPUTS = [
+        "etike_tours_normalized.json",
+        "etike_tours_normalized.ndjson",
+        "etike_tours_normalized.csv",
+        "etike_tours_price_scenarios.csv",
+    ]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.dump = os.path.join(cls.tmp.name, "etike.sql")
+        generate(cls.dump, 0.3, seed=4, rows_per_insert=10)
+        with open(cls.dump, "rb") as src, gzip.open(cls.dump + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        cls.runs = 0
+        cls.expected = cls._outputs(cls._export(["--no-cache"]))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp.cleanup()
+
+    @classmethod
+    def _export(cls, options: List[str], dump: str = "", prefix: Sequence[str] = ()) -> str:
+        cls.runs += 1
+        out_dir = os.path.join(cls.tmp.name, f"out{cls.runs}")
+        argv = [SCRIPT, "--input", dump or cls.dump, "--out-dir", out_dir, "--usd-to-rwf", "1300", "1351.35"]
+        done = subprocess.run([sys.executable, *prefix, *argv, *options], capture_output=True, text=True)
+        if prefix:
+            assert done.returncode == -signal.SIGKILL, done.stderr
+        else:
+            assert done.returncode == 0, done.stderr
+        return out_dir
+
+    @classmethod
+    def _outputs(cls, out_dir: str) -> Dict[str, bytes]:
+        outputs = {}
+        for name in cls.OUTPUTS:
+            with open(os.path.join(out_dir, name), "rb") as f:
+                outputs[name] = f.read()
+        return outputs
+
+    def assertSameOutputs(self, out_dir: str) -> None:
+        self.assertEqual(self._outputs(out_dir), self.expected)
+
+    def test_workers(self) -> None:
+        self.assertSameOutputs(self._export(["--no-cache", "--workers", "2"]))
+
+    def test_index(self) -> None:
+        self.assertSameOutputs(self._export(["--no-cache", "--index"]))
+        self.assertTrue(os.path.exists(self.dump + ".idx.json"))
+
+    def test_cache(self) -> None:
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        for _ in ("miss", "hit"):
+            self.assertSameOutputs(self._export(["--cache-dir", cache_dir]))
+        self.assertTrue(os.listdir(cache_dir))
+
+    def test_compressed_input(self) -> None:
+        self.assertSameOutputs(self._export(["--no-cache"], dump=self.dump + ".gz"))
+
+    def test_spill(self) -> None:
+        for options in (["--memory-budget", "0.01"], ["--memory-budget", "0.01", "--workers", "2"]):
+            with self.subTest(options=options):
+                self.assertSameOutputs(self._export(options))
+
+    def test_resume_after_kill(self) -> None:
+        checkpoint = os.path.join(self.tmp.name, "export.checkpoint")
+        options = ["--no-cache", "--checkpoint", checkpoint, "--checkpoint-every", "0", "--resume"]
+        self._export(options, prefix=["-c", _KILLED_EXPORT, "20"])
+        self.assertTrue(os.path.exists(checkpoint))
+        self.assertSameOutputs(self._export(options))
+        self.assertFalse(os.path.exists(checkpoint))
+
+
+if __name__ == "__main__":
+    unittest.main()
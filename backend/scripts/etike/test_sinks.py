@@ -0,0 +1,243 @@
+"""
+Output sinks of export_etike_tours.py. Run from backend/scripts/etike:
+python3 -m unittest test_sinks
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from typing import Any, Dict, List, Optional
+
+from sinks import (
+    CsvSink,
+    DeltaSink,
+    FanOut,
+    JsonArraySink,
+    NdjsonSink,
+    PG_SCHEMA,
+    PgCopySink,
+    Row,
+    Sink,
+    SqliteSink,
+    load_manifest,
+    next_manifest_path,
+    promote_manifest,
+)
+
+# Exact decimal strings as the export writes them, including ones a REAL
+# cannot hold (trailing zeros, more digits than a double keeps).
+PRICES = ["947.90", "0.10", "10", "12345678901234.99", "0.30"]
+
+
+def _row(pid: int, base_price_usd: Optional[str], option_prices: List[Optional[str]]) -> Dict[str, Any]:
+    return {
+        "package_legacy_id": pid,
+        "seller_legacy_id": 1,
+        "seller_name": "Operator",
+        "slug": f"package-{pid}",
+        "name": f"Package {pid}",
+        "status": "active",
+        "cover_image": None,
+        "base_price_usd": base_price_usd,
+        "currency": "USD",
+        "min_price_rwf": 0,
+        "max_price_rwf": 0,
+        "price_points_rwf": [],
+        "description_clean": "",
+        "description_raw": "",
+        "options": [
+            {"name": f"Option {i}", "description": None, "price_usd": p, "price_rwf": None}
+            for i, p in enumerate(option_prices)
+        ],
+        "categories": [],
+    }
+
+
+class TextSinksTest(unittest.TestCase):
+    def test_rows_read_back(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        rows = [_row(1, "947.90", ["10", None]), _row(2, None, [])]
+        json_path, ndjson_path, csv_path = (os.path.join(tmp.name, f"rows.{ext}") for ext in ("json", "ndjson", "csv"))
+        with FanOut(
+            [
+                JsonArraySink(json_path),
+                NdjsonSink(ndjson_path),
+                CsvSink(csv_path, ["slug", "base_price_usd"], lambda r: {k: r[k] for k in ("slug", "base_price_usd")}),
+            ]
+        ) as out:
+            for row in rows:
+                out.write(row)
+
+        with open(json_path, encoding="utf-8") as f:
+            text = f.read()
+        # Byte for byte what json.dump of the whole list writes.
+        self.assertEqual(text, json.dumps(rows, ensure_ascii=False, indent=2))
+        with open(ndjson_path, encoding="utf-8") as f:
+            self.assertEqual([json.loads(line) for line in f], rows)
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            self.assertEqual(
+                list(csv.reader(f)), [["slug", "base_price_usd"], ["package-1", "947.90"], ["package-2", ""]]
+            )
+
+    def test_empty_json_array(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "rows.json")
+        JsonArraySink(path).close()
+        with open(path) as f:
+            self.assertEqual(json.load(f), [])
+
+
+class PgCopySinkTest(unittest.TestCase):
+    def test_load_sql_stays_in_its_schema(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        sink = PgCopySink(tmp.name)
+        sink.write(_row(1, "947.90", ["10"]))
+        sink.close()
+        with open(os.path.join(tmp.name, "load.sql")) as f:
+            load_sql = f.read()
+        self.assertIn(f"CREATE SCHEMA IF NOT EXISTS {PG_SCHEMA};", load_sql)
+        for line in load_sql.splitlines():
+            if line.startswith(("DROP", "CREATE TABLE", "\\copy", "ANALYZE", "ALTER")):
+                self.assertIn(f"{PG_SCHEMA}.", line)
+        with open(os.path.join(tmp.name, "packages.csv"), newline="") as f:
+            [package] = list(csv.reader(f))
+        self.assertIn("947.90", package)
+
+
+class SqliteSinkTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "etike.db")
+
+    def test_prices_round_trip_exactly(self) -> None:
+        sink = SqliteSink(self.path)
+        for pid, price in enumerate(PRICES, 1):
+            sink.write(_row(pid, price, [price, None]))
+        sink.write(_row(len(PRICES) + 1, None, []))
+        sink.close()
+
+        conn = sqlite3.connect(self.path)
+        self.addCleanup(conn.close)
+        packages = conn.execute("SELECT base_price_usd, typeof(base_price_usd) FROM packages ORDER BY legacy_id")
+        self.assertEqual(packages.fetchall(), [(p, "text") for p in PRICES] + [(None, "null")])
+        options = conn.execute(
+            "SELECT price_usd FROM package_options WHERE price_usd IS NOT NULL ORDER BY package_legacy_id"
+        )
+        self.assertEqual([p for (p,) in options], PRICES)
+
+
+class AbortTest(unittest.TestCase):
+    def test_failed_export_leaves_previous_outputs(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        d = tmp.name
+        paths = [os.path.join(d, name) for name in ("rows.json", "rows.ndjson", "rows.csv", "rows.db")]
+        pg_dir = os.path.join(d, "pg")
+        os.makedirs(pg_dir)
+        for path in paths + [os.path.join(pg_dir, "load.sql")]:
+            with open(path, "w") as f:
+                f.write("previous")
+
+        def sinks() -> FanOut:
+            return FanOut(
+                [
+                    JsonArraySink(paths[0]),
+                    NdjsonSink(paths[1]),
+                    CsvSink(paths[2], ["slug"], lambda r: {"slug": r["slug"]}),
+                    SqliteSink(paths[3]),
+                    PgCopySink(pg_dir),
+                ]
+            )
+
+        with self.assertRaises(RuntimeError):
+            with sinks() as out:
+                out.write(_row(1, "1.00", []))
+                raise RuntimeError("export failed")
+        for path in paths + [os.path.join(pg_dir, "load.sql")]:
+            with open(path) as f:
+                self.assertEqual(f.read(), "previous")
+        self.assertEqual(sorted(os.listdir(d)), ["pg", "rows.csv", "rows.db", "rows.json", "rows.ndjson"])
+        self.assertEqual(os.listdir(pg_dir), ["load.sql"])
+
+        with sinks() as out:
+            out.write(_row(1, "1.00", []))
+        with open(paths[0]) as f:
+            self.assertTrue(f.read().startswith("[\n  {"))
+        self.assertFalse([name for name in os.listdir(d) + os.listdir(pg_dir) if name.endswith(".tmp")])
+
+
+class DeltaManifestTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.delta = os.path.join(tmp.name, "delta.ndjson")
+        self.manifest = os.path.join(tmp.name, "manifest.json")
+
+    def _run(self, rows: List[Row]) -> Dict[str, int]:
+        sink = DeltaSink(self.delta, self.manifest)
+        for row in rows:
+            sink.write(row)
+        sink.close()
+        return sink.counts
+
+    def test_baseline_moves_only_when_promoted(self) -> None:
+        self.assertFalse(promote_manifest(self.manifest))
+        self.assertEqual(self._run([_row(1, "1.00", [])])["added"], 1)
+        self.assertFalse(os.path.exists(self.manifest))
+        self.assertEqual(list(load_manifest(next_manifest_path(self.manifest))), [1])
+
+        # Not imported yet: the next run still reports the package.
+        self.assertEqual(self._run([_row(1, "1.00", [])])["added"], 1)
+        self.assertTrue(promote_manifest(self.manifest))
+        self.assertFalse(os.path.exists(next_manifest_path(self.manifest)))
+        self.assertEqual(self._run([_row(1, "1.00", [])])["unchanged"], 1)
+
+    def test_added_changed_deleted(self) -> None:
+        self._run([_row(1, "1.00", []), _row(2, "2.00", ["2.50"]), _row(3, "3.00", [])])
+        promote_manifest(self.manifest)
+
+        # 1 unchanged (keys in another order), 2 repriced, 3 gone, 4 new.
+        same = dict(reversed(list(_row(1, "1.00", []).items())))
+        counts = self._run([_row(4, "4.00", []), same, _row(2, "2.00", ["2.75"])])
+        self.assertEqual(counts, {"added": 1, "changed": 1, "unchanged": 1, "deleted": 1})
+        with open(self.delta, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(
+            [(r["package_legacy_id"], r["change"]) for r in lines], [(4, "added"), (2, "changed"), (3, "deleted")]
+        )
+        self.assertEqual(lines[1]["options"][0]["price_usd"], "2.75")
+        self.assertEqual(lines[2], {"package_legacy_id": 3, "change": "deleted"})
+        self.assertEqual(sorted(load_manifest(next_manifest_path(self.manifest))), [1, 2, 4])
+
+        # Once imported, nothing is left to send.
+        promote_manifest(self.manifest)
+        counts = self._run([_row(4, "4.00", []), same, _row(2, "2.00", ["2.75"])])
+        self.assertEqual(counts, {"added": 0, "changed": 0, "unchanged": 3, "deleted": 0})
+        with open(self.delta, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "")
+
+
+class IncompleteSinkTest(unittest.TestCase):
+    def test_rejected_when_constructed(self) -> None:
+        class NoAbort(Sink):
+            def write(self, row: Row) -> None:
+                pass
+
+            def close(self) -> None:
+                pass
+
+        with self.assertRaises(TypeError):
+            NoAbort()
+
+
+if __name__ == "__main__":
+    unittest.main()
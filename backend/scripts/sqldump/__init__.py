@@ -0,0 +1,64 @@
+"""
+Shared reader for the legacy MariaDB/phpMyAdmin SQL dumps (etike.sql, zoea.sql).
+
+Plain, .gz, .bz2 and .xz dumps are all accepted (see sqldump.compressed).
+
+Used by backend/scripts/etike/export_etike_tours.py and
+backend/src/migration/archive/extract-sponsored.py.
+"""
+
+from .cache import cached_inserts, default_cache_dir
+from .checkpoint import CHECKPOINT_EVERY, checkpointed_inserts
+from .compact import Interner, Rows, Table
+from .compressed import compression, open_decompressed
+from .diff import Change, DumpDiff
+from .index import DumpIndex, TableEntry, load_index, saved_index
+from .parser import (
+    CHUNK_SIZE,
+    SCANNER_TARGET_MBPS,
+    SCANNER_TARGET_SPEEDUP,
+    WHERE_OPS,
+    Position,
+    Predicate,
+    benchmark_scanner,
+    iter_inserts,
+    iter_rows,
+    iter_statements,
+)
+from .profiling import Profiler
+from .scan import Scan, Subscription
+from .spill import DEFAULT_PARTITIONS, Partitions, SortedRuns
+
+__all__ = [
+    "CHECKPOINT_EVERY",
+    "CHUNK_SIZE",
+    "Change",
+    "DEFAULT_PARTITIONS",
+    "DumpDiff",
+    "DumpIndex",
+    "Interner",
+    "Partitions",
+    "Position",
+    "Predicate",
+    "Profiler",
+    "Rows",
+    "SCANNER_TARGET_MBPS",
+    "SCANNER_TARGET_SPEEDUP",
+    "Scan",
+    "SortedRuns",
+    "Subscription",
+    "Table",
+    "TableEntry",
+    "WHERE_OPS",
+    "benchmark_scanner",
+    "cached_inserts",
+    "checkpointed_inserts",
+    "compression",
+    "default_cache_dir",
+    "iter_inserts",
+    "iter_rows",
+    "iter_statements",
+    "load_index",
+    "open_decompressed",
+    "saved_index",
+]
@@ -0,0 +1,33 @@
+"""
+Command-line entry points:
+
+  cd backend/scripts
+  python3 -m sqldump index /path/to/dump.sql
+  python3 -m sqldump synth /tmp/synth.sql --size-mb 100
+  python3 -m sqldump scan /path/to/dump.sql --pipeline script.py --subscribe "table:col1,col2"
+  python3 -m sqldump bench --sizes 10 100 1000 --output bench.json
+  python3 -m sqldump diff /path/to/old.sql /path/to/new.sql --tables venues > changes.ndjson
+"""
+
+import sys
+
+from . import bench, diff, index, scan, synth
+
+COMMANDS = {
+    "bench": bench.main,
+    "diff": diff.main,
+    "index": index.main,
+    "scan": scan.main,
+    "synth": synth.main,
+}
+
+
+def main() -> int:
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(f"usage: python3 -m sqldump {{{','.join(COMMANDS)}}} ...", file=sys.stderr)
+        return 2
+    return COMMANDS[sys.argv.pop(1)]()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,339 @@
+"""
+Benchmark suite for the dump readers, on synthetic dumps of several sizes.
+
+Every case runs in a fresh process so its peak RSS is its own, and reports
+MB/s, rows/s (or fields/s, descriptions/s: see "unit") and peak RSS. Results
+are written as JSON; pass an earlier file as --compare to flag regressions.
+
+  cd backend/scripts
+  python3 -m sqldump bench --sizes 10 100 1000 --output bench.json
+  python3 -m sqldump bench --sizes 10 --compare bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import synth
+from .parser import (
+    _VALUES_NEXT_RE,
+    _coerce_value,
+    _scan_tuple,
+    _split_fields,
+    _split_tuples,
+    iter_inserts,
+    iter_rows,
+    iter_statements,
+)
+from .profiling import peak_rss_mb
+from .scan import load_script
+
+# Results of another version ran on other dumps (see synth.LAYOUT_VERSION) and are not compared.
+BENCH_VERSION = 2
+DEFAULT_SIZES_MB = [10.0, 100.0, 1000.0]
+
+_SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_EXPORT_PY = os.path.join(_SCRIPTS_DIR, "etike", "export_etike_tours.py")
+_SPONSORED_PY = os.path.join(_SCRIPTS_DIR, "..", "src", "migration", "archive", "extract-sponsored.py")
+
+# The tables export_etike_tours.py reads.
+ETIKE_TABLES = [
+    "users",
+    "tour_packages",
+    "tour_package_options",
+    "tour_package_categories",
+    "tour_package_category_relations",
+]
+
+# How the iter_inserts_compact case holds them (see sqldump.compact); venues is
+# the largest table the scripts read.
+COMPACT_LAYOUT = {
+    "users": {"user_id": "int", "status": "intern", "role": "intern"},
+    "tour_packages": {"id": "int", "base_price": "decimal", "seller_id": "int", "status": "intern"},
+    "tour_package_options": {"id": "int", "package_id": "int", "price": "decimal"},
+    "tour_package_categories": {"id": "int", "status": "intern"},
+    "tour_package_category_relations": {"package_id": "int", "category_id": "int"},
+    "venues": {
+        "venue_id": "int",
+        "sponsored": "int",
+        "venue_status": "intern",
+        "category_id": "int",
+        "location_id": "int",
+        "venue_rating": "int",
+        "venue_reviews": "int",
+        "time_added": "intern",
+    },
+}
+COMPACT_COLUMNS = {table: [c for c, _ in synth.TABLES[table][0]] for table in COMPACT_LAYOUT}
+
+# (seconds, MB processed, items processed, unit)
+Measurement = Tuple[float, float, int, str]
+
+
+def _file_mb(path: str) -> float:
+    return os.path.getsize(path) / (1 << 20)
+
+
+def _case_iter_inserts(path: str) -> Measurement:
+    t0 = time.perf_counter()
+    tables = iter_inserts(path, ETIKE_TABLES)
+    seconds = time.perf_counter() - t0
+    return seconds, _file_mb(path), sum(len(rows) for rows in tables.values()), "rows"
+
+
+def _case_iter_rows_untyped(path: str) -> Measurement:
+    # Every field typed by guessing from its literal (_coerce_value) instead of by CREATE TABLE.
+    t0 = time.perf_counter()
+    n = sum(1 for _ in iter_rows(path, ETIKE_TABLES, schema=False))
+    return time.perf_counter() - t0, _file_mb(path), n, "rows"
+
+
+def _case_held_tables(path: str, layout: Optional[Dict[str, Dict[str, str]]]) -> Measurement:
+    # Every column of the tables, all held at once: peak RSS is the point here.
+    t0 = time.perf_counter()
+    tables = iter_inserts(path, COMPACT_LAYOUT, columns=COMPACT_COLUMNS, layout=layout)
+    seconds = time.perf_counter() - t0
+    return seconds, _file_mb(path), sum(len(rows) for rows in tables.values()), "rows"
+
+
+def _case_held_lists(path: str) -> Measurement:
+    return _case_held_tables(path, None)
+
+
+def _case_held_compact(path: str) -> Measurement:
+    return _case_held_tables(path, COMPACT_LAYOUT)
+
+
+def _case_iter_rows(path: str) -> Measurement:
+    t0 = time.perf_counter()
+    n = sum(1 for _ in iter_rows(path, ETIKE_TABLES))
+    return time.perf_counter() - t0, _file_mb(path), n, "rows"
+
+
+def _case_split_legacy(path: str) -> Measurement:
+    # Tokenizing only: the VALUES blobs are read and decoded outside the timer.
+    seconds, size, n = 0.0, 0, 0
+    for _, values in iter_statements(path):
+        text = values.decode("utf-8", errors="replace")
+        size += len(values)
+        t0 = time.perf_counter()
+        for t in _split_tuples(text):
+            _split_fields(t)
+            n += 1
+        seconds += time.perf_counter() - t0
+    return seconds, size / (1 << 20), n, "rows"
+
+
+def _case_scan_tuple(path: str) -> Measurement:
+    seconds, size, n = 0.0, 0, 0
+    for _, blob in iter_statements(path):
+        size += len(blob)
+        t0 = time.perf_counter()
+        pos = 0
+        while True:
+            nxt = _VALUES_NEXT_RE.search(blob, pos)
+            if nxt is None:
+                break
+            _, pos = _scan_tuple(blob, nxt.start())  # type: ignore[misc]
+            n += 1
+        seconds += time.perf_counter() - t0
+    return seconds, size / (1 << 20), n, "rows"
+
+
+def _case_coerce_value(path: str) -> Measurement:
+    # Raw fields come from _scan_tuple outside the timer; only _coerce_value is timed.
+    seconds, size, n = 0.0, 0, 0
+    for _, blob in iter_statements(path):
+        fields: List[bytes] = []
+        pos = 0
+        while True:
+            nxt = _VALUES_NEXT_RE.search(blob, pos)
+            if nxt is None:
+                break
+            row, pos = _scan_tuple(blob, nxt.start())  # type: ignore[misc]
+            fields.extend(row)
+        size += sum(len(f) for f in fields)
+        t0 = time.perf_counter()
+        for f in fields:
+            _coerce_value(f)
+        seconds += time.perf_counter() - t0
+        n += len(fields)
+    return seconds, size / (1 << 20), n, "fields"
+
+
+def _strip_html_case(path: str, attr: str) -> Measurement:
+    # Each result is also checked, outside the timer, against the legacy passes.
+    export = load_script(_EXPORT_PY)
+    strip = getattr(export, attr)
+    legacy = export._strip_html_keep_text_legacy
+    seconds, size, n = 0.0, 0, 0
+    columns = {"tour_packages": ["description"]}
+    for _, (description,) in iter_rows(path, ["tour_packages"], columns=columns):
+        if not description:
+            continue
+        size += len(description.encode("utf-8"))
+        t0 = time.perf_counter()
+        text = strip(description)
+        seconds += time.perf_counter() - t0
+        n += 1
+        if text != legacy(description):
+            raise RuntimeError(f"{attr} differs from _strip_html_keep_text_legacy on {description[:80]!r}")
+    return seconds, size / (1 << 20), n, "descriptions"
+
+
+def _case_strip_html(path: str) -> Measurement:
+    # The memoized entry point the export uses (synthetic descriptions repeat a lot).
+    return _strip_html_case(path, "_strip_html_keep_text")
+
+
+def _case_strip_html_uncached(path: str) -> Measurement:
+    return _strip_html_case(path, "_strip_html_keep_text_fast")
+
+
+def _case_extract_sponsored(path: str) -> Measurement:
+    extract = load_script(_SPONSORED_PY).extract_sponsored
+    t0 = time.perf_counter()
+    venues = extract(path)
+    return time.perf_counter() - t0, _file_mb(path), len(venues), "rows"
+
+
+CASES: Dict[str, Callable[[str], Measurement]] = {
+    "iter_inserts": _case_iter_inserts,
+    "iter_rows": _case_iter_rows,
+    "iter_rows_untyped": _case_iter_rows_untyped,
+    "held_lists": _case_held_lists,
+    "held_compact": _case_held_compact,
+    "split_tuples_fields": _case_split_legacy,
+    "scan_tuple": _case_scan_tuple,
+    "coerce_value": _case_coerce_value,
+    "strip_html": _case_strip_html,
+    "strip_html_uncached": _case_strip_html_uncached,
+    "extract_sponsored": _case_extract_sponsored,
+}
+
+
+def _run_case(case: str, path: str) -> Dict[str, Any]:
+    seconds, mb, items, unit = CASES[case](path)
+    return {
+        "seconds": seconds,
+        "mb": mb,
+        "mb_s": mb / seconds if seconds else float("inf"),
+        "rows": items,
+        "rows_s": items / seconds if seconds else float("inf"),
+        "unit": unit,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_case(case: str, path: str) -> Dict[str, Any]:
+    """Run one case in a fresh (spawned) process."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(_run_case, case, path).result()
+
+
+def synthetic_dump(work_dir: str, size_mb: float, seed: int = 0) -> str:
+    """Path of the synthetic dump for (size, seed), generated on first use."""
+    path = os.path.join(work_dir, f"synth-{size_mb:g}mb-seed{seed}-v{synth.LAYOUT_VERSION}.sql")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        synth.generate(tmp, size_mb, seed)
+        os.replace(tmp, path)
+    return path
+
+
+def run(
+    sizes_mb: List[float],
+    cases: List[str],
+    work_dir: str,
+    seed: int = 0,
+    log: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+    for size in sizes_mb:
+        path = synthetic_dump(work_dir, size, seed)
+        for case in cases:
+            r = {"case": case, "size_mb": size, **run_case(case, path)}
+            results.append(r)
+            if log:
+                log(_format_result(r))
+    return {
+        "version": BENCH_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "results": results,
+    }
+
+
+def _format_result(r: Dict[str, Any]) -> str:
+    return (
+        f"{r['case']:<22} {r['size_mb']:>7g} MB {r['mb_s']:>9.1f} MB/s "
+        f"{r['rows_s']:>12,.0f} {r['unit']}/s {r['peak_rss_mb']:>9.1f} MB RSS"
+    )
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Cases whose MB/s dropped, or peak RSS grew, by more than `tolerance` vs the baseline."""
+    before = {(r["case"], r["size_mb"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        old = before.get((r["case"], r["size_mb"]))
+        if old is None:
+            continue
+        if r["mb_s"] < old["mb_s"] * (1 - tolerance):
+            regressions.append(f"{r['case']} @ {r['size_mb']:g} MB: {old['mb_s']:.1f} -> {r['mb_s']:.1f} MB/s")
+        if r["peak_rss_mb"] > old["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(
+                f"{r['case']} @ {r['size_mb']:g} MB: {old['peak_rss_mb']:.1f} -> {r['peak_rss_mb']:.1f} MB peak RSS"
+            )
+    return regressions
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(prog="sqldump bench", description="Benchmark the SQL-dump readers on synthetic dumps.")
+    ap.add_argument("--sizes", type=float, nargs="+", default=DEFAULT_SIZES_MB, help="Dump sizes in MB.")
+    ap.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument(
+        "--work-dir",
+        default=os.path.join(tempfile.gettempdir(), "sqldump-bench"),
+        help="Where synthetic dumps are generated (and reused by later runs).",
+    )
+    ap.add_argument("--output", default="sqldump-bench.json", help="Results JSON.")
+    ap.add_argument("--compare", help="Earlier results JSON; exit 1 if a case regressed beyond --tolerance.")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    args = ap.parse_args()
+
+    report = run(args.sizes, args.cases, args.work_dir, args.seed, log=print)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    print(f"Results: {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("version") != BENCH_VERSION:
+            print(f"❌ {args.compare} is from bench version {baseline.get('version')}, not {BENCH_VERSION}; rerun it")
+            return 1
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            return 1
+        print(f"✅ no regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
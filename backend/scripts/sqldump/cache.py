@@ -0,0 +1,180 @@
+"""
+On-disk cache of parsed dump tables.
+
+Re-runs that only change downstream options (FX rate, rounding, ...) load the
+already-parsed rows instead of re-tokenizing the dump. An entry is keyed by the
+dump path and table set, and is only used while the dump's size and mtime match
+(or, if only the mtime moved, its content hash still matches).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+from .compressed import compression
+from .compact import Layout, Rows
+from .index import load_index
+from .parser import Predicate, iter_inserts
+
+# Bump whenever the parser's output for the same dump changes.
+CACHE_VERSION = 2
+
+_HASH_CHUNK = 4 << 20
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "zoea", "sqldump")
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                return h.hexdigest()
+            h.update(chunk)
+
+
+def _predicate_key(predicate: Predicate) -> List[Any]:
+    column, op, value = predicate
+    if isinstance(value, (set, frozenset)):
+        value = sorted(value, key=repr)
+    return [column, op, value]
+
+
+def _read_key(
+    sql_path: str,
+    tables: List[str],
+    columns: Optional[Mapping[str, Sequence[str]]],
+    where: Optional[Mapping[str, Predicate]],
+    layout: Optional[Layout],
+    schema: bool = True,
+) -> str:
+    """What a read of the dump returns, as a string: equal keys, equal tables."""
+    projected = {t: list(c) for t, c in sorted((columns or {}).items())}
+    filtered = {t: _predicate_key(p) for t, p in sorted((where or {}).items())}
+    key_parts: List[Any] = [os.path.abspath(sql_path), tables, projected, filtered, CACHE_VERSION]
+    if layout:
+        key_parts.append({t: dict(sorted(kinds.items())) for t, kinds in sorted(layout.items())})
+    if not schema:
+        key_parts.append("untyped")
+    return json.dumps(key_parts, default=repr)
+
+
+def _cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest()[:32] + ".pkl")
+
+
+def _write(path: str, meta: Dict[str, Any], tables: Dict[str, Rows]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # Meta first, so a lookup can validate without unpickling the rows.
+            pickle.dump(meta, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(tables, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def cached_inserts(
+    sql_path: str,
+    target_tables: Iterable[str],
+    cache_dir: Optional[str] = None,
+    workers: int = 1,
+    use_index: bool = False,
+    columns: Optional[Mapping[str, Sequence[str]]] = None,
+    where: Optional[Mapping[str, Predicate]] = None,
+    layout: Optional[Layout] = None,
+    schema: bool = True,
+    checkpoint: Optional[str] = None,
+    checkpoint_every: Optional[float] = None,
+    resume: bool = False,
+) -> Dict[str, Rows]:
+    """
+    Same result as iter_inserts(), served from `cache_dir` when the dump has not
+    changed since it was cached. With cache_dir=None the cache is bypassed.
+    With `use_index`, a miss reads the tables through the dump's byte-offset
+    index (built on first use); compressed dumps are always streamed.
+
+    `columns` and `where` project and filter tables as in iter_rows, `layout`
+    stores tables compactly as in iter_inserts, and `schema` types fields by
+    CREATE TABLE as in iter_rows; all are part of the cache key.
+
+    With a `checkpoint` path, a miss is read by checkpointed_inserts (see
+    sqldump.checkpoint), saving progress every `checkpoint_every` seconds and,
+    with `resume`, continuing an interrupted read.
+    """
+    tables = sorted(set(target_tables))
+    key = _read_key(sql_path, tables, columns, where, layout, schema)
+
+    def parse() -> Dict[str, Rows]:
+        index = load_index(sql_path) if use_index and compression(sql_path) is None else None
+        if checkpoint is not None:
+            # Imported here: sqldump.checkpoint builds on this module.
+            from .checkpoint import CHECKPOINT_EVERY, checkpointed_inserts
+
+            return checkpointed_inserts(
+                sql_path,
+                tables,
+                checkpoint,
+                every=CHECKPOINT_EVERY if checkpoint_every is None else checkpoint_every,
+                resume=resume,
+                workers=workers,
+                index=index,
+                columns=columns,
+                where=where,
+                layout=layout,
+                schema=schema,
+            )
+        return iter_inserts(
+            sql_path, tables, workers=workers, index=index, columns=columns, where=where, layout=layout, schema=schema
+        )
+
+    if cache_dir is None:
+        return parse()
+
+    st = os.stat(sql_path)
+    path = _cache_path(cache_dir, key)
+    digest: Optional[str] = None
+    try:
+        with open(path, "rb") as f:
+            meta = pickle.load(f)
+            if meta.get("version") == CACHE_VERSION and meta.get("size") == st.st_size:
+                if meta.get("mtime_ns") == st.st_mtime_ns:
+                    return pickle.load(f)
+                # Touched or copied: trust it only if the content is the same.
+                digest = file_digest(sql_path)
+                if digest == meta.get("sha256"):
+                    cached = pickle.load(f)
+                    _write(path, {**meta, "mtime_ns": st.st_mtime_ns}, cached)
+                    return cached
+    except FileNotFoundError:
+        pass
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, TypeError, ValueError):
+        # Unreadable or stale-format entry: rebuild it below.
+        pass
+
+    parsed = parse()
+    if digest is None:
+        digest = file_digest(sql_path)
+    after = os.stat(sql_path)
+    if (after.st_size, after.st_mtime_ns) == (st.st_size, st.st_mtime_ns):
+        meta = {
+            "version": CACHE_VERSION,
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "sha256": digest,
+            "tables": tables,
+        }
+        _write(path, meta, parsed)
+    return parsed
@@ -0,0 +1,173 @@
+"""
+Checkpoints for long dump reads, so an interrupted extraction picks up where it
+stopped instead of starting again from byte 0.
+
+checkpointed_inserts() reads tables like iter_inserts() and, every `every`
+seconds, appends a segment to its checkpoint file: the rows read since the
+previous segment plus the Position to continue from (file offset, the table
+whose statement just ended, the CREATE TABLEs seen). Positions are only taken
+between INSERT statements, so a resumed read replays the saved rows and then
+yields exactly the rows an uninterrupted read would have; the tables, and
+everything built from them, come out the same. Appending keeps each save
+proportional to the rows read since the last one, not to everything read so
+far.
+
+A segment cut short by a crash is dropped on resume (the read continues from
+the segment before it). A checkpoint is only resumed for the same dump (size
+and mtime) and the same read (tables, columns, where, layout, schema).
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+import time
+from typing import IO, Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .cache import CACHE_VERSION, _read_key
+from .compact import Layout, Rows, new_table
+from .parser import Position, Predicate, iter_rows
+
+# Seconds between saves.
+CHECKPOINT_EVERY = 60.0
+
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def _meta(sql_path: str, key: str) -> Dict[str, Any]:
+    st = os.stat(sql_path)
+    return {"version": CACHE_VERSION, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "key": key}
+
+
+def _replay(path: str, meta: Dict[str, Any], out: Dict[str, Rows]) -> Optional[Tuple[Optional[Position], bool, int]]:
+    """
+    Append the rows saved in the checkpoint at `path` to `out`. Returns (position
+    to resume from, whether the read had finished, length of the intact part of
+    the file), or None when there is no usable checkpoint there.
+    """
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    with f:
+        try:
+            saved = pickle.load(f)
+        except (EOFError, pickle.UnpicklingError):
+            # Interrupted before the first save finished.
+            return None
+        if saved != meta:
+            raise ValueError(
+                f"{path} is a checkpoint of another dump or read (the dump changed?); delete it to start over"
+            )
+        position: Optional[Position] = None
+        done = False
+        good = f.tell()
+        while not done:
+            try:
+                position, batch = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError, ValueError, TypeError, AttributeError):
+                # No more segments, or one cut short by the interruption.
+                break
+            for table, rows in batch.items():
+                out[table].extend(rows)
+            done = position is None
+            good = f.tell()
+    return position, done, good
+
+
+class _Writer:
+    """Appends segments to a checkpoint file, each flushed to disk before the read goes on."""
+
+    def __init__(self, path: str, meta: Dict[str, Any], keep: Optional[int]):
+        if keep is None:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.f: IO[bytes] = open(path, "wb")
+            self._write(meta)
+        else:
+            self.f = open(path, "r+b")
+            self.f.truncate(keep)
+            self.f.seek(keep)
+        self.saves = 0
+
+    def _write(self, record: Any) -> None:
+        pickle.dump(record, self.f, protocol=_PROTOCOL)
+        self.f.flush()
+        os.fsync(self.f.fileno())
+
+    def save(self, position: Optional[Position], batch: Mapping[str, List[Any]]) -> None:
+        """One segment: the rows since the last save, and where to continue (None: the read finished)."""
+        self._write((position, dict(batch)))
+        self.saves += 1
+
+    def close(self) -> None:
+        self.f.close()
+
+
+def checkpointed_inserts(
+    sql_path: str,
+    target_tables: Iterable[str],
+    checkpoint_path: str,
+    every: float = CHECKPOINT_EVERY,
+    resume: bool = True,
+    workers: int = 1,
+    index: Optional[Mapping[str, Any]] = None,
+    columns: Optional[Mapping[str, Sequence[str]]] = None,
+    where: Optional[Mapping[str, Predicate]] = None,
+    layout: Optional[Layout] = None,
+    schema: bool = True,
+) -> Dict[str, Rows]:
+    """
+    Same result as iter_inserts(), with progress saved to `checkpoint_path` at
+    the end of the first INSERT statement after every `every` seconds, and once
+    more when the read is done. With `resume`, a checkpoint already there is
+    continued (one of a finished read is returned without reading the dump);
+    without it, it is replaced. The file is left in place: remove it once the
+    result has been used (a run that dies after the read then resumes with no
+    reading at all).
+
+    Raises ValueError when `resume` finds a checkpoint of another dump or read.
+    """
+    tables = sorted(set(target_tables))
+    meta = _meta(sql_path, _read_key(sql_path, tables, columns, where, layout, schema))
+    out: Dict[str, Rows] = {t: new_table(t, columns, layout) for t in tables}
+
+    position: Optional[Position] = None
+    keep: Optional[int] = None
+    if resume:
+        replayed = _replay(checkpoint_path, meta, out)
+        if replayed is not None:
+            position, done, keep = replayed
+            if done:
+                return out
+
+    writer = _Writer(checkpoint_path, meta, keep)
+    try:
+        batch: Dict[str, List[Any]] = {}
+        last = time.monotonic()
+
+        def on_statement(at: Position) -> None:
+            nonlocal last
+            if time.monotonic() - last >= every:
+                writer.save(at, batch)
+                batch.clear()
+                last = time.monotonic()
+
+        rows = iter_rows(
+            sql_path,
+            tables,
+            workers=workers,
+            index=index,
+            columns=columns,
+            where=where,
+            schema=schema,
+            resume=position,
+            on_statement=on_statement,
+        )
+        for table, row in rows:
+            out[table].append(row)
+            batch.setdefault(table, []).append(row)
+        writer.save(None, batch)
+    finally:
+        writer.close()
+    return out
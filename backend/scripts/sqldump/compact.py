@@ -0,0 +1,303 @@
+"""
+Compact in-memory tables for large dump tables (users, venues, ...).
+
+A plain parsed table is a list of row lists of boxed values: every row pays for
+its own list, every id for its own int object, and the same status or role
+string is stored again in every row. A Table keeps the rows column by column
+instead, per a layout that names each column's kind:
+
+- "int":     array("q") of machine ints (ids, foreign keys).
+- "decimal": fixed-point coefficient + exponent arrays (prices). Decimals,
+             ints and numeric strings come back as Decimal with their exact
+             digits and exponent; equal values share one Decimal instance.
+- "intern":  a list whose strings are interned per column (statuses, roles,
+             slugs: anything low-cardinality).
+- "object":  a plain list (the default for columns not in the layout).
+
+NULLs and values that do not fit a numeric column (text, floats, numbers past
+64 bits) are kept as-is on the side, so a Table gives back what it was given
+(apart from the documented Decimal normalization). Rows iterate as tuples.
+"""
+
+from __future__ import annotations
+
+from array import array
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+# An Interner stops adding new values past this many distinct ones (they are
+# then returned as-is), so a column that turns out to be high-cardinality
+# does not keep a second reference to every value.
+INTERN_LIMIT = 1 << 16
+
+_INT_MIN, _INT_MAX = -(1 << 63), (1 << 63) - 1
+# DecimalColumn exponents: NULL and "kept on the side" markers, then the usable range.
+_EXP_NULL, _EXP_OTHER = -128, -127
+_EXP_MIN, _EXP_MAX = -126, 127
+_DECIMAL_DIGITS = 18
+
+
+class Interner:
+    """Hands out one shared instance per distinct string; other values pass through."""
+
+    __slots__ = ("pool", "limit")
+
+    def __init__(self, limit: int = INTERN_LIMIT):
+        self.pool: Dict[str, str] = {}
+        self.limit = limit
+
+    def __call__(self, value: Any) -> Any:
+        if type(value) is not str:
+            return value
+        shared = self.pool.get(value)
+        if shared is None:
+            if len(self.pool) >= self.limit:
+                return value
+            self.pool[value] = shared = value
+        return shared
+
+    def __len__(self) -> int:
+        return len(self.pool)
+
+
+class IntColumn:
+    __slots__ = ("values", "other")
+
+    def __init__(self, values: Iterable[Any] = ()):
+        self.values = array("q")
+        self.other: Dict[int, Any] = {}
+        for v in values:
+            self.append(v)
+
+    def append(self, v: Any) -> None:
+        if type(v) is int and _INT_MIN <= v <= _INT_MAX:
+            self.values.append(v)
+        else:
+            self.other[len(self.values)] = v
+            self.values.append(0)
+
+    def extend(self, values: Sequence[Any]) -> None:
+        try:
+            # All-int batches (the common case) convert in one go.
+            batch = array("q", values)
+        except (TypeError, OverflowError):
+            for v in values:
+                self.append(v)
+            return
+        self.values.extend(batch)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, i: int) -> Any:
+        i = range(len(self.values))[i]
+        return self.other[i] if i in self.other else self.values[i]
+
+    def __iter__(self) -> Iterator[Any]:
+        if not self.other:
+            return iter(self.values)
+        other = self.other
+        return (other[i] if i in other else v for i, v in enumerate(self.values))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _restore_int_column, (self.values, self.other)
+
+
+def _restore_int_column(values: "array[int]", other: Dict[int, Any]) -> IntColumn:
+    col = IntColumn()
+    col.values = values
+    col.other = other
+    return col
+
+
+class DecimalColumn:
+    __slots__ = ("coefficients", "exponents", "other", "shared")
+
+    def __init__(self, values: Iterable[Any] = ()):
+        self.coefficients = array("q")
+        self.exponents = array("b")
+        self.other: Dict[int, Any] = {}
+        self.shared: Dict[Tuple[int, int], Decimal] = {}
+        for v in values:
+            self.append(v)
+
+    def append(self, v: Any) -> None:
+        if v is None:
+            self.coefficients.append(0)
+            self.exponents.append(_EXP_NULL)
+            return
+        d = v
+        if type(v) is int or type(v) is str:
+            try:
+                d = Decimal(v)
+            except InvalidOperation:
+                d = None
+        if type(d) is Decimal:
+            sign, digits, exp = d.as_tuple()
+            # Finite, fits 64 bits, and not -0 (whose sign a coefficient cannot carry).
+            if type(exp) is int and _EXP_MIN <= exp <= _EXP_MAX and len(digits) <= _DECIMAL_DIGITS and (d or not sign):
+                self.coefficients.append(int(d.scaleb(-exp)))
+                self.exponents.append(exp)
+                return
+        self.other[len(self.coefficients)] = v
+        self.coefficients.append(0)
+        self.exponents.append(_EXP_OTHER)
+
+    def extend(self, values: Iterable[Any]) -> None:
+        for v in values:
+            self.append(v)
+
+    def _get(self, i: int, coefficient: int, exp: int) -> Any:
+        if exp == _EXP_NULL:
+            return None
+        if exp == _EXP_OTHER:
+            return self.other[i]
+        key = (coefficient, exp)
+        d = self.shared.get(key)
+        if d is None:
+            d = Decimal(coefficient).scaleb(exp)
+            if len(self.shared) < INTERN_LIMIT:
+                self.shared[key] = d
+        return d
+
+    def __len__(self) -> int:
+        return len(self.coefficients)
+
+    def __getitem__(self, i: int) -> Any:
+        i = range(len(self.coefficients))[i]
+        return self._get(i, self.coefficients[i], self.exponents[i])
+
+    def __iter__(self) -> Iterator[Any]:
+        get = self._get
+        return (get(i, c, e) for i, (c, e) in enumerate(zip(self.coefficients, self.exponents)))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return _restore_decimal_column, (self.coefficients, self.exponents, self.other)
+
+
+def _restore_decimal_column(coefficients: "array[int]", exponents: "array[int]", other: Dict[int, Any]) -> DecimalColumn:
+    col = DecimalColumn()
+    col.coefficients = coefficients
+    col.exponents = exponents
+    col.other = other
+    return col
+
+
+class InternColumn(List[Any]):
+    """A list that interns the strings appended to it (one Interner per column)."""
+
+    def __init__(self, values: Iterable[Any] = ()):
+        super().__init__()
+        self.interner = Interner()
+        for v in values:
+            self.append(v)
+
+    def append(self, v: Any) -> None:
+        super().append(self.interner(v))
+
+    def extend(self, values: Iterable[Any]) -> None:
+        super().extend(map(self.interner, values))
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Pickle keeps one copy of each shared string; the interner is rebuilt on load.
+        return InternColumn, (list(self),)
+
+
+Column = Union[IntColumn, DecimalColumn, InternColumn, List[Any]]
+
+KINDS: Dict[str, Callable[[], Column]] = {
+    "int": IntColumn,
+    "decimal": DecimalColumn,
+    "intern": InternColumn,
+    "object": list,
+}
+
+# table -> {column: kind}
+Layout = Mapping[str, Mapping[str, str]]
+
+# Appended rows are buffered and moved into the columns this many at a time.
+BATCH_ROWS = 4096
+
+
+class Table:
+    """
+    Rows of one table, stored column by column per `layout` ({column: kind},
+    see KINDS). A drop-in for the list of rows iter_inserts returns: append(),
+    len(), indexing and iteration work the same, with rows as tuples.
+    """
+
+    def __init__(self, columns: Sequence[str], layout: Mapping[str, str]):
+        unknown = set(layout) - set(columns)
+        if unknown:
+            raise ValueError(f"layout names columns that are not read: {', '.join(sorted(unknown))}")
+        for column, kind in layout.items():
+            if kind not in KINDS:
+                raise ValueError(f"unknown column kind {kind!r} for {column} (expected one of {', '.join(KINDS)})")
+        self.columns = list(columns)
+        self.layout = dict(layout)
+        self.data: List[Column] = [KINDS[self.layout.get(c, "object")]() for c in self.columns]
+        self._pending: List[Sequence[Any]] = []
+        self._len = 0
+
+    def append(self, row: Sequence[Any]) -> None:
+        if len(row) != len(self.columns):
+            raise ValueError(f"row has {len(row)} values, table has {len(self.columns)} columns")
+        self._pending.append(row)
+        self._len += 1
+        if len(self._pending) >= BATCH_ROWS:
+            self._flush()
+
+    def extend(self, rows: Iterable[Sequence[Any]]) -> None:
+        for row in rows:
+            self.append(row)
+
+    def _flush(self) -> None:
+        """Move the buffered rows into the columns (one transpose per batch, not per row)."""
+        if self._pending:
+            for col, values in zip(self.data, zip(*self._pending)):
+                col.extend(values)
+            self._pending = []
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i: int) -> Tuple[Any, ...]:
+        self._flush()
+        return tuple(col[i] for col in self.data)
+
+    def __iter__(self) -> Iterator[Tuple[Any, ...]]:
+        self._flush()
+        return zip(*self.data) if self.data else iter(())
+
+    def column(self, name: str) -> Column:
+        self._flush()
+        return self.data[self.columns.index(name)]
+
+    def __getstate__(self) -> Dict[str, Any]:
+        self._flush()
+        return {"columns": self.columns, "layout": self.layout, "data": self.data, "len": self._len}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.columns = state["columns"]
+        self.layout = state["layout"]
+        self.data = state["data"]
+        self._pending = []
+        self._len = state["len"]
+
+
+# What a parsed table is: a list of rows, or a Table when a layout was given.
+Rows = Union[List[List[Any]], Table]
+
+
+def new_table(
+    table: str,
+    columns: Optional[Mapping[str, Sequence[str]]],
+    layout: Optional[Layout],
+) -> Rows:
+    """An empty Table for `table` if it has a layout, else an empty list."""
+    if not layout or table not in layout:
+        return []
+    wanted = (columns or {}).get(table)
+    if wanted is None:
+        raise ValueError(f"a layout for {table} needs its `columns` too (the column order of a Table is fixed)")
+    return Table(wanted, layout[table])
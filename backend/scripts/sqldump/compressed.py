@@ -0,0 +1,122 @@
+"""
+Compressed dumps (.sql.gz / .sql.bz2 / .sql.xz) read without unpacking to disk.
+
+The codec is picked from the file's magic bytes, not its name. A background
+thread decompresses into a bounded queue of chunks while the caller tokenizes
+the previous ones; zlib, bz2 and lzma release the GIL while they work, so the
+two overlap. There is no random access into the decompressed stream, so the
+byte-offset index and --workers do not apply to these inputs.
+"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+from typing import IO, Any, Callable, Dict, List, Optional, Union
+
+# Decompressed bytes per queued chunk, and how many chunks may wait in the queue.
+READ_SIZE = 1 << 20
+QUEUE_DEPTH = 8
+
+_MAGIC: Dict[bytes, str] = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bz2",
+    b"\xfd7zXZ\x00": "xz",
+}
+_OPENERS: Dict[str, Callable[[str], IO[bytes]]] = {
+    "gzip": lambda p: gzip.open(p, "rb"),
+    "bz2": lambda p: bz2.open(p, "rb"),
+    "xz": lambda p: lzma.open(p, "rb"),
+}
+
+
+def compression(path: str) -> Optional[str]:
+    """The file's codec ("gzip", "bz2" or "xz") judged by its magic bytes, or None."""
+    with open(path, "rb") as f:
+        head = f.read(6)
+    for magic, name in _MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+class PipelinedReader:
+    """
+    Read-only binary file whose data is produced by a reader thread.
+
+    read(n) blocks until n bytes (or EOF) are available; read() returns the
+    rest. An error raised while decompressing is re-raised by read().
+    """
+
+    def __init__(self, raw: IO[bytes], read_size: int = READ_SIZE, depth: int = QUEUE_DEPTH):
+        self.raw = raw
+        self.read_size = read_size
+        self.chunks: "queue.Queue[Union[bytes, BaseException]]" = queue.Queue(maxsize=depth)
+        self.pending = b""
+        self.eof = False
+        self.closed = threading.Event()
+        self.thread = threading.Thread(target=self._fill, name="sqldump-decompress", daemon=True)
+        self.thread.start()
+
+    def _put(self, item: Union[bytes, BaseException]) -> bool:
+        while not self.closed.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fill(self) -> None:
+        try:
+            while True:
+                data = self.raw.read(self.read_size)
+                # b"" marks EOF for the consumer.
+                if not self._put(data) or not data:
+                    return
+        except BaseException as e:  # noqa: BLE001 - handed to the consumer thread
+            self._put(e)
+
+    def _next_chunk(self) -> bytes:
+        item = self.chunks.get()
+        if isinstance(item, BaseException):
+            self.eof = True
+            raise item
+        if not item:
+            self.eof = True
+        return item
+
+    def read(self, n: int = -1) -> bytes:
+        parts: List[bytes] = [self.pending] if self.pending else []
+        have = len(self.pending)
+        while (n < 0 or have < n) and not self.eof:
+            chunk = self._next_chunk()
+            parts.append(chunk)
+            have += len(chunk)
+        data = b"".join(parts)
+        if n < 0 or len(data) <= n:
+            self.pending = b""
+            return data
+        self.pending = data[n:]
+        return data[:n]
+
+    def close(self) -> None:
+        self.closed.set()
+        self.thread.join()
+        self.raw.close()
+
+    def __enter__(self) -> "PipelinedReader":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def open_decompressed(path: str, codec: Optional[str] = None) -> PipelinedReader:
+    codec = codec or compression(path)
+    if codec is None:
+        raise ValueError(f"{path} is not gzip/bz2/xz compressed")
+    return PipelinedReader(_OPENERS[codec](path))
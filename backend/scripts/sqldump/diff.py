@@ -0,0 +1,302 @@
+"""
+Row-level diff of two dumps of the same database, by primary key.
+
+When a newer legacy dump comes in (a fresh zoea.sql or etike.sql), this lists
+the rows that were inserted, deleted or updated in each table, with the changed
+columns of each update, so migrations can be re-run for just those rows:
+
+  cd backend/scripts
+  python3 -m sqldump diff ~/Desktop/zoea-old.sql ~/Desktop/zoea.sql --tables venues categories > changes.ndjson
+
+Each dump is read twice: once for its table definitions (column types and
+primary keys, see sqldump.schema.read_definitions), then for its rows. Rows go
+into a SortedRuns in (table, key) order, which writes sorted runs to disk past
+its share of the memory budget, and the two sorted streams are merge-joined.
+Memory stays within the budget whatever the dump sizes; time is the reads plus
+an external merge sort.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, TextIO, Tuple
+
+from .compressed import compression, open_decompressed
+from .parser import iter_rows
+from .schema import Definitions, read_definitions
+from .spill import SortedRuns
+
+# Bytes of pickled rows held in memory (over both dumps) before sorted runs go to disk.
+DEFAULT_MEMORY_BUDGET = 256 << 20
+
+OPS = ("insert", "delete", "update")
+
+
+class Change(NamedTuple):
+    table: str
+    op: str  # one of OPS
+    key: Dict[str, Any]
+    # insert/delete: the row that was added/removed; update: the new row.
+    row: Dict[str, Any]
+    # update: column -> (old value, new value), for the columns both dumps have.
+    changed: Optional[Dict[str, Tuple[Any, Any]]] = None
+
+
+def _order(value: Any) -> Tuple[int, Any]:
+    # Keys of different types (NULL, numbers, text, dates) sort without comparing across types.
+    if value is None:
+        return (0, 0)
+    if isinstance(value, (int, float, Decimal)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return (3, str(value))
+
+
+def _definitions(sql_path: str) -> Definitions:
+    codec = compression(sql_path)
+    if codec is not None:
+        with open_decompressed(sql_path, codec) as z:
+            return read_definitions(z)  # type: ignore[arg-type]
+    with open(sql_path, "rb") as f:
+        return read_definitions(f)
+
+
+class _Side:
+    """One dump's view of a table: its columns, and where the key columns are in them."""
+
+    def __init__(self, columns: Sequence[str], key: Sequence[str]):
+        self.columns = list(columns)
+        self.key_at = [self.columns.index(c) for c in key]
+
+
+class DumpDiff:
+    """
+    The changes from dump `old_path` to dump `new_path` in `tables` (default:
+    every table either dump defines). A table is keyed by `keys[table]` when
+    given, else by its PRIMARY KEY in the new (or old) dump. A table with
+    neither is keyed by all the columns both dumps have, so a changed row shows
+    as a delete plus an insert. Only tables with a CREATE TABLE can be diffed,
+    as rows are matched to columns by name.
+    """
+
+    def __init__(
+        self,
+        old_path: str,
+        new_path: str,
+        tables: Optional[Sequence[str]] = None,
+        keys: Optional[Mapping[str, Sequence[str]]] = None,
+        memory_budget: Optional[int] = DEFAULT_MEMORY_BUDGET,
+        tmp_dir: Optional[str] = None,
+        workers: int = 1,
+    ):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.tables = list(tables) if tables is not None else None
+        self.keys = dict(keys or {})
+        self.memory_budget = memory_budget
+        self.tmp_dir = tmp_dir
+        self.workers = workers
+        # Filled by changes(): table -> {"inserted", "deleted", "updated", "unchanged"} counts,
+        # table -> (key columns, where they came from), table -> (columns added, columns removed),
+        # and (rows sorted, runs written, bytes spilled) over both dumps.
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.key_columns: Dict[str, Tuple[List[str], str]] = {}
+        self.column_changes: Dict[str, Tuple[List[str], List[str]]] = {}
+        self.sort_stats = (0, 0, 0)
+
+    def _plan(self, old: Definitions, new: Definitions) -> Tuple[Dict[str, _Side], Dict[str, _Side]]:
+        tables = self.tables if self.tables is not None else sorted(set(old.schemas) | set(new.schemas))
+        missing = [t for t in tables if t not in old.schemas and t not in new.schemas]
+        if missing:
+            raise ValueError(f"no CREATE TABLE in either dump for: {', '.join(missing)}")
+        old_sides: Dict[str, _Side] = {}
+        new_sides: Dict[str, _Side] = {}
+        for table in tables:
+            if table in self.keys:
+                key, source = list(self.keys[table]), "given"
+            elif table in new.primary_keys or table in old.primary_keys:
+                key, source = new.primary_keys.get(table) or old.primary_keys[table], "primary key"
+            else:
+                both = [c for c in new.schemas.get(table) or {} if c in (old.schemas.get(table) or {})]
+                key, source = both or list(new.schemas.get(table) or old.schemas[table]), "all columns"
+            self.key_columns[table] = (key, source)
+            for defs, sides, path in ((old, old_sides, self.old_path), (new, new_sides, self.new_path)):
+                schema = defs.schemas.get(table)
+                if schema is None:
+                    continue
+                absent = [c for c in key if c not in schema]
+                if absent:
+                    raise ValueError(f"`{table}` in {path} has no key column(s) {', '.join(absent)}")
+                sides[table] = _Side(list(schema), key)
+            old_cols = old_sides[table].columns if table in old_sides else []
+            new_cols = new_sides[table].columns if table in new_sides else []
+            self.column_changes[table] = (
+                [c for c in new_cols if c not in old_cols],
+                [c for c in old_cols if c not in new_cols],
+            )
+            self.counts[table] = {"inserted": 0, "deleted": 0, "updated": 0, "unchanged": 0}
+        return old_sides, new_sides
+
+    def _sort(self, sql_path: str, sides: Dict[str, _Side], runs: SortedRuns) -> None:
+        if not sides:
+            return
+        columns = {table: side.columns for table, side in sides.items()}
+        for table, row in iter_rows(sql_path, list(sides), workers=self.workers, columns=columns):
+            runs.add((table, tuple(_order(row[i]) for i in sides[table].key_at)), row)
+
+    def changes(self) -> Iterator[Change]:
+        """Every change, ordered by table name, then key."""
+        old_sides, new_sides = self._plan(_definitions(self.old_path), _definitions(self.new_path))
+        # Both sorts are read at the same time by the merge, so each gets half the budget.
+        share = self.memory_budget // 2 if self.memory_budget is not None else None
+        with SortedRuns(share, self.tmp_dir) as old_runs, SortedRuns(share, self.tmp_dir) as new_runs:
+            self._sort(self.old_path, old_sides, old_runs)
+            self._sort(self.new_path, new_sides, new_runs)
+            self.sort_stats = tuple(a + b for a, b in zip(old_runs.stats(), new_runs.stats()))  # type: ignore[assignment]
+            yield from self._merge(iter(old_runs), iter(new_runs), old_sides, new_sides)
+
+    def _merge(
+        self,
+        old: Iterator[Tuple[Any, List[Any]]],
+        new: Iterator[Tuple[Any, List[Any]]],
+        old_sides: Dict[str, _Side],
+        new_sides: Dict[str, _Side],
+    ) -> Iterator[Change]:
+        # table -> (column, position in the old row, position in the new row) for the shared columns.
+        shared: Dict[str, List[Tuple[str, int, int]]] = {}
+        for table in self.counts:
+            if table in old_sides and table in new_sides:
+                at = {c: i for i, c in enumerate(new_sides[table].columns)}
+                shared[table] = [(c, i, at[c]) for i, c in enumerate(old_sides[table].columns) if c in at]
+
+        def key_of(table: str, row: List[Any], side: _Side) -> Dict[str, Any]:
+            return {c: row[i] for c, i in zip(self.key_columns[table][0], side.key_at)}
+
+        a = next(old, None)
+        b = next(new, None)
+        while a is not None or b is not None:
+            if b is None or (a is not None and a[0] < b[0]):
+                (table, _), row = a  # type: ignore[misc]
+                side = old_sides[table]
+                self.counts[table]["deleted"] += 1
+                yield Change(table, "delete", key_of(table, row, side), dict(zip(side.columns, row)))
+                a = next(old, None)
+            elif a is None or b[0] < a[0]:
+                (table, _), row = b
+                side = new_sides[table]
+                self.counts[table]["inserted"] += 1
+                yield Change(table, "insert", key_of(table, row, side), dict(zip(side.columns, row)))
+                b = next(new, None)
+            else:
+                (table, _), old_row = a
+                new_row = b[1]
+                changed = {c: (old_row[i], new_row[j]) for c, i, j in shared[table] if old_row[i] != new_row[j]}
+                if changed:
+                    side = new_sides[table]
+                    self.counts[table]["updated"] += 1
+                    yield Change(
+                        table, "update", key_of(table, new_row, side), dict(zip(side.columns, new_row)), changed
+                    )
+                else:
+                    self.counts[table]["unchanged"] += 1
+                a = next(old, None)
+                b = next(new, None)
+
+
+def _change_json(change: Change) -> str:
+    record: Dict[str, Any] = {"table": change.table, "op": change.op, "key": change.key}
+    if change.changed is not None:
+        record["changed"] = {c: list(v) for c, v in change.changed.items()}
+    record["row"] = change.row
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+
+def _parse_key(spec: str) -> Tuple[str, List[str]]:
+    table, _, cols = spec.partition("=")
+    if not table or not cols:
+        raise ValueError(f"bad key {spec!r} (expected table=col1[,col2])")
+    return table, [c.strip() for c in cols.split(",")]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        prog="sqldump diff",
+        description="Rows inserted, deleted and updated between two dumps, by primary key (NDJSON, one change per line).",
+    )
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--tables", nargs="+", help="Tables to compare (default: every table either dump defines).")
+    ap.add_argument(
+        "--key",
+        action="append",
+        default=[],
+        metavar="TABLE=COL[,COL]",
+        help="Key columns for a table (default: its PRIMARY KEY, else all its columns).",
+    )
+    ap.add_argument("--output", default="-", help="Where to write the changes ('-', the default, is stdout).")
+    ap.add_argument(
+        "--memory-budget",
+        type=float,
+        metavar="MB",
+        default=DEFAULT_MEMORY_BUDGET / (1 << 20),
+        help="Rows held in memory while sorting; sorted runs go to disk past it.",
+    )
+    ap.add_argument("--spill-dir", help="Where sorted runs go (default: the system temp dir).")
+    ap.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args()
+
+    try:
+        keys = dict(_parse_key(spec) for spec in args.key)
+    except ValueError as e:
+        ap.error(str(e))
+    diff = DumpDiff(
+        args.old,
+        args.new,
+        tables=args.tables,
+        keys=keys,
+        memory_budget=int(args.memory_budget * (1 << 20)),
+        tmp_dir=args.spill_dir,
+        workers=args.workers,
+    )
+    out: TextIO = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        total = 0
+        for change in diff.changes():
+            out.write(_change_json(change) + "\n")
+            total += 1
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    # The summary goes to stderr, so stdout stays pure NDJSON.
+    for table, c in diff.counts.items():
+        key, source = diff.key_columns[table]
+        keyed = "all columns" if source == "all columns" else f"{', '.join(key)}, {source}"
+        line = (
+            f"- {table}: {c['inserted']} inserted, {c['deleted']} deleted, {c['updated']} updated, "
+            f"{c['unchanged']} unchanged (key: {keyed})"
+        )
+        added, removed = diff.column_changes[table]
+        if added or removed:
+            line += f"; columns added: {', '.join(added) or '-'}, removed: {', '.join(removed) or '-'}"
+        print(line, file=sys.stderr)
+    rows, runs, spilled = diff.sort_stats
+    where = "" if args.output == "-" else f" -> {os.path.abspath(args.output)}"
+    print(
+        f"✅ {total} changes from {args.old} to {args.new}{where} "
+        f"({rows} rows sorted, {runs} runs, {spilled / (1 << 20):.1f} MB spilled)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
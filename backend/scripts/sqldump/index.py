@@ -0,0 +1,227 @@
+"""
+Byte-offset index of a SQL dump, stored as a JSON sidecar next to it.
+
+For every table it records where its CREATE TABLE starts and the offset,
+length and row count of each of its INSERT statements. One cheap pass builds it
+(tuples are only counted, never split into fields or decoded); afterwards
+readers seek straight to the statements of the tables they want instead of
+scanning every unrelated table (logs, sessions, ...).
+
+Build or inspect an index:
+  cd backend/scripts && python3 -m sqldump index /path/to/etike.sql
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .compressed import compression
+from .parser import _SEMI, Buffer, _map, _next_header
+from .schema import _CREATE_MARK, _CREATE_RE
+
+# Bump whenever the layout or the meaning of recorded offsets changes.
+INDEX_VERSION = 1
+
+# One whole tuple (strings skipped with escapes honored, one level of nested
+# parens allowed) or the ";" that ends the statement. Used to count rows
+# without splitting fields.
+_STR = rb"'[^'\\]*(?:\\.[^'\\]*)*'"
+_TUPLE_OR_END_RE = re.compile(
+    rb"\([^'()]*(?:(?:" + _STR + rb"|\([^'()]*(?:" + _STR + rb"[^'()]*)*\))[^'()]*)*\)|;",
+    re.S,
+)
+
+
+@dataclass
+class TableEntry:
+    create_offset: Optional[int] = None
+    # (offset, length, rows) of each INSERT, offset at the start of its header line.
+    statements: List[Tuple[int, int, int]] = field(default_factory=list)
+
+    @property
+    def rows(self) -> int:
+        return sum(s[2] for s in self.statements)
+
+    @property
+    def insert_bytes(self) -> int:
+        return sum(s[1] for s in self.statements)
+
+
+DumpIndex = Dict[str, TableEntry]
+
+
+def _statement_extent(buf: Buffer, pos: int) -> Tuple[int, int]:
+    """(end, rows) of the VALUES section starting at `pos`; end is just past ";"."""
+    rows = 0
+    for m in _TUPLE_OR_END_RE.finditer(buf, pos):
+        if buf[m.start()] == _SEMI:
+            return m.end(), rows
+        rows += 1
+    return len(buf), rows
+
+
+def _record_creates(buf: Buffer, start: int, end: int, index: DumpIndex) -> None:
+    """Record CREATE TABLE line offsets found in buf[start:end]."""
+    pos = start
+    j = 0 if start == 0 and buf[: len(_CREATE_MARK)] == _CREATE_MARK else -1
+    while True:
+        if j == -1:
+            j = buf.find(b"\n" + _CREATE_MARK, max(pos - 1, 0), end)
+            if j == -1:
+                return
+            j += 1
+        m = _CREATE_RE.match(buf, j)
+        if m is not None:
+            table = m.group("table").decode("utf-8", errors="replace")
+            index.setdefault(table, TableEntry()).create_offset = j
+        pos, j = j + 1, -1
+
+
+def build_index(buf: Buffer) -> DumpIndex:
+    index: DumpIndex = {}
+    pos = 0
+    while True:
+        m = _next_header(buf, pos)
+        _record_creates(buf, pos, m.start() if m is not None else len(buf), index)
+        if m is None:
+            return index
+        table = m.group("table").decode("utf-8", errors="replace")
+        end, rows = _statement_extent(buf, m.end())
+        index.setdefault(table, TableEntry()).statements.append((m.start(), end - m.start(), rows))
+        pos = end
+
+
+def default_index_path(sql_path: str) -> str:
+    return sql_path + ".idx.json"
+
+
+def _fallback_index_path(sql_path: str) -> str:
+    from .cache import default_cache_dir
+
+    key = hashlib.sha256(os.path.abspath(sql_path).encode()).hexdigest()[:32]
+    return os.path.join(default_cache_dir(), key + ".idx.json")
+
+
+def _read(path: str, st: os.stat_result) -> Optional[DumpIndex]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (data.get("version"), data.get("size"), data.get("mtime_ns")) != (INDEX_VERSION, st.st_size, st.st_mtime_ns):
+        return None
+    return {
+        table: TableEntry(
+            create_offset=t.get("create_offset"),
+            statements=[(s[0], s[1], s[2]) for s in t.get("statements", [])],
+        )
+        for table, t in data.get("tables", {}).items()
+    }
+
+
+def _write(path: str, st: os.stat_result, index: DumpIndex) -> None:
+    data = {
+        "version": INDEX_VERSION,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "tables": {
+            table: {"create_offset": t.create_offset, "rows": t.rows, "statements": t.statements}
+            for table, t in index.items()
+        },
+    }
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _candidates(sql_path: str, index_path: Optional[str]) -> List[str]:
+    return [index_path] if index_path else [default_index_path(sql_path), _fallback_index_path(sql_path)]
+
+
+def saved_index(sql_path: str, index_path: Optional[str] = None) -> Optional[DumpIndex]:
+    """
+    The index load_index() would return when one is already saved for the dump
+    as it is now, else None. Never reads the dump, so it suits reporting (table
+    sizes) where building an index would cost more than the report is worth.
+    """
+    if compression(sql_path) is not None:
+        return None
+    st = os.stat(sql_path)
+    for path in _candidates(sql_path, index_path):
+        index = _read(path, st)
+        if index is not None:
+            return index
+    return None
+
+
+def load_index(sql_path: str, index_path: Optional[str] = None) -> DumpIndex:
+    """
+    Return the dump's index, building and saving it first if it is missing or
+    was built for a different size/mtime. Without an explicit `index_path` the
+    sidecar `<dump>.idx.json` is used, falling back to the sqldump cache dir when
+    the dump's directory is not writable. Compressed dumps have no byte offsets
+    to seek to and raise ValueError.
+    """
+    codec = compression(sql_path)
+    if codec is not None:
+        raise ValueError(f"{sql_path} is {codec}-compressed; byte-offset indexes need an uncompressed dump")
+    index = saved_index(sql_path, index_path)
+    if index is not None:
+        return index
+
+    st = os.stat(sql_path)
+    candidates = _candidates(sql_path, index_path)
+    with open(sql_path, "rb") as f:
+        mm = _map(f)
+        if mm is None:
+            index = build_index(f.read())
+        else:
+            with mm:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                index = build_index(mm)
+
+    for path in candidates:
+        try:
+            _write(path, st, index)
+            break
+        except OSError:
+            continue
+    return index
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(prog="sqldump index", description="Build (if needed) and print the byte-offset index of a SQL dump.")
+    ap.add_argument("input")
+    ap.add_argument("--index", help="Index file (default: <input>.idx.json).")
+    args = ap.parse_args()
+
+    try:
+        index = load_index(args.input, args.index)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    print(f"{'table':<40} {'rows':>12} {'statements':>10} {'insert MB':>10}")
+    for table, t in sorted(index.items(), key=lambda kv: -kv[1].insert_bytes):
+        print(f"{table:<40} {t.rows:>12} {len(t.statements):>10} {t.insert_bytes / (1 << 20):>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,1173 @@
+"""
+Streaming, bytes-level reader for MariaDB/phpMyAdmin SQL dumps.
+
+The dump is memory-mapped and scanned as raw bytes: INSERT headers are found
+with a plain substring search, statements of non-target tables are jumped over
+without being decoded or tokenized, and only the fields of target-table rows
+are decoded. Inputs that cannot be mapped fall back to reading binary chunks;
+gzip/bz2/xz dumps are decompressed on a reader thread into that same path.
+"""
+
+from __future__ import annotations
+
+import io
+import mmap
+import operator
+import re
+import time
+from collections import deque
+from datetime import date, datetime
+from concurrent.futures import Future, ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from itertools import accumulate, islice
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .compact import Layout, Rows, new_table
+from .compressed import compression, open_decompressed
+from .schema import MAX_CREATE_BYTES, TableSchema, iter_creates, parse_create
+
+# Anything `re` and slicing work on: bytes from a chunked read, or the mmap itself.
+Buffer = Union[bytes, mmap.mmap]
+
+# An INSERT header line ("INSERT INTO `t` (`a`, `b`) VALUES"), matched on raw
+# bytes inside a multi-line buffer. Rows follow on the next lines.
+INSERT_HEAD_RE = re.compile(
+    rb"^INSERT INTO `(?P<table>[^`]+)`\s+\((?P<columns>[^)]+)\)\s+VALUES[^\S\n]*\n", re.M
+)
+_HEAD_MARK = b"INSERT INTO `"
+_LINE_HEAD_MARK = b"\n" + _HEAD_MARK
+
+# Between tuples we only care about the next "(" (row start) or ";" (statement end).
+_VALUES_NEXT_RE = re.compile(rb"[(;]")
+# Inside a tuple: one field's text, skipping whole quoted strings (honoring
+# backslash escapes), up to the separator/paren that ends it.
+_FIELD_RE = re.compile(rb"[^',()]*(?:'[^'\\]*(?:\\.[^'\\]*)*'[^',()]*)*[,()]", re.S)
+
+_COMMA, _OPEN, _SEMI = ord(","), ord("("), ord(";")
+
+# Bytes read per refill on the chunked path. A row larger than this grows the
+# read size instead.
+CHUNK_SIZE = 1 << 20
+
+# Mapped pages already scanned are handed back to the OS every this many bytes,
+# so RSS does not grow with the dump size.
+RELEASE_STEP = 8 << 20
+
+# Tuples whose fields average at most this many bytes (numbers, NULLs, short
+# codes and dates) are split on their commas in one go instead of field by field.
+FLAT_FIELD_BYTES = 12
+
+# Minimum VALUES throughput `--bench-scanner` expects from _scan_tuple, and the
+# minimum speedup over the legacy _split_tuples + _split_fields pair.
+SCANNER_TARGET_MBPS = 10.0
+SCANNER_TARGET_SPEEDUP = 3.0
+
+
+def _unescape_mysql_string(s: str) -> str:
+    # phpMyAdmin dumps typically escape with backslashes.
+    # Keep this conservative; we only need good-enough for text fields.
+    return (
+        s.replace("\\\\", "\\")
+        .replace("\\'", "'")
+        .replace('\\"', '"')
+        .replace("\\r", "\r")
+        .replace("\\n", "\n")
+        .replace("\\t", "\t")
+    )
+
+
+def _decode(raw: bytes) -> str:
+    s = raw.decode("utf-8", errors="replace")
+    # Match what reading the dump in text mode (universal newlines) gave.
+    if "\r" in s:
+        s = s.replace("\r\n", "\n").replace("\r", "\n")
+    return s
+
+
+def _split_tuples(values_blob: str) -> List[str]:
+    """
+    Split "(...),(...),(...)" into ["(...)", "(...)"] without breaking on commas in strings.
+
+    Legacy per-character splitter, superseded by _scan_tuple. Kept as the
+    reference `--bench-scanner` measures against.
+    """
+    tuples: List[str] = []
+    i = 0
+    n = len(values_blob)
+    in_str = False
+    esc = False
+    depth = 0
+    start = None
+    while i < n:
+        ch = values_blob[i]
+        if in_str:
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == "'":
+                in_str = False
+        else:
+            if ch == "'":
+                in_str = True
+            elif ch == "(":
+                if depth == 0:
+                    start = i
+                depth += 1
+            elif ch == ")":
+                depth -= 1
+                if depth == 0 and start is not None:
+                    tuples.append(values_blob[start : i + 1])
+                    start = None
+        i += 1
+    return tuples
+
+
+def _split_fields(tuple_blob: str) -> List[str]:
+    """
+    Split "(a,b,'c,d',NULL)" (including parentheses) into raw field strings.
+
+    Legacy per-character splitter, see _split_tuples.
+    """
+    assert tuple_blob[0] == "(" and tuple_blob[-1] == ")"
+    inner = tuple_blob[1:-1]
+    fields: List[str] = []
+    buf: List[str] = []
+    in_str = False
+    esc = False
+    for ch in inner:
+        if in_str:
+            buf.append(ch)
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == "'":
+                in_str = False
+        else:
+            if ch == "'":
+                in_str = True
+                buf.append(ch)
+            elif ch == ",":
+                fields.append("".join(buf).strip())
+                buf = []
+            else:
+                buf.append(ch)
+    if buf:
+        fields.append("".join(buf).strip())
+    return fields
+
+
+def _coerce_value(raw: bytes) -> Any:
+    if raw.upper() == b"NULL":
+        return None
+    if raw.startswith(b"'") and raw.endswith(b"'"):
+        return _unescape_mysql_string(_decode(raw[1:-1]))
+    # numeric?
+    try:
+        if b"." in raw:
+            return Decimal(raw.decode("ascii"))
+        return int(raw)
+    except Exception:
+        return _decode(raw)
+
+
+# Converters by column kind (see sqldump.schema), applied by field position.
+# Each handles the literals its column type is dumped as directly; anything
+# else (NULL in a text column, a zero date, text in a numeric column, ...) goes to
+# _coerce_value, so a row converts the same as before whenever the type is
+# ambiguous.
+
+
+def _convert_int(raw: bytes) -> Any:
+    # Most literals are bare digits: no NULL, quote or sign to look for.
+    if raw.isdigit():
+        return int(raw)
+    if raw == b"NULL":
+        return None
+    # Quoted or not, a numeric column holds a number.
+    try:
+        return int(raw[1:-1] if raw[:1] == b"'" else raw)
+    except ValueError:
+        return _coerce_value(raw)
+
+
+def _convert_decimal(raw: bytes) -> Any:
+    # A bare number; the rest of it is left for Decimal() to check.
+    if raw[:1].isdigit():
+        try:
+            return Decimal(raw.decode("ascii"))
+        except (InvalidOperation, UnicodeDecodeError):
+            return _coerce_value(raw)
+    if raw == b"NULL":
+        return None
+    try:
+        return Decimal((raw[1:-1] if raw[:1] == b"'" else raw).decode("ascii"))
+    except (InvalidOperation, UnicodeDecodeError):
+        return _coerce_value(raw)
+
+
+def _convert_float(raw: bytes) -> Any:
+    if raw[:1].isdigit():
+        try:
+            return float(raw)
+        except ValueError:
+            return _coerce_value(raw)
+    if raw == b"NULL":
+        return None
+    try:
+        return float(raw[1:-1] if raw[:1] == b"'" else raw)
+    except ValueError:
+        return _coerce_value(raw)
+
+
+def _convert_str(raw: bytes) -> Any:
+    if raw[:1] == b"'" and raw[-1:] == b"'":
+        inner = raw[1:-1]
+        return _unescape_mysql_string(_decode(inner)) if b"\\" in inner else _decode(inner)
+    return _coerce_value(raw)
+
+
+# Zero dates ('0000-00-00 00:00:00') fill whole columns of v1 dumps (a fifth of
+# zoea v1's DATE fields). Year 0 is never a date to fromisoformat(), so they are
+# told apart by their year and kept as text without raising; one slice is about
+# all a well-formed date can pay for. Zero months or days with a real year are
+# rare and fall back through the exception.
+
+
+def _convert_datetime(raw: bytes) -> Any:
+    if raw[:1] == b"'" and raw[1:5] != b"0000":
+        try:
+            return datetime.fromisoformat(raw[1:-1].decode("ascii"))
+        except (ValueError, UnicodeDecodeError):
+            pass
+    return _coerce_value(raw)
+
+
+def _convert_date(raw: bytes) -> Any:
+    if raw[:1] == b"'" and raw[1:5] != b"0000":
+        try:
+            return date.fromisoformat(raw[1:-1].decode("ascii"))
+        except (ValueError, UnicodeDecodeError):
+            pass
+    return _coerce_value(raw)
+
+
+def _enum_converter(members: Sequence[bytes]) -> Callable[[bytes], Any]:
+    # Every row of an enum column shares one str per member.
+    values = {lit: _unescape_mysql_string(_decode(lit[1:-1])) for lit in members}
+    get = values.get
+
+    def convert(raw: bytes) -> Any:
+        v = get(raw)
+        return v if v is not None else _coerce_value(raw)
+
+    return convert
+
+
+_CONVERTERS: Dict[str, Callable[[bytes], Any]] = {
+    "int": _convert_int,
+    "decimal": _convert_decimal,
+    "float": _convert_float,
+    "str": _convert_str,
+    "datetime": _convert_datetime,
+    "date": _convert_date,
+}
+
+
+def _converters(schema: TableSchema, names: Sequence[str]) -> List[Callable[[bytes], Any]]:
+    """One converter per INSERT column, by the column's CREATE TABLE type (_coerce_value if unknown)."""
+    out: List[Callable[[bytes], Any]] = []
+    for name in names:
+        col = schema.get(name)
+        if col is None or col.kind is None:
+            out.append(_coerce_value)
+        elif col.kind == "enum":
+            out.append(_enum_converter(col.members))
+        else:
+            out.append(_CONVERTERS[col.kind])
+    return out
+
+
+def _flat_pieces(buf: Buffer, start: int) -> Optional[Tuple[List[bytes], int]]:
+    """
+    The unstripped text between the commas of the tuple at buf[start] == "("
+    (a trailing empty one included) and the index just past its ")", for a
+    tuple of short fields where that is just a split on commas: no "(" or
+    backslash before the first ")", and no ")" or comma inside a quoted
+    string. None otherwise.
+    """
+    close = buf.find(b")", start)
+    if close < 0:
+        return None
+    inner = buf[start + 1 : close]
+    if len(inner) > FLAT_FIELD_BYTES * (inner.count(b",") + 1):
+        # Long fields: the regex scan costs less than the checks below.
+        return None
+    if b"(" in inner or b"\\" in inner:
+        return None
+    if b"'" in inner:
+        # Odd pieces are inside quotes; an even count of quotes means ")" is not.
+        quoted = inner.split(b"'")
+        if not len(quoted) % 2 or b"," in b"".join(quoted[1::2]):
+            return None
+    return inner.split(b","), close + 1
+
+
+def _scan_tuple(buf: Buffer, start: int) -> Optional[Tuple[List[bytes], int]]:
+    """
+    Fused tuple + field scanner: given buf[start] == "(", return the tuple's raw
+    field bytes and the index just past its closing ")".
+
+    Most tuples are split on their commas in one go (see _flat_pieces). In the
+    others each field is consumed by a single compiled-regex match that jumps
+    over plain text and whole quoted strings to the next comma/paren, instead
+    of visiting every character. Produces exactly what
+    _split_fields(_split_tuples(...)) would.
+    Returns None when the tuple is not complete within `buf` yet.
+    """
+    flat = _flat_pieces(buf, start)
+    if flat is not None:
+        pieces, end = flat
+        # Like _split_fields: a trailing empty field is dropped, a blank one is kept.
+        if not pieces[-1]:
+            pieces.pop()
+        return [f.strip() for f in pieces], end
+    match = _FIELD_RE.match
+    fields: List[bytes] = []
+    field_start = i = start + 1
+    depth = 0
+    while True:
+        m = match(buf, i)
+        if m is None:
+            return None
+        i = m.end()
+        ch = buf[i - 1]
+        if ch == _COMMA:
+            fields.append(buf[field_start : i - 1].strip())
+            field_start = i
+        elif ch == _OPEN:
+            depth += 1
+        elif depth:
+            depth -= 1
+        else:
+            # Like _split_fields: a trailing empty field is dropped, a blank one is kept.
+            if i - 1 > field_start:
+                fields.append(buf[field_start : i - 1].strip())
+            return fields, i
+
+
+def _scan_bounds(buf: Buffer, start: int) -> Optional[Tuple[List[int], int]]:
+    """
+    Like _scan_tuple, but only records where fields start: field k is
+    buf[bounds[k] : bounds[k + 1] - 1]. Fields a caller does not ask for are
+    never stripped, copied out or coerced one by one.
+    """
+    flat = _flat_pieces(buf, start)
+    if flat is not None:
+        pieces, end = flat
+        return list(accumulate([len(f) + 1 for f in pieces], initial=start + 1)), end
+    match = _FIELD_RE.match
+    bounds = [start + 1]
+    i = start + 1
+    depth = 0
+    while True:
+        m = match(buf, i)
+        if m is None:
+            return None
+        i = m.end()
+        ch = buf[i - 1]
+        if ch == _COMMA:
+            bounds.append(i)
+        elif ch == _OPEN:
+            depth += 1
+        elif depth:
+            depth -= 1
+        else:
+            bounds.append(i)
+            return bounds, i
+
+
+def _field_count(bounds: List[int]) -> int:
+    # Like _split_fields: a trailing empty field is dropped, a blank one is kept.
+    n = len(bounds) - 1
+    return n - 1 if bounds[-1] - 1 == bounds[-2] else n
+
+
+def column_names(columns: bytes) -> List[str]:
+    """Names from an INSERT column list such as b"`id`, `name`"."""
+    return [c.strip().strip(b"`").decode("utf-8", errors="replace") for c in columns.split(b",")]
+
+
+def _positions(table: str, columns: bytes, wanted: Iterable[str]) -> List[int]:
+    """Positions of the `wanted` columns in an INSERT's column list."""
+    positions = {name: i for i, name in enumerate(column_names(columns))}
+    wanted = list(wanted)
+    missing = [c for c in wanted if c not in positions]
+    if missing:
+        raise ValueError(f"`{table}` has no column(s) {', '.join(missing)}")
+    return [positions[c] for c in wanted]
+
+
+# A row filter: (column, operator, value), e.g. ("role", "==", "tour_operator").
+Predicate = Tuple[str, str, Any]
+
+WHERE_OPS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda v, values: v in values,
+    "not in": lambda v, values: v not in values,
+}
+
+
+def _compile_predicate(predicate: Predicate) -> Callable[[Any], bool]:
+    _column, op, value = predicate
+    try:
+        compare = WHERE_OPS[op]
+    except KeyError:
+        raise ValueError(f"unsupported where operator {op!r} (expected one of {', '.join(WHERE_OPS)})") from None
+
+    def test(v: Any) -> bool:
+        try:
+            return bool(compare(v, value))
+        except TypeError:
+            # NULL or a value of another type (e.g. text where a number is expected): no match.
+            return False
+
+    return test
+
+
+class _RowPlan:
+    """
+    How to turn one table's tuples into rows, resolved against one INSERT column
+    list: which fields to keep (None = all), an optional field test that
+    decides, before anything else is decoded, whether the tuple is kept at all,
+    and optionally one converter per column from the table's CREATE TABLE.
+    """
+
+    __slots__ = ("fields", "test_at", "test", "min_fields", "converters")
+
+    def __init__(
+        self,
+        fields: Optional[List[int]],
+        test_at: int = -1,
+        test: Optional[Callable[[Any], bool]] = None,
+        converters: Optional[List[Callable[[bytes], Any]]] = None,
+    ):
+        self.fields = fields
+        self.test_at = test_at
+        self.test = test
+        self.min_fields = max((fields or []) + [test_at]) + 1
+        self.converters = converters
+
+
+class Position(NamedTuple):
+    """
+    Where a read stands once one INSERT statement of a target table has been
+    read in full (see iter_rows' on_statement; sqldump.checkpoint saves these).
+    """
+
+    offset: int  # in the (decompressed) dump: where reading continues
+    table: str  # whose statement just ended
+    schemas: Mapping[str, Optional[TableSchema]]  # CREATE TABLEs read so far
+
+
+# Called with each Position; it runs between rows, once the caller has taken the statement's last row.
+StatementCallback = Callable[[Position], None]
+
+# Called with (table, schema) for each CREATE TABLE the reader comes across (schema
+# None when its column list could not be parsed).
+CreateCallback = Callable[[str, Optional[TableSchema]], None]
+
+
+class _Schemas:
+    """
+    Table schemas (see sqldump.schema) by table name. Readers record the CREATE
+    TABLEs in the stretches they search for INSERT headers anyway, so a table's
+    schema is known by the time its first INSERT is reached.
+    """
+
+    def __init__(
+        self,
+        known: Optional[Mapping[str, Optional[TableSchema]]] = None,
+        on_create: Optional[CreateCallback] = None,
+    ):
+        self.tables: Dict[str, Optional[TableSchema]] = {}
+        self.on_create = on_create
+        for table, schema in (known or {}).items():
+            self.set(table, schema)
+
+    def get(self, table: str) -> Optional[TableSchema]:
+        return self.tables.get(table)
+
+    def set(self, table: str, schema: Optional[TableSchema]) -> None:
+        self.tables[table] = schema
+        if self.on_create is not None:
+            self.on_create(table, schema)
+
+    def record(self, buf: Buffer, start: int, end: int) -> int:
+        """
+        Record the CREATE TABLEs in buf[start:end]. Returns the offset of one
+        whose column list is not complete within `buf` yet, or -1.
+        """
+        for offset, parsed in iter_creates(buf, start, end):
+            if parsed is None:
+                return offset
+            table, schema, _end = parsed
+            self.set(table, schema)
+        return -1
+
+
+class _RowPlans:
+    """Per-table projection/filter options -> a _RowPlan per header (memoized by column list)."""
+
+    def __init__(
+        self,
+        columns: Optional[Mapping[str, Sequence[str]]],
+        where: Optional[Mapping[str, Predicate]] = None,
+        schemas: Optional[_Schemas] = None,
+    ):
+        self.columns = columns or {}
+        self.where = where or {}
+        self.schemas = schemas
+        self.memo: Dict[Tuple[str, bytes], _RowPlan] = {}
+
+    def get(self, table: str, m: re.Match) -> Optional[_RowPlan]:
+        wanted = self.columns.get(table)
+        predicate = self.where.get(table)
+        schema = self.schemas.get(table) if self.schemas is not None else None
+        if wanted is None and predicate is None and schema is None:
+            return None
+        key = (table, m.group("columns"))
+        plan = self.memo.get(key)
+        if plan is None:
+            fields = _positions(table, key[1], wanted) if wanted is not None else None
+            converters = _converters(schema, column_names(key[1])) if schema is not None else None
+            if predicate is None:
+                plan = _RowPlan(fields, converters=converters)
+            else:
+                [test_at] = _positions(table, key[1], [predicate[0]])
+                plan = _RowPlan(fields, test_at, _compile_predicate(predicate), converters)
+            self.memo[key] = plan
+        return plan
+
+
+def _next_header(buf: Buffer, pos: int) -> Optional[re.Match]:
+    """
+    Find the next INSERT header line at or after `pos`. Uses a plain substring
+    search for the line prefix, so non-target statements in between are skipped
+    without being tokenized.
+    """
+    while True:
+        if pos == 0 and buf[: len(_HEAD_MARK)] == _HEAD_MARK:
+            j = 0
+        else:
+            j = buf.find(_LINE_HEAD_MARK, max(pos - 1, 0))
+            if j == -1:
+                return None
+            j += 1
+        m = INSERT_HEAD_RE.match(buf, j)
+        if m is not None:
+            return m
+        pos = j + 1
+
+
+def _parse_tuple(
+    buf: Buffer, start: int, plan: Optional[_RowPlan] = None
+) -> Optional[Tuple[Optional[List[Any]], int]]:
+    """
+    Parse + coerce the tuple at buf[start] == "(". Returns (row, end), or None
+    when the tuple is not complete within `buf` yet.
+
+    With a `plan`, the predicate field (if any) is coerced and tested first and a
+    failing tuple gives (None, end) without decoding anything else; the row then
+    holds only the projected fields (in projection order), and other fields are
+    neither copied nor coerced. A tuple too short for the plan also gives
+    (None, end). Fields are converted by the plan's per-column converters when
+    it has them, else by _coerce_value.
+    """
+    if plan is None:
+        scanned = _scan_tuple(buf, start)
+        if scanned is None:
+            return None
+        fields_raw, end = scanned
+        return [_coerce_value(x) for x in fields_raw], end
+
+    bounded = _scan_bounds(buf, start)
+    if bounded is None:
+        return None
+    bounds, end = bounded
+    n = _field_count(bounds)
+    if n < plan.min_fields:
+        return None, end
+    convert = plan.converters
+    if convert is not None and n != len(convert):
+        # A tuple that does not match its column list: guess each value's type.
+        convert = None
+    if plan.test is not None:
+        k = plan.test_at
+        raw = buf[bounds[k] : bounds[k + 1] - 1].strip()
+        if not plan.test(convert[k](raw) if convert is not None else _coerce_value(raw)):
+            return None, end
+    fields = plan.fields if plan.fields is not None else range(n)
+    if convert is None:
+        return [_coerce_value(buf[bounds[k] : bounds[k + 1] - 1].strip()) for k in fields], end
+    return [convert[k](buf[bounds[k] : bounds[k + 1] - 1].strip()) for k in fields], end
+
+
+def _iter_statement_rows(
+    buf: Buffer, pos: int, plan: Optional[_RowPlan] = None, base: int = 0
+) -> Generator[List[Any], None, int]:
+    """
+    Yield the coerced (optionally filtered/projected, see _parse_tuple) rows of
+    the VALUES section starting at `pos`.
+    Returns the index just past the statement's ";" (or len(buf) when the dump
+    ends without one after a complete tuple). A tuple that never closes (an
+    unterminated quote, or a dump cut off inside it) raises ValueError giving
+    its dump offset; `base` is the dump offset of buf[0].
+    """
+    search = _VALUES_NEXT_RE.search
+    while True:
+        m = search(buf, pos)
+        if m is None:
+            return len(buf)
+        start = m.start()
+        if buf[start] == _SEMI:
+            return start + 1
+        parsed = _parse_tuple(buf, start, plan)
+        if parsed is None:
+            raise ValueError(_unterminated(base + start))
+        row, pos = parsed
+        if row is not None:
+            yield row
+
+
+def _unterminated(offset: int) -> str:
+    return f"unterminated INSERT tuple at byte {offset} (unclosed quote, or the dump is cut off)"
+
+
+def _iter_buffer_rows(
+    buf: Buffer,
+    target: Set[str],
+    statements: Optional[List[Tuple[str, int]]] = None,
+    columns: Optional[Mapping[str, Sequence[str]]] = None,
+    where: Optional[Mapping[str, Predicate]] = None,
+    schemas: Optional[_Schemas] = None,
+    start: int = 0,
+    on_statement: Optional[StatementCallback] = None,
+    base: int = 0,
+) -> Iterator[Tuple[str, List[Any]]]:
+    """
+    Rows of the target tables in a fully addressable buffer (mmap or bytes).
+    With `statements` ((table, header_offset) pairs, e.g. from a DumpIndex), jump
+    straight to those INSERTs instead of searching for headers. With `schemas`,
+    fields are converted by their CREATE TABLE column types. Without
+    `statements`, headers are searched for from `start`. `base` is the dump
+    offset of buf[0], for error messages.
+    """
+    releaser = _PageReleaser(buf)
+    plans = _RowPlans(columns, where, schemas)
+    known: Mapping[str, Optional[TableSchema]] = schemas.tables if schemas is not None else {}
+    if statements is not None:
+        for table, offset in statements:
+            m = INSERT_HEAD_RE.match(buf, offset)
+            if m is None:
+                raise ValueError(f"stale dump index: no INSERT header at byte {offset}")
+            rows = _iter_statement_rows(buf, m.end(), plans.get(table, m), base)
+            while True:
+                try:
+                    row = next(rows)
+                except StopIteration as stop:
+                    end = stop.value
+                    break
+                yield table, row
+            releaser.release(end)
+            if on_statement is not None:
+                on_statement(Position(end, table, known))
+        return
+
+    pos = start
+    while True:
+        m = _next_header(buf, pos)
+        if schemas is not None:
+            schemas.record(buf, pos, m.start() if m is not None else len(buf))
+        if m is None:
+            return
+        pos = m.end()
+        table = m.group("table").decode("utf-8", errors="replace")
+        if table in target:
+            rows = _iter_statement_rows(buf, pos, plans.get(table, m), base)
+            while True:
+                try:
+                    row = next(rows)
+                except StopIteration as stop:
+                    pos = stop.value
+                    break
+                yield table, row
+            if on_statement is not None:
+                on_statement(Position(pos, table, known))
+        releaser.release(pos)
+
+
+class _PageReleaser:
+    """Drop already-scanned pages of a read-only mapping from our RSS (no-op for bytes)."""
+
+    def __init__(self, buf: Buffer):
+        self.mm = buf if isinstance(buf, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED") else None
+        self.done = 0
+        if self.mm is not None and hasattr(mmap, "MADV_SEQUENTIAL"):
+            self.mm.madvise(mmap.MADV_SEQUENTIAL)
+
+    def release(self, pos: int) -> None:
+        if self.mm is None or pos - self.done < RELEASE_STEP:
+            return
+        end = pos - pos % mmap.PAGESIZE
+        self.mm.madvise(mmap.MADV_DONTNEED, self.done, end - self.done)
+        self.done = end
+
+
+def _iter_stream_rows(
+    f: BinaryIO,
+    target: Set[str],
+    chunk_size: int,
+    columns: Optional[Mapping[str, Sequence[str]]] = None,
+    where: Optional[Mapping[str, Predicate]] = None,
+    schemas: Optional[_Schemas] = None,
+    start: int = 0,
+    on_statement: Optional[StatementCallback] = None,
+) -> Iterator[Tuple[str, List[Any]]]:
+    """
+    Chunked fallback for inputs that cannot be memory-mapped. Only the row being
+    parsed is buffered, so memory stays flat regardless of the dump size or of
+    how long a single extended INSERT is. A row that does not fit in one chunk
+    grows the next read geometrically so rescanning it stays linear. With
+    `schemas`, CREATE TABLEs are recorded as they stream past. Reading begins at
+    byte `start` of the stream (the bytes before it are read and dropped).
+    """
+    plans = _RowPlans(columns, where, schemas)
+    known: Mapping[str, Optional[TableSchema]] = schemas.tables if schemas is not None else {}
+    buf = b""
+    pos = 0
+    # Stream offset of buf[0].
+    base = 0
+    if start > 0:
+        # Keep the byte before `start`, so "^" only matches where it would have.
+        base = _skip(f, start - 1, chunk_size)
+        buf = f.read(1)
+        pos = len(buf)
+    eof = False
+    current_table: Optional[str] = None
+    plan: Optional[_RowPlan] = None
+
+    while True:
+        if current_table is None:
+            m = INSERT_HEAD_RE.search(buf, pos)
+            if schemas is not None:
+                unfinished = schemas.record(buf, pos, m.start() if m is not None else len(buf))
+            if m is not None:
+                table = m.group("table").decode("utf-8", errors="replace")
+                pos = m.end()
+                # Statements of other tables are skipped by looking for the next header.
+                if table in target:
+                    current_table = table
+                    plan = plans.get(table, m)
+                continue
+            if eof:
+                return
+            # Keep the unfinished last line: it may be the start of a header.
+            # When there is none, keep one byte before `pos` so "^" does not
+            # match in the middle of a line.
+            nl = buf.rfind(b"\n", pos)
+            cut = nl + 1 if nl != -1 else max(pos - 1, 0)
+            if schemas is not None and unfinished != -1 and len(buf) - unfinished < MAX_CREATE_BYTES:
+                # Keep a CREATE TABLE that is cut off until the rest of it is read.
+                cut = min(cut, unfinished)
+            buf, pos = buf[cut:], pos - cut if nl == -1 else 0
+            base += cut
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                # Let a header on the very last line still match.
+                chunk = b"\n"
+            buf += chunk
+            continue
+
+        m = _VALUES_NEXT_RE.search(buf, pos)
+        if m is not None and buf[m.start()] == _SEMI:
+            pos = m.end()
+            if on_statement is not None:
+                on_statement(Position(base + pos, current_table, known))
+            current_table = None
+            continue
+
+        parsed = _parse_tuple(buf, m.start(), plan) if m is not None else None
+        if parsed is None:
+            if eof:
+                if m is not None:
+                    raise ValueError(_unterminated(base + m.start()))
+                # The dump ends without the statement's ";".
+                return
+            cut = m.start() if m is not None else len(buf)
+            buf = buf[cut:]
+            base += cut
+            pos = 0
+            chunk = f.read(max(chunk_size, len(buf)))
+            if not chunk:
+                eof = True
+            buf += chunk
+            continue
+
+        row, pos = parsed
+        if row is not None:
+            yield current_table, row
+
+
+def _skip(f: BinaryIO, n: int, chunk_size: int) -> int:
+    """Read and drop the next `n` bytes of `f`; returns how many there were."""
+    skipped = 0
+    while skipped < n:
+        chunk = f.read(min(chunk_size, n - skipped))
+        if not chunk:
+            break
+        skipped += len(chunk)
+    return skipped
+
+
+def _find_statements(
+    buf: Buffer, target: Set[str], schemas: Optional[_Schemas] = None
+) -> List[Tuple[str, int, int]]:
+    """
+    Cheap pre-scan for --workers: (table, offset, length) byte ranges of the
+    INSERT statements of target tables, in dump order. Only header lines are
+    matched; nothing is decoded or tokenized. A range runs up to the next INSERT
+    header or EOF. CREATE TABLEs on the way are recorded in `schemas`.
+    """
+    found: List[Tuple[str, int, int]] = []
+    open_table: Optional[str] = None
+    open_offset = 0
+    pos = 0
+    while True:
+        m = _next_header(buf, pos)
+        end = m.start() if m is not None else len(buf)
+        if schemas is not None:
+            schemas.record(buf, pos, end)
+        if open_table is not None:
+            found.append((open_table, open_offset, end - open_offset))
+        if m is None:
+            return found
+        table = m.group("table").decode("utf-8", errors="replace")
+        open_table, open_offset = (table, m.start()) if table in target else (None, 0)
+        pos = m.end()
+
+
+def _parse_statement_at(
+    sql_path: str,
+    table: str,
+    offset: int,
+    length: int,
+    wanted: Optional[Sequence[str]],
+    predicate: Optional[Predicate],
+    schema: Optional[TableSchema] = None,
+) -> List[List[Any]]:
+    """Worker for --workers: parse + coerce the rows of the INSERT in bytes [offset, offset+length)."""
+    with open(sql_path, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    columns = {table: wanted} if wanted is not None else None
+    where = {table: predicate} if predicate is not None else None
+    schemas = _Schemas({table: schema}) if schema is not None else None
+    rows = _iter_buffer_rows(data, {table}, columns=columns, where=where, schemas=schemas, base=offset)
+    return [row for _, row in rows]
+
+
+def _iter_rows_parallel(
+    sql_path: str,
+    ranges: List[Tuple[str, int, int]],
+    workers: int,
+    columns: Optional[Mapping[str, Sequence[str]]] = None,
+    where: Optional[Mapping[str, Predicate]] = None,
+    schemas: Optional[Mapping[str, Optional[TableSchema]]] = None,
+    on_statement: Optional[StatementCallback] = None,
+) -> Iterator[Tuple[str, List[Any]]]:
+    columns = columns or {}
+    where = where or {}
+    schemas = schemas or {}
+    statements = iter(ranges)
+    # Keep a bounded window of statements in flight and yield them in dump
+    # order, so the output matches single-process mode row for row.
+    pending: Deque[Tuple[str, int, Future]] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+
+        def submit(table: str, offset: int, length: int) -> None:
+            task = (sql_path, table, offset, length, columns.get(table), where.get(table), schemas.get(table))
+            pending.append((table, offset + length, pool.submit(_parse_statement_at, *task)))
+
+        for stmt in islice(statements, workers * 4):
+            submit(*stmt)
+        while pending:
+            table, end, fut = pending.popleft()
+            nxt = next(statements, None)
+            if nxt is not None:
+                submit(*nxt)
+            for row in fut.result():
+                yield table, row
+            if on_statement is not None:
+                on_statement(Position(end, table, schemas))
+
+
+def _map(f: BinaryIO) -> Optional[mmap.mmap]:
+    try:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError, io.UnsupportedOperation):
+        # Empty file, pipe, or a platform without mmap for this file.
+        return None
+
+
+def _indexed_ranges(index: Mapping[str, Any], target: Set[str]) -> List[Tuple[str, int, int]]:
+    """(table, offset, length) of the target tables' INSERTs from a DumpIndex, in dump order."""
+    ranges = [
+        (table, offset, length)
+        for table in target
+        if table in index
+        for offset, length, _rows in index[table].statements
+    ]
+    ranges.sort(key=lambda r: r[1])
+    return ranges
+
+
+def iter_rows(
+    sql_path: str,
+    target_tables: Iterable[str],
+    chunk_size: int = CHUNK_SIZE,
+    workers: int = 1,
+    index: Optional[Mapping[str, Any]] = None,
+    columns: Optional[Mapping[str, Sequence[str]]] = None,
+    where: Optional[Mapping[str, Predicate]] = None,
+    schema: bool = True,
+    resume: Optional[Position] = None,
+    on_statement: Optional[StatementCallback] = None,
+    on_create: Optional[CreateCallback] = None,
+) -> Iterator[Tuple[str, List[Any]]]:
+    """
+    Stream (table, row) pairs for every row of the target tables, in dump order.
+
+    The dump is memory-mapped and scanned as bytes; other tables' statements are
+    skipped without decoding and only target-table fields are decoded. Files
+    that cannot be mapped are read in `chunk_size` pieces instead.
+
+    With workers > 1, INSERT statements are located by a cheap pre-scan and parsed
+    in a process pool, one statement per task; rows come back in the same order.
+
+    With an `index` (see sqldump.index.load_index), the target tables' INSERTs
+    are read straight from their recorded offsets and nothing else is scanned.
+
+    gzip/bz2/xz-compressed dumps are streamed through a decompressing reader
+    thread (see sqldump.compressed); `workers` and `index` are ignored for them.
+
+    `columns` maps a table to the column names wanted from it (matched against
+    each INSERT's column list). Its rows then hold just those values, in that
+    order, and every other field is skipped without being copied or coerced.
+    Tables not in `columns` yield full rows.
+
+    `where` maps a table to one (column, op, value) predicate, op being one of
+    WHERE_OPS, e.g. {"users": ("role", "==", "tour_operator")}. The predicate
+    column is decoded and tested first; tuples that fail (including NULLs and
+    values of an incomparable type) are dropped before any other field is
+    decoded.
+
+    With `schema` (the default), each table's fields are converted by the column
+    types of its CREATE TABLE in the dump: INT columns give int, DECIMAL gives
+    Decimal, FLOAT/DOUBLE float (numbers even when quoted), DATETIME/TIMESTAMP datetime,
+    DATE date, ENUM one shared str per member, text columns str. Values a
+    column type does not account for (zero dates, say), and tables without a
+    CREATE TABLE, fall back to guessing from the literal as with schema=False.
+
+    `on_statement` is called with a Position each time the last row of a
+    target-table INSERT has been taken. Passing one back as `resume` (with the
+    same tables, columns, where and schema) continues with exactly the rows that
+    would have followed it, in any mode; see sqldump.checkpoint.
+
+    With `schema`, `on_create` is called with (table, schema) for every CREATE
+    TABLE read on the way, as it is reached (before that table's rows, in dump
+    order); with an `index`, for the target tables' only. A resumed read reports
+    the ones its Position carries first. Tables without any INSERT are
+    reported too, so this is where a caller can check its columns against a
+    table it gets no rows from.
+
+    A tuple that never closes (an unclosed quote, or a dump cut off inside a
+    row) raises ValueError with its byte offset in every mode; a dump that ends
+    after a complete tuple without the ";" is read to the end.
+    """
+    target = set(target_tables)
+    schemas = _Schemas(resume.schemas if resume is not None else None, on_create) if schema else None
+    start = resume.offset if resume is not None else 0
+    codec = compression(sql_path)
+    if codec is not None:
+        with open_decompressed(sql_path, codec) as z:
+            yield from _iter_stream_rows(
+                z, target, chunk_size, columns, where, schemas, start, on_statement  # type: ignore[arg-type]
+            )
+        return
+    with open(sql_path, "rb") as f:
+        mm = _map(f)
+        if mm is None:
+            yield from _iter_stream_rows(f, target, chunk_size, columns, where, schemas, start, on_statement)
+            return
+        with mm:
+            ranges = _indexed_ranges(index, target) if index is not None else None
+            if schemas is not None and index is not None:
+                for table in target:
+                    entry = index.get(table)
+                    if entry is not None and entry.create_offset is not None:
+                        parsed = parse_create(mm, entry.create_offset)
+                        schemas.set(table, parsed[1] if parsed is not None else None)
+            if workers > 1:
+                if ranges is None:
+                    ranges = _find_statements(mm, target, schemas)
+                known = {t: schemas.get(t) for t in target} if schemas is not None else None
+                ranges = [r for r in ranges if r[1] >= start]
+                yield from _iter_rows_parallel(sql_path, ranges, workers, columns, where, known, on_statement)
+            elif ranges is not None:
+                statements = [(table, offset) for table, offset, _ in ranges if offset >= start]
+                yield from _iter_buffer_rows(mm, target, statements, columns, where, schemas, on_statement=on_statement)
+            else:
+                yield from _iter_buffer_rows(
+                    mm, target, columns=columns, where=where, schemas=schemas, start=start, on_statement=on_statement
+                )
+
+
+def _iter_buffer_statements(buf: Buffer, target: Optional[Set[str]]) -> Iterator[Tuple[str, bytes]]:
+    pos = 0
+    while True:
+        m = _next_header(buf, pos)
+        if m is None:
+            return
+        pos = m.end()
+        table = m.group("table").decode("utf-8", errors="replace")
+        if target is not None and table not in target:
+            continue
+        rows = _iter_statement_rows(buf, pos)
+        # Walk the tuples only to find the statement's real end.
+        end = pos
+        while True:
+            try:
+                next(rows)
+            except StopIteration as stop:
+                end = stop.value
+                break
+        yield table, buf[pos : end - 1 if buf[end - 1] == _SEMI else end]
+        pos = end
+
+
+def iter_statements(
+    sql_path: str, target_tables: Optional[Iterable[str]] = None
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (table, values_bytes) for every INSERT statement of the target tables
+    (all tables when None): the raw VALUES section without the trailing ";".
+    Nothing is decoded.
+    """
+    target = set(target_tables) if target_tables is not None else None
+    codec = compression(sql_path)
+    if codec is not None:
+        with open_decompressed(sql_path, codec) as z:
+            yield from _iter_buffer_statements(z.read(), target)
+        return
+    with open(sql_path, "rb") as f:
+        mm = _map(f)
+        try:
+            yield from _iter_buffer_statements(mm if mm is not None else f.read(), target)
+        finally:
+            if mm is not None:
+                mm.close()
+
+
+def iter_inserts(
+    sql_path: str,
+    target_tables: Iterable[str],
+    workers: int = 1,
+    index: Optional[Mapping[str, Any]] = None,
+    columns: Optional[Mapping[str, Sequence[str]]] = None,
+    where: Optional[Mapping[str, Predicate]] = None,
+    layout: Optional[Layout] = None,
+    schema: bool = True,
+) -> Dict[str, Rows]:
+    """
+    Returns dict: table -> list of parsed rows (as arrays in column order as in
+    dump, or in `columns` order for projected tables), keeping only rows that
+    pass the table's `where` predicate; see iter_rows.
+
+    Tables in `layout` ({table: {column: kind}}, see sqldump.compact) are held
+    in a column-wise compact Table instead of a list; they must be projected.
+    """
+    target = set(target_tables)
+    out: Dict[str, Rows] = {t: new_table(t, columns, layout) for t in target}
+    rows = iter_rows(sql_path, target, workers=workers, index=index, columns=columns, where=where, schema=schema)
+    for table, row in rows:
+        out[table].append(row)
+    return out
+
+
+def benchmark_scanner(sql_path: str, repeat: int = 3) -> Dict[str, float]:
+    """
+    Time the legacy _split_tuples + _split_fields pair against _scan_tuple over
+    every VALUES section of the dump (all tables). Both run on the same in-memory
+    blobs, so this measures tokenizing only: no file IO and no _coerce_value.
+    Each side keeps its best of `repeat` runs.
+    """
+    blobs = [values for _, values in iter_statements(sql_path)]
+    texts = [b.decode("utf-8", errors="replace") for b in blobs]
+    mb = sum(len(b) for b in blobs) / (1 << 20)
+
+    legacy_s = fused_s = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        legacy_fields = 0
+        for text in texts:
+            for t in _split_tuples(text):
+                legacy_fields += len(_split_fields(t))
+        legacy_s = min(legacy_s, time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        fused_fields = 0
+        for blob in blobs:
+            pos = 0
+            while True:
+                nxt = _VALUES_NEXT_RE.search(blob, pos)
+                if nxt is None:
+                    break
+                fields, pos = _scan_tuple(blob, nxt.start())  # type: ignore[misc]
+                fused_fields += len(fields)
+        fused_s = min(fused_s, time.perf_counter() - t0)
+
+    if legacy_fields != fused_fields:
+        raise RuntimeError(f"scanner mismatch: legacy={legacy_fields} fused={fused_fields} fields")
+
+    return {
+        "values_mb": mb,
+        "fields": float(fused_fields),
+        "legacy_mb_s": mb / legacy_s if legacy_s else float("inf"),
+        "fused_mb_s": mb / fused_s if fused_s else float("inf"),
+        "speedup": legacy_s / fused_s if fused_s else float("inf"),
+    }
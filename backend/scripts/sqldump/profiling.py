@@ -0,0 +1,203 @@
+"""
+Per-stage instrumentation for the dump scripts (--profile).
+
+Stages are timed with `with prof.stage("name") as st:` and may nest or repeat;
+each stage reports its own (self) wall and CPU time, so nested stages are not
+counted twice and the stages add up to the run. Callers add the rows/bytes a
+stage handled to `st`. With enabled=False every stage is a shared no-op.
+
+Memory is only available as the process's peak RSS so far (ru_maxrss), which
+never goes down. Each stage reports how much it raised that peak (self, like
+the times: rss_growth_mb) and the peak when it last ended (rss_high_water_mb),
+not a peak of its own.
+
+The report is plain JSON. Optionally one stage ("hot stage") also runs under
+cProfile; its stats are dumped to a .prof file (snakeviz / pstats) and the
+top functions are summarized in the report.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import json
+import os
+import platform
+import pstats
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+HOT_FUNCTIONS = 20
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / (1 << 10)
+
+
+class Stage:
+    __slots__ = (
+        "name",
+        "calls",
+        "wall",
+        "cpu",
+        "child_wall",
+        "child_cpu",
+        "rows",
+        "bytes",
+        "rss_growth",
+        "child_rss_growth",
+        "rss_high_water",
+    )
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.wall = self.cpu = 0.0
+        self.child_wall = self.child_cpu = 0.0
+        self.rows = 0
+        self.bytes = 0
+        self.rss_growth = self.child_rss_growth = 0.0
+        self.rss_high_water = 0.0
+
+    def report(self) -> Dict[str, Any]:
+        wall = self.wall - self.child_wall
+        return {
+            "calls": self.calls,
+            "wall_s": wall,
+            "cpu_s": self.cpu - self.child_cpu,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "rows_s": self.rows / wall if self.rows and wall > 0 else None,
+            "mb_s": self.bytes / (1 << 20) / wall if self.bytes and wall > 0 else None,
+            "rss_growth_mb": self.rss_growth - self.child_rss_growth,
+            "rss_high_water_mb": self.rss_high_water,
+        }
+
+
+class _Timer:
+    __slots__ = ("prof", "stage", "t0", "c0", "rss0", "profiling")
+
+    def __init__(self, prof: "Profiler", stage: Stage):
+        self.prof = prof
+        self.stage = stage
+
+    def __enter__(self) -> Stage:
+        prof = self.prof
+        prof._stack.append(self)
+        self.t0 = time.perf_counter()
+        self.c0 = time.process_time()
+        self.rss0 = peak_rss_mb()
+        self.profiling = prof._cprofile is not None and self.stage.name == prof.hot_stage
+        if self.profiling:
+            prof._cprofile.enable()  # type: ignore[union-attr]
+        return self.stage
+
+    def __exit__(self, *exc: Any) -> None:
+        if self.profiling:
+            self.prof._cprofile.disable()  # type: ignore[union-attr]
+        wall = time.perf_counter() - self.t0
+        cpu = time.process_time() - self.c0
+        rss = peak_rss_mb()
+        growth = rss - self.rss0
+        stage = self.stage
+        stage.calls += 1
+        stage.wall += wall
+        stage.cpu += cpu
+        stage.rss_growth += growth
+        stage.rss_high_water = rss
+        stack = self.prof._stack
+        stack.pop()
+        if stack:
+            parent = stack[-1].stage
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+            parent.child_rss_growth += growth
+
+
+class _NullStage:
+    """What a disabled profiler hands out: accepts rows/bytes and times nothing."""
+
+    rows = 0
+    bytes = 0
+
+    def __enter__(self) -> "_NullStage":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+_NULL = _NullStage()
+
+
+class Profiler:
+    def __init__(self, enabled: bool = True, hot_stage: Optional[str] = None):
+        self.enabled = enabled
+        self.hot_stage = hot_stage
+        self.stages: Dict[str, Stage] = {}
+        self.tables: Dict[str, Dict[str, Any]] = {}
+        self.meta: Dict[str, Any] = {}
+        self._stack: List[_Timer] = []
+        self._cprofile = cProfile.Profile() if enabled and hot_stage else None
+        self._t0 = time.perf_counter()
+        self._c0 = time.process_time()
+
+    def stage(self, name: str) -> Any:
+        if not self.enabled:
+            return _NULL
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Stage(name)
+        return _Timer(self, stage)
+
+    def table(self, name: str, rows: int, nbytes: Optional[int] = None) -> None:
+        self.tables[name] = {"rows": rows, "bytes": nbytes}
+
+    def report(self) -> Dict[str, Any]:
+        wall = time.perf_counter() - self._t0
+        return {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            **self.meta,
+            "wall_s": wall,
+            "cpu_s": time.process_time() - self._c0,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": {name: s.report() for name, s in self.stages.items()},
+            "tables": self.tables,
+        }
+
+    def write(self, path: str) -> Dict[str, Any]:
+        """Write the JSON report (and <path minus .json>.<hot stage>.prof); returns the report."""
+        report = self.report()
+        if self._cprofile is not None:
+            prof_path = f"{os.path.splitext(path)[0]}.{self.hot_stage}.prof"
+            self._cprofile.dump_stats(prof_path)
+            stats = pstats.Stats(self._cprofile).sort_stats(pstats.SortKey.CUMULATIVE)
+            hot = []
+            for func in stats.fcn_list[:HOT_FUNCTIONS]:  # type: ignore[attr-defined]
+                _cc, calls, tottime, cumtime, _callers = stats.stats[func]  # type: ignore[attr-defined]
+                hot.append(
+                    {"function": pstats.func_std_string(func), "calls": calls, "tottime_s": tottime, "cumtime_s": cumtime}
+                )
+            report["cprofile"] = {"stage": self.hot_stage, "path": prof_path, "top_cumulative": hot}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        return report
+
+    def summary(self) -> List[str]:
+        lines = []
+        for name, s in self.report()["stages"].items():
+            rate = f", {s['rows_s']:,.0f} rows/s" if s["rows_s"] else ""
+            mb = f", {s['mb_s']:.1f} MB/s" if s["mb_s"] else ""
+            lines.append(f"{name:<14} {s['wall_s']:8.3f}s wall {s['cpu_s']:8.3f}s cpu{rate}{mb}")
+        return lines
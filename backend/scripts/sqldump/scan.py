@@ -0,0 +1,230 @@
+"""
+One dump scan shared by several consumers.
+
+Each consumer subscribes to the (table, columns, where) it needs; Scan.run()
+then makes a single iter_rows pass that reads the union of the subscribed
+columns and hands every row to the subscriptions it matches. A table's
+predicate is pushed down into the parser when all of its subscriptions use the
+same one; otherwise each subscription tests its own after projection.
+
+Subscribed columns are checked against each table's CREATE TABLE as the same
+pass reaches it, and against every INSERT's column list: a column the dump does
+not have raises ValueError, even for a table with no rows, and without reading
+the dump beforehand.
+
+Pipelines are scripts that define `register(scan, out_dir)`, returning a
+callable that writes their outputs once the scan is done. Several of them, plus
+ad-hoc subscriptions, can share one pass over a dump:
+
+  cd backend/scripts
+  python3 -m sqldump scan ~/Desktop/zoea.sql --out-dir /tmp/out \\
+    --pipeline ../src/migration/archive/extract-sponsored.py \\
+    --subscribe "categories:category_id,category_name" \\
+    --subscribe "venues:venue_id,venue_name,category_id:venue_status == active"
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+
+from .compact import Rows, Table
+from .parser import Predicate, _compile_predicate, iter_rows
+from .schema import TableSchema
+
+RowCallback = Callable[[List[Any]], None]
+
+
+class Subscription:
+    """
+    Rows of `table` with `columns` (in that order) that pass `where`. Rows are
+    passed to `on_row` as they are read, or collected in `rows` without one;
+    with a `layout` ({column: kind}, see sqldump.compact) `rows` is a compact
+    Table.
+    """
+
+    def __init__(
+        self,
+        table: str,
+        columns: Sequence[str],
+        where: Optional[Predicate] = None,
+        on_row: Optional[RowCallback] = None,
+        layout: Optional[Mapping[str, str]] = None,
+    ):
+        self.table = table
+        self.columns = list(columns)
+        self.where = where
+        self.on_row = on_row
+        self.rows: Rows = Table(self.columns, layout) if layout else []
+        self.count = 0
+
+
+class Scan:
+    def __init__(self, sql_path: str, workers: int = 1, index: Optional[Mapping[str, Any]] = None):
+        self.sql_path = sql_path
+        self.workers = workers
+        self.index = index
+        self.subscriptions: List[Subscription] = []
+
+    def subscribe(
+        self,
+        table: str,
+        columns: Sequence[str],
+        where: Optional[Predicate] = None,
+        on_row: Optional[RowCallback] = None,
+        layout: Optional[Mapping[str, str]] = None,
+    ) -> Subscription:
+        sub = Subscription(table, columns, where, on_row, layout)
+        self.subscriptions.append(sub)
+        return sub
+
+    def run(self) -> Dict[str, int]:
+        """Scan the dump once and feed every subscription; returns rows read per table."""
+        by_table: Dict[str, List[Subscription]] = {}
+        for sub in self.subscriptions:
+            by_table.setdefault(sub.table, []).append(sub)
+
+        columns: Dict[str, List[str]] = {}
+        where: Dict[str, Predicate] = {}
+        # table -> [(subscription, positions in the union row, own test or None, test position)]
+        routes: Dict[str, List[Any]] = {}
+        for table, subs in by_table.items():
+            predicates = {repr(s.where) for s in subs}
+            pushed = subs[0].where if len(predicates) == 1 else None
+            if pushed is not None:
+                where[table] = pushed
+            # Subscriptions whose predicate was not pushed down test it themselves.
+            local = [s for s in subs if s.where is not None and pushed is None]
+            union: List[str] = []
+            for s in subs:
+                wanted = s.columns + ([s.where[0]] if s in local else [])  # type: ignore[index]
+                union += [c for c in wanted if c not in union]
+            columns[table] = union
+            pos = {c: i for i, c in enumerate(union)}
+            routes[table] = [
+                (
+                    s,
+                    [pos[c] for c in s.columns],
+                    _compile_predicate(s.where) if s in local else None,  # type: ignore[arg-type]
+                    pos[s.where[0]] if s in local else -1,  # type: ignore[index]
+                )
+                for s in subs
+            ]
+
+        def check_columns(table: str, schema: Optional[TableSchema]) -> None:
+            # Same error as a missing column in an INSERT's column list.
+            if schema is None or table not in columns:
+                return
+            wanted = columns[table] + [where[table][0]] if table in where else columns[table]
+            missing = [c for c in dict.fromkeys(wanted) if c not in schema]
+            if missing:
+                raise ValueError(f"`{table}` has no column(s) {', '.join(missing)}")
+
+        counts = {table: 0 for table in by_table}
+        rows = iter_rows(
+            self.sql_path,
+            list(by_table),
+            workers=self.workers,
+            index=self.index,
+            columns=columns,
+            where=where,
+            on_create=check_columns,
+        )
+        for table, row in rows:
+            counts[table] += 1
+            for sub, fields, test, test_at in routes[table]:
+                if test is not None and not test(row[test_at]):
+                    continue
+                values = [row[i] for i in fields]
+                sub.count += 1
+                if sub.on_row is not None:
+                    sub.on_row(values)
+                else:
+                    sub.rows.append(values)
+        return counts
+
+
+def load_script(path: str, name: Optional[str] = None) -> ModuleType:
+    """Import a script by file path, with its own directory importable (for sibling modules)."""
+    path = os.path.abspath(path)
+    name = name or os.path.splitext(os.path.basename(path))[0].replace("-", "_")
+    sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)  # type: ignore[arg-type]
+    sys.modules[name] = module
+    spec.loader.exec_module(module)  # type: ignore[union-attr]
+    return module
+
+
+def _literal(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+def parse_subscription(spec: str) -> Dict[str, Any]:
+    """subscribe() kwargs from "table:col1,col2[:column op value]", e.g. "venues:venue_id:sponsored > 0"."""
+    table, _, rest = spec.partition(":")
+    cols, _, cond = rest.partition(":")
+    if not table or not cols:
+        raise ValueError(f"bad subscription {spec!r} (expected table:col1,col2[:column op value])")
+    where = None
+    if cond:
+        parts = cond.split(None, 2)
+        if len(parts) != 3:
+            raise ValueError(f"bad where {cond!r} (expected: column op value)")
+        where = (parts[0], parts[1], _literal(parts[2]))
+    return {"table": table, "columns": [c.strip() for c in cols.split(",")], "where": where}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(prog="sqldump scan", description="Run several extractions over one scan of a dump.")
+    ap.add_argument("input")
+    ap.add_argument("--out-dir", default=os.getcwd())
+    ap.add_argument("--pipeline", action="append", default=[], help="Script defining register(scan, out_dir).")
+    ap.add_argument(
+        "--subscribe",
+        action="append",
+        default=[],
+        help='Ad-hoc "table:col1,col2[:column op value]"; rows go to <out-dir>/<table>.ndjson.',
+    )
+    ap.add_argument("--workers", type=int, default=1)
+    args = ap.parse_args()
+
+    scan = Scan(args.input, workers=args.workers)
+    finishers = [load_script(p).register(scan, args.out_dir) for p in args.pipeline]
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    dumps = []
+    for i, spec in enumerate(args.subscribe):
+        kw = parse_subscription(spec)
+        path = os.path.join(args.out_dir, f"{kw['table']}.ndjson")
+        # Several ad-hoc subscriptions of one table get numbered files.
+        if any(d[0] == path for d in dumps):
+            path = os.path.join(args.out_dir, f"{kw['table']}.{i}.ndjson")
+        f = open(path, "w", encoding="utf-8")
+        names = kw["columns"]
+
+        def write(values: List[Any], f: Any = f, names: List[str] = names) -> None:
+            f.write(json.dumps(dict(zip(names, values)), ensure_ascii=False, default=str) + "\n")
+
+        dumps.append((path, f, scan.subscribe(on_row=write, **kw)))
+
+    counts = scan.run()
+    for finish in finishers:
+        finish()
+    for path, f, sub in dumps:
+        f.close()
+        print(f"- {sub.table}: {sub.count} rows -> {path}")
+    print(f"✅ One scan of {args.input}: " + ", ".join(f"{t} {n}" for t, n in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
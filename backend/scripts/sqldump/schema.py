@@ -0,0 +1,193 @@
+"""
+Column types from a dump's CREATE TABLE statements.
+
+Each column is reduced to a converter kind ("int", "decimal", "float", "str",
+"datetime", "date", "enum"); the parser turns a table's kinds into one
+converter per field position (see parser._converters), so every field is
+converted by what its column is instead of by guessing from the literal.
+Columns of other types (bit, time, spatial, ...) keep the per-value guess.
+"""
+
+from __future__ import annotations
+
+import mmap
+import re
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+_CREATE_MARK = b"CREATE TABLE "
+_CREATE_RE = re.compile(rb"CREATE TABLE (?:IF NOT EXISTS )?`(?P<table>[^`]+)`")
+
+# A quoted literal inside a column definition (enum members, defaults, comments).
+_STR = rb"'(?:[^'\\]|\\.|'')*'"
+# "  `name` type[(args)] ..." lines of the column list; key lines start with a keyword instead.
+_COLUMN_RE = re.compile(
+    rb"^[ \t]*`(?P<name>[^`]+)`[ \t]+(?P<type>[A-Za-z]+)(?:[ \t]*\((?P<args>(?:" + _STR + rb"|[^')])*)\))?",
+    re.M,
+)
+_MEMBER_RE = re.compile(_STR)
+# The column list ends on the line starting with ")" (") ENGINE=InnoDB ...;").
+_END_MARK = b"\n)"
+
+# A CREATE TABLE longer than this is not waited for by the chunked reader.
+MAX_CREATE_BYTES = 1 << 20
+
+# "PRIMARY KEY (`a`,`b`)" in a CREATE TABLE, or in "ALTER TABLE `t` ADD PRIMARY KEY (...)".
+_PRIMARY_RE = re.compile(rb"PRIMARY KEY\s*\((?P<columns>(?:`[^`]+`(?:\(\d+\))?[\s,]*)+)\)")
+_ALTER_RE = re.compile(rb"ALTER TABLE `(?P<table>[^`]+)`")
+_NAME_RE = re.compile(rb"`([^`]+)`")
+
+KINDS: Dict[bytes, str] = {
+    **dict.fromkeys([b"tinyint", b"smallint", b"mediumint", b"int", b"integer", b"bigint", b"year"], "int"),
+    **dict.fromkeys([b"decimal", b"numeric", b"dec", b"fixed"], "decimal"),
+    **dict.fromkeys([b"float", b"double", b"real"], "float"),
+    **dict.fromkeys(
+        [
+            b"char",
+            b"varchar",
+            b"tinytext",
+            b"text",
+            b"mediumtext",
+            b"longtext",
+            b"json",
+            b"set",
+            b"binary",
+            b"varbinary",
+            b"tinyblob",
+            b"blob",
+            b"mediumblob",
+            b"longblob",
+        ],
+        "str",
+    ),
+    **dict.fromkeys([b"datetime", b"timestamp"], "datetime"),
+    b"date": "date",
+    b"enum": "enum",
+}
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+class Column(NamedTuple):
+    name: str
+    sql_type: str
+    kind: Optional[str]  # None: guess per value
+    # enum: the members as they appear quoted in an INSERT ('' in the DDL is \' there).
+    members: Tuple[bytes, ...] = ()
+
+
+# column name -> Column
+TableSchema = Dict[str, Column]
+
+
+def _column(m: "re.Match[bytes]") -> Column:
+    sql_type = m.group("type").lower()
+    kind = KINDS.get(sql_type)
+    members: Tuple[bytes, ...] = ()
+    if kind == "enum":
+        members = tuple(
+            b"'" + lit[1:-1].replace(b"''", b"\\'") + b"'" for lit in _MEMBER_RE.findall(m.group("args") or b"")
+        )
+    return Column(m.group("name").decode("utf-8", errors="replace"), sql_type.decode("ascii"), kind, members)
+
+
+def parse_create(buf: Buffer, start: int) -> Optional[Tuple[str, TableSchema, int]]:
+    """
+    (table, schema, end) of the CREATE TABLE at buf[start], end being just past
+    its column list; None when that is not complete within `buf`.
+    """
+    m = _CREATE_RE.match(buf, start)
+    if m is None:
+        return None
+    end = buf.find(_END_MARK, m.end())
+    if end == -1:
+        return None
+    body = buf[m.end() : end]
+    schema = {col.name: col for col in map(_column, _COLUMN_RE.finditer(body))}
+    return m.group("table").decode("utf-8", errors="replace"), schema, end + len(_END_MARK)
+
+
+def iter_creates(buf: Buffer, start: int, end: int) -> Iterator[Tuple[int, Optional[Tuple[str, TableSchema, int]]]]:
+    """
+    (offset, parse_create result) of every CREATE TABLE line in buf[start:end];
+    the result is None for one whose column list runs past the buffer.
+    """
+    pos = start
+    j = 0 if start == 0 and buf[: len(_CREATE_MARK)] == _CREATE_MARK else -1
+    while True:
+        if j == -1:
+            j = buf.find(b"\n" + _CREATE_MARK, max(pos - 1, 0), end)
+            if j == -1:
+                return
+            j += 1
+        if _CREATE_RE.match(buf, j) is not None:
+            yield j, parse_create(buf, j)
+        pos, j = j + 1, -1
+
+
+class Definitions(NamedTuple):
+    schemas: Dict[str, TableSchema]
+    primary_keys: Dict[str, List[str]]
+
+
+def _key_columns(m: "re.Match[bytes]") -> List[str]:
+    return [c.decode("utf-8", errors="replace") for c in _NAME_RE.findall(m.group("columns"))]
+
+
+def _lines(f: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+    # Only line starts matter here, so a line is cut to MAX_CREATE_BYTES
+    # while it is being assembled (long INSERT lines stay cheap).
+    rest = b""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            if rest:
+                yield rest
+            return
+        lines = (rest + chunk).split(b"\n")
+        rest = lines.pop()[:MAX_CREATE_BYTES]
+        yield from lines
+
+
+def read_definitions(f: BinaryIO, chunk_size: int = 1 << 20) -> Definitions:
+    """
+    Column types and primary keys of every table of the dump read from `f`.
+    Keys come from PRIMARY KEY lines inside CREATE TABLE (mysqldump) or from
+    ALTER TABLE ... ADD PRIMARY KEY statements (phpMyAdmin writes those after
+    all the data). Lines are only matched by how they start; rows are never
+    parsed.
+    """
+    schemas: Dict[str, TableSchema] = {}
+    keys: Dict[str, List[str]] = {}
+    create: Optional[List[bytes]] = None
+    create_bytes = 0
+    altering: Optional[str] = None
+    for line in _lines(f, chunk_size):
+        if create is not None:
+            create.append(line)
+            create_bytes += len(line)
+            if line.startswith(b")"):
+                body = b"\n".join(create)
+                parsed = parse_create(body, 0)
+                if parsed is not None:
+                    table, schema, _end = parsed
+                    schemas[table] = schema
+                    m = _PRIMARY_RE.search(body)
+                    if m is not None:
+                        keys[table] = _key_columns(m)
+                create = None
+            elif create_bytes > MAX_CREATE_BYTES:
+                create = None
+            continue
+        if line.startswith(_CREATE_MARK) and _CREATE_RE.match(line):
+            create, create_bytes = [line], len(line)
+            continue
+        if line.startswith(b"ALTER TABLE "):
+            m = _ALTER_RE.match(line)
+            altering = m.group("table").decode("utf-8", errors="replace") if m is not None else None
+        if altering is not None:
+            m = _PRIMARY_RE.search(line)
+            if m is not None:
+                keys[altering] = _key_columns(m)
+            if line.rstrip().endswith(b";"):
+                altering = None
+    return Definitions(schemas, keys)
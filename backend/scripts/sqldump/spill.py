@@ -0,0 +1,240 @@
+"""
+Hash partitions that spill to disk, for joins bigger than memory.
+
+Records are added under a key and land in one of `n` partitions by the key's
+hash. Each partition buffers its records pickled in memory; whenever the
+buffered total goes over the memory budget, the largest buffers are appended
+to that partition's temporary file. Reading a partition gives its records in
+the order they were added, whether or not any of them went to disk, so a join
+built on top gives the same result under any budget.
+
+A join then reads one partition at a time (everything with the same key is in
+the same partition) and merges the per-partition results, each written back in
+key order with add_to(), with heapq.merge.
+
+SortedRuns is the external sort for when records have to come back in key
+order (a merge join of two dumps): the buffer is sorted and written out as a
+run whenever it goes over the budget, and reading merges the runs. Runs are
+merged MERGE_FAN_IN at a time as they pile up (each group into one longer run),
+so a tiny budget over a big dump never holds more than a few hundred files
+open.
+"""
+
+from __future__ import annotations
+
+import heapq
+import io
+import os
+import pickle
+import tempfile
+from operator import itemgetter
+from typing import IO, Any, Hashable, Iterator, List, Optional, Tuple
+
+DEFAULT_PARTITIONS = 64
+
+# Most runs merged in one pass.
+MERGE_FAN_IN = 64
+
+_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def _records(f: IO[bytes]) -> Iterator[Any]:
+    # One load per record: each was pickled on its own, with its own memo.
+    while True:
+        try:
+            yield pickle.load(f)
+        except EOFError:
+            return
+
+
+class Partitions:
+    """
+    `n` append-only partitions of picklable records, held within
+    `memory_budget` bytes (pickled size) by spilling to files in `tmp_dir`.
+    memory_budget=None never spills.
+    """
+
+    def __init__(self, n: int = DEFAULT_PARTITIONS, memory_budget: Optional[int] = None, tmp_dir: Optional[str] = None):
+        if n < 1:
+            raise ValueError("need at least one partition")
+        self.n = n
+        self.memory_budget = memory_budget
+        self.tmp_dir = tmp_dir
+        self.buffers = [bytearray() for _ in range(n)]
+        self.files: List[Optional[IO[bytes]]] = [None] * n
+        self.buffered = 0
+        self.records = 0
+        self.spills = 0
+        self.spilled_bytes = 0
+
+    def partition_of(self, key: Hashable) -> int:
+        return hash(key) % self.n
+
+    def add(self, key: Hashable, record: Any) -> None:
+        """Add (key, record) to the key's partition."""
+        self.add_to(self.partition_of(key), (key, record))
+
+    def add_to(self, i: int, record: Any) -> None:
+        data = pickle.dumps(record, _PROTOCOL)
+        self.buffers[i] += data
+        self.buffered += len(data)
+        self.records += 1
+        if self.memory_budget is not None and self.buffered > self.memory_budget:
+            self._spill()
+
+    def _spill(self) -> None:
+        # Largest buffers first, until everything still buffered fits in half the budget.
+        limit = self.memory_budget // 2  # type: ignore[operator]
+        for i in sorted(range(self.n), key=lambda k: len(self.buffers[k]), reverse=True):
+            if self.buffered <= limit:
+                break
+            buf = self.buffers[i]
+            if not buf:
+                break
+            f = self.files[i]
+            if f is None:
+                if self.tmp_dir:
+                    os.makedirs(self.tmp_dir, exist_ok=True)
+                f = self.files[i] = tempfile.TemporaryFile(prefix="sqldump-spill-", dir=self.tmp_dir)
+            f.write(buf)
+            self.spills += 1
+            self.spilled_bytes += len(buf)
+            self.buffered -= len(buf)
+            self.buffers[i] = bytearray()
+
+    @property
+    def spilled(self) -> bool:
+        return self.spills > 0
+
+    def partition(self, i: int) -> Iterator[Any]:
+        """The records of partition `i`, in the order they were added."""
+        f = self.files[i]
+        if f is not None:
+            f.flush()
+            f.seek(0)
+            yield from _records(f)
+            f.seek(0, io.SEEK_END)
+        yield from _records(io.BytesIO(self.buffers[i]))
+
+    def drop(self, i: int) -> None:
+        """Free partition `i` (memory and file) once it has been consumed."""
+        self.buffered -= len(self.buffers[i])
+        self.buffers[i] = bytearray()
+        f = self.files[i]
+        if f is not None:
+            f.close()
+            self.files[i] = None
+
+    def close(self) -> None:
+        for i in range(self.n):
+            self.drop(i)
+
+    def __enter__(self) -> "Partitions":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def stats(self) -> Tuple[int, int, int]:
+        """(records added, spill writes, bytes spilled)."""
+        return self.records, self.spills, self.spilled_bytes
+
+
+class SortedRuns:
+    """
+    (key, record) pairs given back in key order, held within `memory_budget`
+    bytes (pickled size) by writing sorted runs to files in `tmp_dir`. Pairs
+    with equal keys come back in the order they were added. memory_budget=None
+    never spills.
+    """
+
+    def __init__(self, memory_budget: Optional[int] = None, tmp_dir: Optional[str] = None):
+        self.memory_budget = memory_budget
+        self.tmp_dir = tmp_dir
+        # (key, pickled (key, record)) not written out yet.
+        self.buffer: List[Tuple[Any, bytes]] = []
+        # (level, file), oldest first. A level-n run is MERGE_FAN_IN level n-1
+        # runs merged; levels never go up along the list.
+        self.runs: List[Tuple[int, IO[bytes]]] = []
+        self.buffered = 0
+        self.records = 0
+        self.spills = 0
+        self.merges = 0
+        self.spilled_bytes = 0
+
+    def add(self, key: Any, record: Any) -> None:
+        data = pickle.dumps((key, record), _PROTOCOL)
+        self.buffer.append((key, data))
+        self.buffered += len(data)
+        self.records += 1
+        if self.memory_budget is not None and self.buffered > self.memory_budget:
+            self._spill()
+
+    def _sorted_buffer(self) -> List[Tuple[Any, bytes]]:
+        self.buffer.sort(key=itemgetter(0))
+        return self.buffer
+
+    def _new_run(self) -> IO[bytes]:
+        if self.tmp_dir:
+            os.makedirs(self.tmp_dir, exist_ok=True)
+        return tempfile.TemporaryFile(prefix="sqldump-run-", dir=self.tmp_dir)
+
+    def _spill(self) -> None:
+        f = self._new_run()
+        f.writelines(data for _, data in self._sorted_buffer())
+        self.runs.append((0, f))
+        self.spills += 1
+        self.spilled_bytes += self.buffered
+        self.buffer = []
+        self.buffered = 0
+        self._merge_full_levels()
+
+    def _merge_full_levels(self) -> None:
+        # The newest MERGE_FAN_IN runs of one level are always the tail of the
+        # list; merging them in place keeps the list oldest first.
+        while len(self.runs) >= MERGE_FAN_IN:
+            level = self.runs[-1][0]
+            if self.runs[-MERGE_FAN_IN][0] != level:
+                return
+            group = [f for _, f in self.runs[-MERGE_FAN_IN:]]
+            del self.runs[-MERGE_FAN_IN:]
+            for f in group:
+                f.flush()
+                f.seek(0)
+            out = self._new_run()
+            for item in heapq.merge(*[_records(f) for f in group], key=itemgetter(0)):
+                pickle.dump(item, out, _PROTOCOL)
+            for f in group:
+                f.close()
+            self.runs.append((level + 1, out))
+            self.merges += 1
+
+    def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+        """Every (key, record) in key order: a merge of the runs and the buffer."""
+        for _, f in self.runs:
+            f.flush()
+            f.seek(0)
+        buffered = (pickle.loads(data) for _, data in self._sorted_buffer())
+        # heapq.merge keeps equal keys in the order of its inputs: runs first, oldest first.
+        return heapq.merge(*[_records(f) for _, f in self.runs], buffered, key=itemgetter(0))
+
+    @property
+    def spilled(self) -> bool:
+        return self.spills > 0
+
+    def close(self) -> None:
+        for _, f in self.runs:
+            f.close()
+        self.runs = []
+        self.buffer = []
+        self.buffered = 0
+
+    def __enter__(self) -> "SortedRuns":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def stats(self) -> Tuple[int, int, int]:
+        """(records added, runs written, bytes spilled)."""
+        return self.records, self.spills, self.spilled_bytes
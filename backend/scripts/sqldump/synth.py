@@ -0,0 +1,305 @@
+"""
+Synthetic phpMyAdmin-style dumps for benchmarking the dump readers.
+
+The output looks like the real etike.sql / zoea.sql: a CREATE TABLE followed by
+long extended INSERTs per table, one row per line. String fields mix the cases
+that used to break naive parsers: backslash escapes, quotes, commas and
+parentheses inside strings, multi-line HTML blobs, non-ASCII text and NULLs.
+The same size and seed always give the same bytes.
+
+  cd backend/scripts
+  python3 -m sqldump synth /tmp/synth-100mb.sql --size-mb 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+from typing import Callable, Dict, List, Sequence, Tuple
+
+ROWS_PER_INSERT = 500
+
+_NAMES = [
+    "Gorilla Trek",
+    "Lake 'Kivu' Escape",
+    "Nyungwe (Canopy Walk), 2 days",
+    "Akagera Big Five",
+    "Kigali City Tour — Café & Culture",
+    "Volcanoes \\ Twin Lakes",
+    'The "Crater" Hike',
+    "Île de Nkombo",
+]
+_WORDS = "safari gorilla lake canopy kigali volcano crater forest tea coffee culture hike boat sunset village".split()
+_HTML = [
+    "<p>Day 1: Kigali &amp; Musanze (arrive, rest)</p>\n<ul><li>Gorillas</li><li>Golden monkeys</li></ul>",
+    "<div class=\"itinerary\"><h3>Overview</h3><p>It's a 3-day trip; bring boots (size 42+).</p></div>",
+    "<p>Price includes:<br/>- permits<br/>- lodge (full board)</p>\r\n<p>Path: C:\\tours\\rw</p>",
+    "<table><tr><td>Day</td><td>Plan</td></tr><tr><td>1</td><td>Drive, picnic, boat (2h)</td></tr></table>",
+    "<p>Éco-lodge, vue sur le lac ✓ — «idéal»</p>\n\n<p>Tab\there, 50% off (limited)</p>",
+]
+_TOKEN_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789./"
+_STATUSES = ["active", "inactive", "draft", "deleted", "pending_review"]
+
+
+def quote(s: str) -> str:
+    """A MySQL string literal, escaped the way mysqldump/phpMyAdmin write it."""
+    s = s.replace("\\", "\\\\").replace("'", "\\'").replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t")
+    return f"'{s}'"
+
+
+class _Pools:
+    """Pre-quoted literals, so building a row is mostly random.choice + join."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.names = [quote(n) for n in _NAMES]
+        self.statuses = [quote(s) for s in _STATUSES]
+        self.html = [quote(rng.choice(_HTML) + "\n" + rng.choice(_HTML) * rng.randint(1, 6)) for _ in range(64)]
+        self.short = [quote(" ".join(rng.choices(_WORDS, k=rng.randint(2, 12)))) for _ in range(256)]
+        self.emails = [quote(f"{w}.{i}@example.rw") for i, w in enumerate(_WORDS)] + ["NULL"]
+        self.passwords = [quote("$2y$10$" + "".join(rng.choices(_TOKEN_CHARS, k=53))) for _ in range(32)] + ["''"]
+        self.tokens = [quote("".join(rng.choices(_TOKEN_CHARS, k=rng.choice((64, 255))))) for _ in range(32)]
+        self.phones = [quote(f"+2507{rng.randint(10_000_000, 99_999_999)}") for _ in range(64)] + ["NULL"]
+        self.urls = [quote(f"https://cdn.example.rw/img/{w}_{i}.jpg?w=800&h=600") for i, w in enumerate(_WORDS)]
+        self.dates = [quote(f"2023-{m:02d}-{d:02d} {h:02d}:15:00") for m in range(1, 13) for d in (1, 15) for h in (9, 18)]
+        self.payloads = [
+            quote('{"ip": "10.0.%d.%d", "ua": "Mozilla/5.0 (X11; Linux)", "q": "a,b (c)"}' % (i, j))
+            for i in range(8)
+            for j in range(8)
+        ]
+
+    def pick(self, pool: Sequence[str], null_rate: float = 0.0) -> str:
+        if null_rate and self.rng.random() < null_rate:
+            return "NULL"
+        return self.rng.choice(pool)
+
+
+RowFn = Callable[[_Pools, int], str]
+
+# Bumped whenever TABLES changes, so dumps generated from an older layout are not reused.
+LAYOUT_VERSION = 2
+
+_USER_STATUSES = ["'active'", "'inactive'", "'banned'"]
+_PACKAGE_STATUSES = ["'active'", "'inactive'", "'draft'", "'deleted'"]
+
+# table -> (columns as (name, type), row builder, share of the dump's bytes).
+# Names, order and widths are those of the real dumps: the etike.sql tables
+# the export reads (users 12 columns, tour_packages 12, tour_package_options 7,
+# tour_package_categories 10, tour_package_category_relations 4) and the
+# 32-column zoea v1 venues (database/zoea v1.sql). Types follow those dumps
+# where known.
+TABLES: Dict[str, Tuple[List[Tuple[str, str]], RowFn, float]] = {
+    "users": (
+        [
+            ("user_id", "int(11)"),
+            ("name", "varchar(255)"),
+            ("phone", "varchar(32)"),
+            ("email", "varchar(255)"),
+            ("password", "varchar(255)"),
+            ("profile_pic", "varchar(255)"),
+            ("bio", "text"),
+            ("token", "text"),
+            ("role", "enum('client','tour_operator','admin')"),
+            ("status", "enum('active','inactive','banned')"),
+            ("registration_date", "timestamp"),
+            ("code", "varchar(64)"),
+        ],
+        lambda p, i: (
+            f"({i}, {p.pick(p.names)}, {p.pick(p.phones)}, {p.pick(p.emails)}, {p.pick(p.passwords)}, "
+            f"{p.pick(p.urls, 0.4)}, {p.pick(p.short, 0.3)}, {p.pick(p.tokens, 0.5)}, "
+            f"'{'tour_operator' if i % 4 == 0 else 'client'}', {p.pick(_USER_STATUSES)}, {p.pick(p.dates)}, 'OP{i}')"
+        ),
+        0.10,
+    ),
+    "tour_packages": (
+        [
+            ("id", "int(11)"),
+            ("code", "varchar(255)"),
+            ("name", "varchar(255)"),
+            ("description", "longtext"),
+            ("base_price", "decimal(10,2)"),
+            ("cover_image", "varchar(255)"),
+            ("seller_id", "int(11)"),
+            ("status", "enum('active','inactive','draft','deleted')"),
+            ("created_by", "int(11)"),
+            ("updated_by", "int(11)"),
+            ("created_at", "timestamp"),
+            ("updated_at", "timestamp"),
+        ],
+        lambda p, i: (
+            f"({i}, 'pkg-{i}', {p.pick(p.names)}, {p.pick(p.html, 0.1)}, "
+            f"{'NULL' if i % 9 == 0 else f'{p.rng.randint(50, 5000)}.{p.rng.randint(0, 99):02d}'}, "
+            f"{p.pick(p.urls, 0.2)}, {4 * p.rng.randint(1, 2000)}, {p.pick(_PACKAGE_STATUSES)}, "
+            f"{p.rng.randint(1, 40)}, {'NULL' if i % 3 else p.rng.randint(1, 40)}, {p.pick(p.dates)}, {p.pick(p.dates)})"
+        ),
+        0.30,
+    ),
+    "tour_package_options": (
+        [
+            ("id", "int(11)"),
+            ("package_id", "int(11)"),
+            ("name", "varchar(255)"),
+            ("description", "text"),
+            ("price", "decimal(10,2)"),
+            ("created_at", "timestamp"),
+            ("updated_at", "timestamp"),
+        ],
+        lambda p, i: (
+            f"({i}, {p.rng.randint(1, 50_000)}, {p.pick(p.short)}, {p.pick(p.short, 0.5)}, "
+            f"'{p.rng.randint(50, 9000)}.{p.rng.randint(0, 99):02d}', {p.pick(p.dates)}, {p.pick(p.dates)})"
+        ),
+        0.10,
+    ),
+    "tour_package_categories": (
+        [
+            ("id", "int(11)"),
+            ("code", "varchar(255)"),
+            ("name", "varchar(255)"),
+            ("description", "text"),
+            ("cover_image", "varchar(255)"),
+            ("status", "enum('active','inactive','draft','deleted')"),
+            ("created_by", "int(11)"),
+            ("updated_by", "int(11)"),
+            ("created_at", "timestamp"),
+            ("updated_at", "timestamp"),
+        ],
+        lambda p, i: (
+            f"({i}, 'cat-{i}', {p.pick(p.short)}, {p.pick(p.html, 0.5)}, {p.pick(p.urls, 0.5)}, "
+            f"{p.pick(_PACKAGE_STATUSES)}, 1, NULL, {p.pick(p.dates)}, {p.pick(p.dates)})"
+        ),
+        0.02,
+    ),
+    "tour_package_category_relations": (
+        [("id", "int(11)"), ("package_id", "int(11)"), ("category_id", "int(11)"), ("created_at", "timestamp")],
+        lambda p, i: f"({i}, {i}, {p.rng.randint(1, 200)}, {p.pick(p.dates)})",
+        0.03,
+    ),
+    "venues": (
+        [
+            ("venue_id", "int(11)"),
+            ("user_id", "int(11)"),
+            ("category_id", "int(11)"),
+            ("country_id", "int(11)"),
+            ("location_id", "int(11)"),
+            ("venue_code", "varchar(20)"),
+            ("venue_name", "text"),
+            ("venue_about", "text"),
+            ("facilities", "text"),
+            ("venue_policy", "text"),
+            ("cancellation_policy", "text"),
+            ("checkin_policy", "date"),
+            ("checkout_policy", "date"),
+            ("venue_price", "int(11)"),
+            ("breakfast_included", "tinyint(1)"),
+            ("venue_phone", "text"),
+            ("venue_email", "varchar(255)"),
+            ("venue_website", "text"),
+            ("vubaVuba_link", "varchar(255)"),
+            ("venue_image", "text"),
+            ("banner_url", "text"),
+            ("venue_rating", "int(11)"),
+            ("venue_reviews", "int(11)"),
+            ("venue_address", "varchar(255)"),
+            ("venue_coordinates", "varchar(255)"),
+            ("services", "text"),
+            ("wallet", "int(11)"),
+            ("working_hours", "text"),
+            ("time_added", "timestamp"),
+            ("venue_status", "varchar(20)"),
+            ("sponsored", "int(11)"),
+            ("sort_order", "int(20)"),
+        ],
+        lambda p, i: (
+            f"({i}, {p.rng.randint(1, 400)}, {p.rng.randint(1, 80)}, 1, {p.rng.randint(1, 30)}, "
+            f"'V{i:07d}', {p.pick(p.names)}, {p.pick(p.html)}, {p.pick(p.short)}, '', '', "
+            f"'0000-00-00', '0000-00-00', {p.rng.randint(1, 4)}, {p.rng.randint(0, 1)}, {p.pick(p.phones[:-1])}, "
+            f"{p.pick(p.emails)}, '', NULL, {p.pick(p.urls)}, {p.pick(p.urls, 0.7)}, {p.rng.randint(0, 5)}, "
+            f"{p.rng.randint(0, 900)}, 'Kigali, Rwanda', '-1.9441,30.0619', {p.pick(p.short)}, 0, '', "
+            f"{p.pick(p.dates)}, {p.pick(p.statuses)}, {p.rng.choice((0, 0, 0, 0, 0, 0, 1, 2))}, NULL)"
+        ),
+        0.20,
+    ),
+    # Filler that readers are expected to skip.
+    "activity_log": (
+        [
+            ("id", "bigint(20)"),
+            ("user_id", "int(11)"),
+            ("action", "varchar(64)"),
+            ("payload", "text"),
+            ("created_at", "datetime"),
+        ],
+        lambda p, i: (
+            f"({i}, {p.rng.randint(1, 9000)}, {p.pick(p.short)}, {p.pick(p.payloads, 0.1)}, {p.pick(p.dates)})"
+        ),
+        0.25,
+    ),
+}
+
+_HEADER = """-- phpMyAdmin SQL Dump
+-- version 5.2.1
+-- https://www.phpmyadmin.net/
+--
+-- Synthetic dump ({size_mb:g} MB target, seed {seed}) generated by `python3 -m sqldump synth`.
+
+SET SQL_MODE = "NO_AUTO_VALUE_ON_ZERO";
+START TRANSACTION;
+SET time_zone = "+00:00";
+
+/*!40101 SET NAMES utf8mb4 */;
+
+"""
+
+
+def _create_table(table: str, columns: List[Tuple[str, str]]) -> str:
+    cols = ",\n".join(f"  `{name}` {typ} DEFAULT NULL" for name, typ in columns)
+    return (
+        f"-- --------------------------------------------------------\n\n"
+        f"--\n-- Table structure for table `{table}`\n--\n\n"
+        f"CREATE TABLE `{table}` (\n{cols}\n) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;\n\n"
+        f"--\n-- Dumping data for table `{table}`\n--\n\n"
+    )
+
+
+def generate(path: str, size_mb: float, seed: int = 0, rows_per_insert: int = ROWS_PER_INSERT) -> Dict[str, int]:
+    """Write a dump of about `size_mb` MB to `path`; returns rows written per table."""
+    rng = random.Random(seed)
+    pools = _Pools(rng)
+    target = int(size_mb * (1 << 20))
+    rows: Dict[str, int] = {}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n", buffering=1 << 20) as f:
+        written = f.write(_HEADER.format(size_mb=size_mb, seed=seed))
+        for table, (columns, row, share) in TABLES.items():
+            written += f.write(_create_table(table, columns))
+            head = f"INSERT INTO `{table}` ({', '.join(f'`{c}`' for c, _ in columns)}) VALUES\n"
+            budget = written + share * target
+            n = 0
+            # At least one statement per table, then whole statements until its share is used.
+            while n == 0 or written < budget:
+                lines = [row(pools, n + k + 1) for k in range(rows_per_insert)]
+                n += rows_per_insert
+                written += len(head) + sum(len(s) for s in lines) + 2 * len(lines) + 1
+                f.write(head + ",\n".join(lines) + ";\n\n")
+            rows[table] = n
+        f.write("COMMIT;\n")
+    return rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(prog="sqldump synth", description="Write a synthetic phpMyAdmin-style SQL dump.")
+    ap.add_argument("output")
+    ap.add_argument("--size-mb", type=float, default=10.0, help="Approximate dump size.")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--rows-per-insert", type=int, default=ROWS_PER_INSERT)
+    args = ap.parse_args()
+
+    rows = generate(args.output, args.size_mb, args.seed, args.rows_per_insert)
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / (1 << 20):.1f} MB)")
+    for table, n in rows.items():
+        print(f"- {table}: {n} rows")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,135 @@
+"""
+Resuming a read from a Position, and a checkpointed read killed part way.
+Run from backend/scripts: python3 -m unittest sqldump.test_checkpoint
+"""
+
+from __future__ import annotations
+
+import gzip
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import unittest
+from typing import Any, Dict, List, Tuple
+
+from .checkpoint import checkpointed_inserts
+from .index import load_index
+from .parser import Position, iter_inserts, iter_rows
+from .synth import generate
+
+TABLES = ["tour_packages", "tour_package_options", "users"]
+COLUMNS = {"tour_packages": ["id", "base_price", "status"], "users": ["user_id", "name"]}
+WHERE = {"users": ("role", "==", "tour_operator")}
+
+# Runs checkpointed_inserts in a child that SIGKILLs itself right after save
+# number argv[3] has reached the disk, the way a preempted worker dies.
+_KILLED_READ = """
+import os, signal, sys
+from sqldump import checkpoint
+path, checkpoint_path, kill_after = sys.argv[1], sys.argv[2], int(sys.argv[3])
+save = checkpoint._Writer.save
+def save_then_die(self, position, batch):
+    save(self, position, batch)
+    if self.saves == kill_after:
+        os.kill(os.getpid(), signal.SIGKILL)
+checkpoint._Writer.save = save_then_die
+checkpoint.checkpointed_inserts(
+    path, %r, checkpoint_path, every=0, columns=%r, where=%r
+)
+""" % (
+    TABLES,
+    COLUMNS,
+    WHERE,
+)
+
+
+def _typed(tables: Dict[str, Any]) -> str:
+    return repr({t: [list(row) for row in rows] for t, rows in sorted(tables.items())})
+
+
+class ResumeFromPositionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp.name, "synth.sql")
+        generate(cls.path, 0.3, seed=2, rows_per_insert=10)
+        with open(cls.path, "rb") as src, gzip.open(cls.path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp.cleanup()
+
+    def _read(self, path: str, **options: Any) -> Tuple[List[Tuple[str, List[Any]]], List[Tuple[int, Position]]]:
+        """Every row, and each Position with how many rows had been taken when it was reported."""
+        rows: List[Tuple[str, List[Any]]] = []
+        positions: List[Tuple[int, Position]] = []
+        read = iter_rows(path, TABLES, on_statement=lambda at: positions.append((len(rows), at)), **options)
+        for table, row in read:
+            rows.append((table, row))
+        return rows, positions
+
+    def test_every_mode(self) -> None:
+        modes = [
+            (self.path, {}),
+            (self.path, {"workers": 2}),
+            (self.path, {"index": load_index(self.path)}),
+            (self.path, {"schema": False}),
+            (self.path, {"columns": COLUMNS, "where": WHERE}),
+            (self.path + ".gz", {}),
+            (self.path + ".gz", {"chunk_size": 4096}),
+        ]
+        for path, options in modes:
+            with self.subTest(path=path, options=sorted(options)):
+                rows, positions = self._read(path, **options)
+                self.assertGreater(len(positions), 10)
+                for taken, at in positions[:: len(positions) // 7] + positions[-1:]:
+                    resumed = list(iter_rows(path, TABLES, resume=at, **options))
+                    self.assertEqual(repr(rows[:taken] + resumed), repr(rows))
+
+
+class KilledReadTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "synth.sql")
+        generate(self.path, 0.3, seed=3, rows_per_insert=10)
+        self.checkpoint = os.path.join(tmp.name, "read.checkpoint")
+        self.expected = _typed(iter_inserts(self.path, TABLES, columns=COLUMNS, where=WHERE))
+
+    def _resume(self) -> str:
+        return _typed(checkpointed_inserts(self.path, TABLES, self.checkpoint, columns=COLUMNS, where=WHERE))
+
+    def test_resume_after_kill(self) -> None:
+        here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for kill_after in (1, 10, 30):
+            with self.subTest(kill_after=kill_after):
+                child = subprocess.run(
+                    [sys.executable, "-c", _KILLED_READ, self.path, self.checkpoint, str(kill_after)], cwd=here
+                )
+                self.assertEqual(child.returncode, -signal.SIGKILL)
+                self.assertEqual(self._resume(), self.expected)
+                os.remove(self.checkpoint)
+
+    def test_resume_after_a_cut_short_save(self) -> None:
+        # A kill in the middle of a save leaves a prefix of the file.
+        checkpointed_inserts(self.path, TABLES, self.checkpoint, every=0, columns=COLUMNS, where=WHERE)
+        with open(self.checkpoint, "rb") as f:
+            full = f.read()
+        for size in (0, 10, len(full) // 3, len(full) // 2 + 7, len(full) - 1):
+            with self.subTest(size=size):
+                with open(self.checkpoint, "wb") as f:
+                    f.write(full[:size])
+                self.assertEqual(self._resume(), self.expected)
+
+    def test_other_read_is_refused(self) -> None:
+        checkpointed_inserts(self.path, TABLES, self.checkpoint, every=0, columns=COLUMNS, where=WHERE)
+        with self.assertRaisesRegex(ValueError, "checkpoint of another dump or read"):
+            checkpointed_inserts(self.path, TABLES, self.checkpoint, columns=COLUMNS)
+
+
+if __name__ == "__main__":
+    unittest.main()
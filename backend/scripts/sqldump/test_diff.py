@@ -0,0 +1,172 @@
+"""
+Row-level diff of two dumps, through DumpDiff and `python3 -m sqldump diff`.
+Run from backend/scripts: python3 -m unittest sqldump.test_diff
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from decimal import Decimal
+from typing import List
+
+from .diff import Change, DumpDiff, _change_json
+
+OLD = rb"""CREATE TABLE `venues` (
+  `venue_id` int(11) NOT NULL,
+  `venue_name` text NOT NULL,
+  `venue_price` decimal(10,2) DEFAULT NULL,
+  PRIMARY KEY (`venue_id`)
+) ENGINE=InnoDB;
+
+INSERT INTO `venues` (`venue_id`, `venue_name`, `venue_price`) VALUES
+(1, 'Heaven', 10.00),
+(2, 'Repub Lounge', 12.50),
+(3, 'Closed, for good', NULL);
+
+CREATE TABLE `tags` (
+  `venue_id` int(11) NOT NULL,
+  `tag` varchar(32) NOT NULL
+) ENGINE=InnoDB;
+
+INSERT INTO `tags` (`venue_id`, `tag`) VALUES
+(1, 'rooftop'),
+(2, 'live music');
+"""
+
+# venue 1 renamed and repriced, 3 deleted, 4 inserted, 2 unchanged (in another
+# statement); a column added; tags (no primary key) gain one and lose one.
+NEW = rb"""CREATE TABLE `venues` (
+  `venue_id` int(11) NOT NULL,
+  `venue_name` text NOT NULL,
+  `venue_price` decimal(10,2) DEFAULT NULL,
+  `sponsored` tinyint(1) DEFAULT 0,
+  PRIMARY KEY (`venue_id`)
+) ENGINE=InnoDB;
+
+INSERT INTO `venues` (`venue_id`, `venue_name`, `venue_price`, `sponsored`) VALUES
+(4, 'Pili Pili', 8.00, 1),
+(1, 'Heaven Restaurant', 11.00, 0);
+
+INSERT INTO `venues` (`venue_id`, `venue_name`, `venue_price`, `sponsored`) VALUES
+(2, 'Repub Lounge', 12.50, 0);
+
+CREATE TABLE `tags` (
+  `venue_id` int(11) NOT NULL,
+  `tag` varchar(32) NOT NULL
+) ENGINE=InnoDB;
+
+INSERT INTO `tags` (`venue_id`, `tag`) VALUES
+(1, 'rooftop'),
+(4, 'brunch');
+"""
+
+
+class DumpDiffTest(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.old = self._write("old.sql", OLD)
+        self.new = self._write("new.sql", NEW)
+
+    def _write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.dir, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_changes(self) -> None:
+        diff = DumpDiff(self.old, self.new)
+        changes = list(diff.changes())
+        self.assertEqual(
+            changes,
+            [
+                Change("tags", "delete", {"venue_id": 2, "tag": "live music"}, {"venue_id": 2, "tag": "live music"}),
+                Change("tags", "insert", {"venue_id": 4, "tag": "brunch"}, {"venue_id": 4, "tag": "brunch"}),
+                Change(
+                    "venues",
+                    "update",
+                    {"venue_id": 1},
+                    {"venue_id": 1, "venue_name": "Heaven Restaurant", "venue_price": Decimal("11.00"), "sponsored": 0},
+                    {
+                        "venue_name": ("Heaven", "Heaven Restaurant"),
+                        "venue_price": (Decimal("10.00"), Decimal("11.00")),
+                    },
+                ),
+                Change(
+                    "venues",
+                    "delete",
+                    {"venue_id": 3},
+                    {"venue_id": 3, "venue_name": "Closed, for good", "venue_price": None},
+                ),
+                Change(
+                    "venues",
+                    "insert",
+                    {"venue_id": 4},
+                    {"venue_id": 4, "venue_name": "Pili Pili", "venue_price": Decimal("8.00"), "sponsored": 1},
+                ),
+            ],
+        )
+        self.assertEqual(diff.counts["venues"], {"inserted": 1, "deleted": 1, "updated": 1, "unchanged": 1})
+        self.assertEqual(diff.counts["tags"], {"inserted": 1, "deleted": 1, "updated": 0, "unchanged": 1})
+        self.assertEqual(diff.key_columns["venues"], (["venue_id"], "primary key"))
+        self.assertEqual(diff.key_columns["tags"], (["venue_id", "tag"], "all columns"))
+        self.assertEqual(diff.column_changes["venues"], (["sponsored"], []))
+
+    def test_same_changes_whatever_the_budget_or_input(self) -> None:
+        expected = list(DumpDiff(self.old, self.new).changes())
+        with open(self.new, "rb") as f:
+            new_gz = self._write("new.sql.gz", gzip.compress(f.read()))
+        for old, new, options in (
+            (self.old, self.new, {"memory_budget": 1}),
+            (self.old, self.new, {"memory_budget": None}),
+            (self.old, self.new, {"workers": 2}),
+            (self.old, new_gz, {}),
+        ):
+            with self.subTest(new=new, **options):
+                diff = DumpDiff(old, new, **options)  # type: ignore[arg-type]
+                self.assertEqual(list(diff.changes()), expected)
+                if options.get("memory_budget") == 1:
+                    self.assertGreater(diff.sort_stats[1], 0)
+
+    def test_given_key(self) -> None:
+        changes = list(DumpDiff(self.old, self.new, tables=["tags"], keys={"tags": ["venue_id"]}).changes())
+        self.assertEqual([(c.op, c.key) for c in changes], [("delete", {"venue_id": 2}), ("insert", {"venue_id": 4})])
+
+    def test_missing_table(self) -> None:
+        with self.assertRaisesRegex(ValueError, "no CREATE TABLE in either dump for: bookings"):
+            list(DumpDiff(self.old, self.new, tables=["bookings"]).changes())
+
+    def test_command_line(self) -> None:
+        here = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        def run(*args: str) -> "subprocess.CompletedProcess[str]":
+            return subprocess.run(
+                [sys.executable, "-m", "sqldump", "diff", self.old, self.new, *args],
+                cwd=here,
+                capture_output=True,
+                text=True,
+            )
+
+        done = run("--tables", "venues", "--memory-budget", "0.000001")
+        self.assertEqual(done.returncode, 0, done.stderr)
+        expected: List[str] = [_change_json(c) for c in DumpDiff(self.old, self.new, tables=["venues"]).changes()]
+        self.assertEqual(done.stdout.splitlines(), expected)
+        self.assertEqual(json.loads(expected[0])["changed"]["venue_price"], ["10.00", "11.00"])
+        summary = "- venues: 1 inserted, 1 deleted, 1 updated, 1 unchanged (key: venue_id, primary key)"
+        self.assertIn(summary, done.stderr)
+
+        failed = run("--tables", "bookings")
+        self.assertEqual(failed.returncode, 1)
+        self.assertIn("error: no CREATE TABLE in either dump for: bookings", failed.stderr)
+        self.assertEqual(run("--key", "venues").returncode, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,260 @@
+"""
+The dump reader against the legacy splitters, and every way of reading a dump
+(workers, index, cache, checkpoint, compressed input, compact tables) against a
+plain read. Run from backend/scripts: python3 -m unittest sqldump.test_parser
+"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from .cache import cached_inserts
+from .checkpoint import checkpointed_inserts
+from .index import load_index
+from .parser import (
+    _convert_date,
+    _convert_datetime,
+    _convert_decimal,
+    _convert_float,
+    _convert_int,
+    _convert_str,
+    _coerce_value,
+    _enum_converter,
+    _split_fields,
+    _split_tuples,
+    iter_inserts,
+    iter_rows,
+    iter_statements,
+)
+from .synth import generate
+
+# The cases that used to trip the reader: escapes, quotes, commas and parentheses
+# in strings, quoted numbers, zero dates, a table without CREATE TABLE, rows
+# spread over several INSERTs, and a non-target table in between.
+DUMP = r"""-- phpMyAdmin SQL Dump
+
+CREATE TABLE `tours` (
+  `id` int(11) NOT NULL,
+  `name` varchar(255) NOT NULL,
+  `price` decimal(10,2) DEFAULT NULL,
+  `rating` double DEFAULT NULL,
+  `status` enum('active','draft') NOT NULL,
+  `starts` date DEFAULT NULL,
+  `created_at` datetime DEFAULT NULL,
+  PRIMARY KEY (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO `tours` (`id`, `name`, `price`, `rating`, `status`, `starts`, `created_at`) VALUES
+(1, 'Lake \'Kivu\' (2 days), boat', 947.90, 4.5, 'active', '2023-05-01', '2023-04-01 09:15:00'),
+(2, 'Path C:\\Kigali\\Musanze\nline two', '12.50', '3', 'draft', '0000-00-00', '0000-00-00 00:00:00'),
+(3, '', NULL, NULL, 'active', NULL, NULL);
+
+CREATE TABLE `other` (
+  `id` int(11) NOT NULL
+) ENGINE=InnoDB;
+
+INSERT INTO `other` (`id`) VALUES
+(1);
+
+INSERT INTO `tours` (`id`, `name`, `price`, `rating`, `status`, `starts`, `created_at`) VALUES
+(4, 'Café & Culture — «idéal»', 0.10, -1.25, 'draft', '2024-02-29', '2024-02-29 23:59:59'),
+(-5, 'Tab\there', 10, 0, 'active', '2023-13-01', '2023-00-10 10:00:00');
+
+INSERT INTO `notes` (`id`, `body`) VALUES
+(1, 'no CREATE TABLE'),
+(2, 'x = (a, b)');
+
+COMMIT;
+""".encode("utf-8")
+
+TABLES = ["tours", "notes"]
+
+
+def _typed(tables: Dict[str, Any]) -> str:
+    # repr tells 1 from 1.0 and Decimal("0.1") from Decimal("0.10"), which == does not.
+    return repr({t: [list(row) for row in rows] for t, rows in sorted(tables.items())})
+
+
+def _legacy_inserts(path: str, tables: List[str]) -> Dict[str, List[List[Any]]]:
+    """What the per-character splitters give for the same statements, each field guessed by _coerce_value."""
+    out: Dict[str, List[List[Any]]] = {t: [] for t in tables}
+    for table, values in iter_statements(path, tables):
+        for blob in _split_tuples(values.decode("utf-8")):
+            out[table].append([_coerce_value(f.encode("utf-8")) for f in _split_fields(blob)])
+    return out
+
+
+def _compressed(path: str) -> List[str]:
+    paths = []
+    for suffix, module in ((".gz", gzip), (".bz2", bz2), (".xz", lzma)):
+        with open(path, "rb") as src, module.open(path + suffix, "wb") as dst:  # type: ignore[attr-defined]
+            shutil.copyfileobj(src, dst)
+        paths.append(path + suffix)
+    return paths
+
+
+class ConvertersTest(unittest.TestCase):
+    def test_int(self) -> None:
+        self.assertEqual(_convert_int(b"42"), 42)
+        self.assertEqual(_convert_int(b"-7"), -7)
+        self.assertEqual(_convert_int(b"'42'"), 42)
+        self.assertIsNone(_convert_int(b"NULL"))
+        self.assertEqual(_convert_int(b"'n/a'"), "n/a")
+
+    def test_decimal_keeps_its_digits(self) -> None:
+        self.assertEqual(repr(_convert_decimal(b"947.90")), "Decimal('947.90')")
+        self.assertEqual(repr(_convert_decimal(b"'12.50'")), "Decimal('12.50')")
+        self.assertEqual(repr(_convert_decimal(b"-0.10")), "Decimal('-0.10')")
+        self.assertIsNone(_convert_decimal(b"NULL"))
+        self.assertEqual(_convert_decimal(b"'n/a'"), "n/a")
+
+    def test_float(self) -> None:
+        self.assertEqual(_convert_float(b"4.5"), 4.5)
+        self.assertIsInstance(_convert_float(b"'3'"), float)
+        self.assertEqual(_convert_float(b"-1.25"), -1.25)
+        self.assertIsNone(_convert_float(b"NULL"))
+
+    def test_str(self) -> None:
+        self.assertEqual(_convert_str(rb"'Lake \'Kivu\''"), "Lake 'Kivu'")
+        self.assertEqual(_convert_str(rb"'a\\b\nc\td'"), "a\\b\nc\td")
+        self.assertEqual(_convert_str(b"'Caf\xc3\xa9'"), "Caf\u00e9")
+        self.assertEqual(_convert_str(b"''"), "")
+        self.assertIsNone(_convert_str(b"NULL"))
+
+    def test_dates(self) -> None:
+        self.assertEqual(_convert_datetime(b"'2023-04-01 09:15:00'"), datetime(2023, 4, 1, 9, 15))
+        self.assertEqual(_convert_date(b"'2024-02-29'"), date(2024, 2, 29))
+        # Zero and invalid dates stay text, as with no schema.
+        self.assertEqual(_convert_datetime(b"'0000-00-00 00:00:00'"), "0000-00-00 00:00:00")
+        self.assertEqual(_convert_date(b"'0000-00-00'"), "0000-00-00")
+        self.assertEqual(_convert_datetime(b"'2023-00-10 10:00:00'"), "2023-00-10 10:00:00")
+        self.assertEqual(_convert_date(b"'2023-13-01'"), "2023-13-01")
+        self.assertIsNone(_convert_date(b"NULL"))
+
+    def test_enum_members_are_shared(self) -> None:
+        convert = _enum_converter([b"'active'", b"'draft'"])
+        self.assertIs(convert(b"'active'"), convert(b"'active'"))
+        self.assertEqual(convert(b"'draft'"), "draft")
+        self.assertEqual(convert(b"'other'"), "other")
+        self.assertIsNone(convert(b"NULL"))
+
+    def test_typed_rows(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "dump.sql")
+        with open(path, "wb") as f:
+            f.write(DUMP)
+        tours = iter_inserts(path, ["tours"])["tours"]
+        name = "Path C:\\Kigali\\Musanze\nline two"
+        self.assertEqual(tours[1], [2, name, Decimal("12.50"), 3.0, "draft", "0000-00-00", "0000-00-00 00:00:00"])
+        self.assertEqual([row[0] for row in tours], [1, 2, 3, 4, -5])
+        self.assertEqual(tours[3][1], "Caf\u00e9 & Culture \u2014 \u00abid\u00e9al\u00bb")
+
+
+class UnterminatedTupleTest(unittest.TestCase):
+    def test_raises_with_offset(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "cut.sql")
+        cut = DUMP.index(b"(4, 'Caf") + len(b"(4, 'Caf")
+        with open(path, "wb") as f:
+            f.write(DUMP[:cut])
+        offset = DUMP.index(b"(4, 'Caf")
+        for p in [path] + _compressed(path):
+            for kwargs in ({}, {"workers": 2}, {"schema": False}):
+                with self.subTest(path=p, **kwargs), self.assertRaisesRegex(ValueError, f"at byte {offset} "):
+                    list(iter_rows(p, TABLES, **kwargs))  # type: ignore[arg-type]
+
+
+class ReadModesTest(unittest.TestCase):
+    """Every mode claims the same rows as a plain read, with the same types."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.dumps = []
+        path = os.path.join(cls.tmp.name, "handmade.sql")
+        with open(path, "wb") as f:
+            f.write(DUMP)
+        cls.dumps.append((path, TABLES))
+        path = os.path.join(cls.tmp.name, "synth.sql")
+        rows = generate(path, 0.3, seed=1, rows_per_insert=40)
+        cls.dumps.append((path, sorted(rows)))
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp.cleanup()
+
+    def test_untyped_read_matches_legacy_splitters(self) -> None:
+        for path, tables in self.dumps:
+            with self.subTest(path=path):
+                expected = _typed(_legacy_inserts(path, tables))
+                self.assertEqual(_typed(iter_inserts(path, tables, schema=False)), expected)
+
+    def _check_modes(self, path: str, tables: List[str], **options: Any) -> None:
+        expected = _typed(iter_inserts(path, tables, **options))
+        self.assertEqual(_typed(iter_inserts(path, tables, workers=2, **options)), expected)
+        self.assertEqual(_typed(iter_inserts(path, tables, index=load_index(path), **options)), expected)
+        for compressed in _compressed(path):
+            self.assertEqual(_typed(iter_inserts(compressed, tables, **options)), expected, compressed)
+            chunked: Dict[str, List[Any]] = {t: [] for t in tables}
+            for table, row in iter_rows(compressed, tables, chunk_size=64, **options):
+                chunked[table].append(row)
+            self.assertEqual(_typed(chunked), expected, compressed)
+
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        for _ in ("miss", "hit"):
+            self.assertEqual(_typed(cached_inserts(path, tables, cache_dir=cache_dir, **options)), expected)
+        # Touched but unchanged: served again after its content hash is checked.
+        os.utime(path)
+        self.assertEqual(_typed(cached_inserts(path, tables, cache_dir=cache_dir, **options)), expected)
+
+        checkpoint = os.path.join(self.tmp.name, "read.checkpoint")
+        for resume in (False, True):
+            got = checkpointed_inserts(path, tables, checkpoint, every=0, resume=resume, **options)
+            self.assertEqual(_typed(got), expected)
+        os.remove(checkpoint)
+
+    def test_typed(self) -> None:
+        for path, tables in self.dumps:
+            with self.subTest(path=path):
+                self._check_modes(path, tables)
+
+    def test_untyped(self) -> None:
+        for path, tables in self.dumps:
+            with self.subTest(path=path):
+                self._check_modes(path, tables, schema=False)
+
+    def test_projected_and_filtered(self) -> None:
+        path, _ = self.dumps[0]
+        self._check_modes(
+            path, TABLES, columns={"tours": ["name", "price", "id"]}, where={"tours": ("status", "==", "active")}
+        )
+        path, _ = self.dumps[1]
+        self._check_modes(
+            path,
+            ["users", "tour_packages"],
+            columns={"users": ["user_id", "name"], "tour_packages": ["id", "base_price", "seller_id"]},
+            where={"users": ("role", "==", "tour_operator")},
+        )
+
+    def test_compact_tables(self) -> None:
+        path, _ = self.dumps[1]
+        columns = {"tour_packages": ["id", "base_price", "status"]}
+        layout = {"tour_packages": {"id": "int", "base_price": "decimal", "status": "intern"}}
+        expected = _typed(iter_inserts(path, ["tour_packages"], columns=columns))
+        self.assertEqual(_typed(iter_inserts(path, ["tour_packages"], columns=columns, layout=layout)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
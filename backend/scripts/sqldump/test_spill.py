@@ -0,0 +1,65 @@
+"""
+SortedRuns under a budget small enough to write more runs than the process may
+hold files open, and Partitions reading back the same under any budget. Run
+from backend/scripts: python3 -m unittest sqldump.test_spill
+"""
+
+from __future__ import annotations
+
+import random
+import resource
+import unittest
+
+from .spill import MERGE_FAN_IN, Partitions, SortedRuns
+
+FD_LIMIT = 256
+
+
+class SortedRunsFdLimitTest(unittest.TestCase):
+    def setUp(self) -> None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        self.addCleanup(resource.setrlimit, resource.RLIMIT_NOFILE, (soft, hard))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(FD_LIMIT, soft), hard))
+
+    def test_more_runs_than_fd_limit(self) -> None:
+        rng = random.Random(0)
+        pairs = [(rng.randrange(500), i) for i in range(20000)]
+        # About one record per run.
+        with SortedRuns(memory_budget=1) as runs:
+            for key, i in pairs:
+                runs.add(key, i)
+            got = list(runs)
+            self.assertGreater(runs.spills, FD_LIMIT)
+            self.assertLess(len(runs.runs), FD_LIMIT // 2)
+            self.assertGreater(runs.merges, 0)
+        # Sorted, with equal keys in the order they were added.
+        self.assertEqual(got, sorted(pairs, key=lambda p: p[0]))
+
+    def test_fan_in_boundary(self) -> None:
+        for n in (MERGE_FAN_IN - 1, MERGE_FAN_IN, MERGE_FAN_IN + 1, MERGE_FAN_IN * MERGE_FAN_IN):
+            pairs = [(-i % 7, i) for i in range(n)]
+            with SortedRuns(memory_budget=1) as runs:
+                for key, i in pairs:
+                    runs.add(key, i)
+                self.assertEqual(list(runs), sorted(pairs, key=lambda p: p[0]))
+
+
+class PartitionsBudgetTest(unittest.TestCase):
+    def test_same_records_under_any_budget(self) -> None:
+        rng = random.Random(1)
+        pairs = [(rng.randrange(300), (i, "x" * rng.randrange(40))) for i in range(5000)]
+        got = []
+        for budget in (None, 1 << 20, 4096, 1):
+            with Partitions(16, budget) as parts:
+                for key, record in pairs:
+                    parts.add(key, record)
+                self.assertEqual(parts.spilled, budget is not None and budget < 1 << 20)
+                got.append([list(parts.partition(i)) for i in range(parts.n)])
+        self.assertEqual(got[1:], got[:1] * 3)
+        # Each partition holds its keys' records in the order they were added.
+        for i, part in enumerate(got[0]):
+            self.assertEqual(part, [p for p in pairs if hash(p[0]) % 16 == i])
+
+
+if __name__ == "__main__":
+    unittest.main()
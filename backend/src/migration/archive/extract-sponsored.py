@@ -1,110 +1,209 @@
 #!/usr/bin/env python3
-import re
+"""
+List sponsored venues (sponsored > 0) from the V1 `zoea.sql` dump.
+
+Rows come from the shared streaming dump reader (backend/scripts/sqldump), which
+is escape-aware and runs in linear time with bounded memory, so parentheses,
+commas or escaped quotes inside venue descriptions no longer break rows. The
+extraction can also share one scan of the dump with other pipelines:
+
+  cd backend/scripts
+  python3 -m sqldump scan /path/to/zoea.sql --out-dir /tmp/out --pipeline ../src/migration/archive/extract-sponsored.py
+
+Usage:
+  python3 backend/src/migration/archive/extract-sponsored.py --input /path/to/zoea.sql
+  python3 backend/src/migration/archive/extract-sponsored.py --input zoea.sql --format json --output sponsored.json
+  # Per-stage timings (scan/convert/sort/write) as JSON next to the output:
+  python3 backend/src/migration/archive/extract-sponsored.py --input zoea.sql --output sponsored.txt --profile
+"""
+import argparse
+import csv
+import json
+import os
 import sys
 
-sql_file = '/Applications/AMPPS/www/zoea1/zoea.sql'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'scripts'))
+
+from sqldump import Profiler, Scan  # noqa: E402
+
+DEFAULT_INPUT = '/Applications/AMPPS/www/zoea1/zoea.sql'
+
+# Output fields; also the `venues` columns read from the dump, matched by name
+# to each INSERT's column list. The scan raises ValueError if one is missing
+# there or from CREATE TABLE `venues`, checked as the scan reaches it.
+FIELDS = [
+    'venue_id',
+    'venue_name',
+    'sponsored',
+    'venue_status',
+    'category_id',
+    'location_id',
+    'venue_rating',
+    'venue_reviews',
+    'time_added',
+]
+
+
+def _int_or_zero(v):
+    if isinstance(v, int):
+        return v
+    if isinstance(v, str) and v.strip().isdigit():
+        return int(v.strip())
+    return 0
+
 
-try:
-    with open(sql_file, 'r', encoding='utf-8', errors='ignore') as f:
-        content = f.read()
-    
-    # Find all INSERT INTO venues statements
-    matches = re.findall(r'INSERT INTO `venues`[^;]+;', content, re.DOTALL)
-    
+def _text(v):
+    return '' if v is None else str(v).strip()
+
+
+def _venue(values):
+    venue = dict(zip(FIELDS, values))
+    try:
+        sponsored = int(venue['sponsored'])
+        venue_id = int(venue['venue_id'])
+    except (TypeError, ValueError):
+        return None
+    return {
+        'venue_id': venue_id,
+        'venue_name': _text(venue['venue_name']),
+        'sponsored': sponsored,
+        'venue_status': _text(venue['venue_status']),
+        'category_id': _int_or_zero(venue['category_id']),
+        'location_id': _int_or_zero(venue['location_id']),
+        'venue_rating': _int_or_zero(venue['venue_rating']),
+        'venue_reviews': _int_or_zero(venue['venue_reviews']),
+        'time_added': _text(venue['time_added']),
+    }
+
+
+def subscribe_sponsored(scan, prof=None):
+    """
+    Register on a sqldump.Scan; returns a function that gives the sponsored
+    venues, sorted by sponsored level, once the scan has run.
+    """
+    prof = prof or Profiler(enabled=False)
     sponsored_venues = []
-    for match in matches:
-        # Extract all value rows
-        values_match = re.search(r'VALUES\s+(.+);', match, re.DOTALL)
-        if not values_match:
-            continue
-        
-        values_str = values_match.group(1)
-        # Split by rows - each row starts with (
-        rows = re.findall(r'\(([^)]*(?:\([^)]*\)[^)]*)*)\)', values_str)
-        
-        for row in rows:
-            # Simple split by comma, handling quoted strings
-            values = []
-            current = ''
-            in_quotes = False
-            quote_char = None
-            
-            i = 0
-            while i < len(row):
-                char = row[i]
-                if not in_quotes and (char == "'" or char == '"'):
-                    in_quotes = True
-                    quote_char = char
-                    current += char
-                elif in_quotes and char == quote_char:
-                    if i + 1 < len(row) and row[i+1] == quote_char:
-                        current += char + char
-                        i += 1
-                    else:
-                        in_quotes = False
-                        quote_char = None
-                        current += char
-                elif not in_quotes and char == ',':
-                    values.append(current.strip())
-                    current = ''
-                else:
-                    current += char
-                i += 1
-            
-            if current.strip():
-                values.append(current.strip())
-            
-            # Check if we have enough values and if sponsored (index 29) > 0
-            if len(values) >= 30:
-                try:
-                    sponsored = int(values[29].strip())
-                    if sponsored > 0:
-                        venue_id = int(values[0].strip())
-                        venue_name = values[6].strip().strip("'").strip('"')
-                        venue_status = values[28].strip().strip("'").strip('"')
-                        category_id = int(values[2].strip()) if values[2].strip().isdigit() else 0
-                        location_id = int(values[4].strip()) if values[4].strip().isdigit() else 0
-                        rating = int(values[21].strip()) if values[21].strip().isdigit() else 0
-                        reviews = int(values[22].strip()) if values[22].strip().isdigit() else 0
-                        time_added = values[27].strip().strip("'").strip('"')
-                        
-                        sponsored_venues.append({
-                            'venue_id': venue_id,
-                            'venue_name': venue_name,
-                            'sponsored': sponsored,
-                            'venue_status': venue_status,
-                            'category_id': category_id,
-                            'location_id': location_id,
-                            'venue_rating': rating,
-                            'venue_reviews': reviews,
-                            'time_added': time_added
-                        })
-                except (ValueError, IndexError) as e:
-                    pass
-    
-    # Sort by sponsored level
-    sponsored_venues.sort(key=lambda x: x['sponsored'], reverse=True)
-    
-    print(f'Found {len(sponsored_venues)} sponsored venues:\n')
+
+    def on_row(values):
+        with prof.stage('convert') as st:
+            venue = _venue(values)
+            st.rows += 1
+        if venue is not None:
+            sponsored_venues.append(venue)
+
+    sub = scan.subscribe('venues', FIELDS, where=('sponsored', '>', 0), on_row=on_row)
+
+    def result():
+        prof.table('venues', sub.count)
+        # Sort by sponsored level
+        with prof.stage('sort') as st:
+            sponsored_venues.sort(key=lambda x: x['sponsored'], reverse=True)
+            st.rows = len(sponsored_venues)
+        return sponsored_venues
+
+    return result
+
+
+def extract_sponsored(sql_file, prof=None):
+    prof = prof or Profiler(enabled=False)
+    scan = Scan(sql_file)
+    result = subscribe_sponsored(scan, prof)
+    # `convert` runs inside `scan`; the profiler reports each stage's own time.
+    with prof.stage('scan') as st:
+        st.bytes = os.path.getsize(sql_file)
+        st.rows = sum(scan.run().values())
+    return result()
+
+
+def register(scan, out_dir):
+    """Pipeline hook for `python3 -m sqldump scan`: writes sponsored_venues.json to out_dir."""
+    result = subscribe_sponsored(scan)
+
+    def finish():
+        path = os.path.join(out_dir, 'sponsored_venues.json')
+        with open(path, 'w', encoding='utf-8', newline='') as out:
+            write_json(result(), out)
+        print(f'- sponsored venues: {path}')
+
+    return finish
+
+
+def write_text(sponsored_venues, out):
+    print(f'Found {len(sponsored_venues)} sponsored venues:\n', file=out)
     for i, venue in enumerate(sponsored_venues, 1):
-        print(f"{i}. Venue ID: {venue['venue_id']}")
-        print(f"   Name: {venue['venue_name']}")
-        print(f"   Sponsored Level: {venue['sponsored']}")
-        print(f"   Status: {venue['venue_status']}")
-        print(f"   Category ID: {venue['category_id']}")
-        print(f"   Location ID: {venue['location_id']}")
-        print(f"   Rating: {venue['venue_rating']}")
-        print(f"   Reviews: {venue['venue_reviews']}")
-        print(f"   Added: {venue['time_added']}")
-        print()
-    
+        print(f"{i}. Venue ID: {venue['venue_id']}", file=out)
+        print(f"   Name: {venue['venue_name']}", file=out)
+        print(f"   Sponsored Level: {venue['sponsored']}", file=out)
+        print(f"   Status: {venue['venue_status']}", file=out)
+        print(f"   Category ID: {venue['category_id']}", file=out)
+        print(f"   Location ID: {venue['location_id']}", file=out)
+        print(f"   Rating: {venue['venue_rating']}", file=out)
+        print(f"   Reviews: {venue['venue_reviews']}", file=out)
+        print(f"   Added: {venue['time_added']}", file=out)
+        print(file=out)
+
     if len(sponsored_venues) == 0:
-        print("No sponsored venues found (all have sponsored = 0)")
-        sys.exit(0)
-    
-except Exception as e:
-    print(f"Error: {e}", file=sys.stderr)
-    import traceback
-    traceback.print_exc()
-    sys.exit(1)
+        print("No sponsored venues found (all have sponsored = 0)", file=out)
+
+
+def write_json(sponsored_venues, out):
+    json.dump(sponsored_venues, out, ensure_ascii=False, indent=2)
+    out.write('\n')
+
+
+def write_csv(sponsored_venues, out):
+    w = csv.DictWriter(out, fieldnames=FIELDS)
+    w.writeheader()
+    w.writerows(sponsored_venues)
+
+
+WRITERS = {'text': write_text, 'json': write_json, 'csv': write_csv}
+PROFILE_STAGES = ['scan', 'convert', 'sort', 'write']
+
+
+def main():
+    ap = argparse.ArgumentParser(description='List sponsored venues from the V1 SQL dump.')
+    ap.add_argument('--input', default=DEFAULT_INPUT, help='Path to the V1 zoea.sql dump.')
+    ap.add_argument('--format', choices=sorted(WRITERS), default='text')
+    ap.add_argument('--output', help='Write to this file instead of stdout.')
+    ap.add_argument(
+        '--profile',
+        action='store_true',
+        help='Write per-stage timings, rows and peak RSS growth to sponsored_profile.json '
+        'next to --output (or in cwd).',
+    )
+    ap.add_argument(
+        '--profile-stage',
+        choices=PROFILE_STAGES,
+        help='Also run this stage under cProfile (implies --profile).',
+    )
+    args = ap.parse_args()
+
+    prof = Profiler(enabled=args.profile or bool(args.profile_stage), hot_stage=args.profile_stage)
+    prof.meta['input'] = os.path.abspath(args.input)
+    try:
+        sponsored_venues = extract_sponsored(args.input, prof)
+        with prof.stage('write') as st:
+            st.rows = len(sponsored_venues)
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8', newline='') as out:
+                    WRITERS[args.format](sponsored_venues, out)
+            else:
+                WRITERS[args.format](sponsored_venues, sys.stdout)
+        if prof.enabled:
+            out_dir = os.path.dirname(os.path.abspath(args.output)) if args.output else os.getcwd()
+            profile_path = os.path.join(out_dir, 'sponsored_profile.json')
+            prof.write(profile_path)
+            print(f'Profile: {profile_path}', file=sys.stderr)
+            for line in prof.summary():
+                print(f'  {line}', file=sys.stderr)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return 1
+    return 0
+
 
+if __name__ == '__main__':
+    sys.exit(main())